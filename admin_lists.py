@@ -0,0 +1,149 @@
+# admin_lists.py
+"""
+Admin paneli ro‘yxatlari (kutilayotgan / faol klasterlar) – sahifalab.
+
+Sahifalash keyset (cursor) usulida: OFFSET ishlatilmaydi, keyingi sahifa
+oldingi sahifaning oxirgi (saralash qiymati, id) juftidan davom etadi:
+    WHERE status = ... AND (name, id) > (:name, :id) ORDER BY name, id LIMIT n
+Shuning uchun 100-sahifa ham 1-sahifa bilan bir xil narxda.
+
+Saralash: id (ro‘yxatdan o‘tish tartibi) yoki name; "-" prefiksi –
+kamayish tartibida. Umumiy son (total) data version bo‘yicha keshlangan
+COUNT(*) dan olinadi.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Literal, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache import cluster_count_cache
+from models import Cluster, District, User
+from responses import rows_response
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+SortKey = Literal["id", "-id", "name", "-name"]
+
+_SORT_COLUMNS = {
+    "id": Cluster.id,
+    "name": Cluster.name,
+}
+# javobdagi ustun nomi (cursor shu qiymatdan quriladi)
+_SORT_OUTPUT = {
+    "id": "id",
+    "name": "cluster_name",
+}
+
+
+def encode_cursor(sort: str, value: Any, cluster_id: int) -> str:
+    raw = json.dumps([sort, value, cluster_id], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """cursor -> (saralash qiymati, id). Boshqa saralash uchun berilgan cursor – 400."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, cluster_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Noto‘g‘ri cursor.")
+    if cursor_sort != sort or not isinstance(cluster_id, int):
+        raise HTTPException(status_code=400, detail="Cursor boshqa saralash uchun berilgan.")
+    return value, cluster_id
+
+
+def _filters(
+    statuses: Sequence[str],
+    district_code: Optional[str],
+    cluster_type: Optional[str],
+) -> list:
+    conditions = [Cluster.status == statuses[0] if len(statuses) == 1 else Cluster.status.in_(statuses)]
+    if district_code is not None:
+        conditions.append(Cluster.district_code == district_code)
+    if cluster_type is not None:
+        conditions.append(Cluster.cluster_type == cluster_type)
+    return conditions
+
+
+async def _count(db: AsyncSession, conditions: list) -> int:
+    return (await db.execute(
+        select(func.count())
+        .select_from(Cluster)
+        .join(User, User.cluster_id == Cluster.id)
+        .where(*conditions)
+    )).scalar_one()
+
+
+async def cluster_page(
+    db: AsyncSession,
+    statuses: Sequence[str],
+    district_code: Optional[str] = None,
+    cluster_type: Optional[str] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+    with_active: bool = False,
+) -> Response:
+    """
+    Bitta sahifa (tayyor JSON Response, sxemasi – schemas.AdminClusterPage;
+    route larda responses= orqali OpenAPI ga yoziladi):
+      {"items": [...], "next_cursor": "..." | None, "total": 123}
+    next_cursor None bo‘lsa – oxirgi sahifa.
+    """
+    descending = sort.startswith("-")
+    sort_name = sort.lstrip("-")
+    sort_col = _SORT_COLUMNS[sort_name]
+    conditions = _filters(statuses, district_code, cluster_type)
+
+    columns = [
+        Cluster.id,
+        Cluster.name.label("cluster_name"),
+        Cluster.district_code,
+        District.name.label("district_name"),
+        Cluster.cluster_type,
+        Cluster.leader_name,
+        Cluster.leader_phone,
+        Cluster.status,
+        Cluster.created_at,
+        User.username,
+    ]
+    if with_active:
+        columns.append(func.coalesce(Cluster.is_active, False).label("is_active"))
+    query = (
+        select(*columns)
+        .join(User, User.cluster_id == Cluster.id)
+        .join(District, District.code == Cluster.district_code, isouter=True)
+        .where(*conditions)
+    )
+
+    if cursor is not None:
+        value, last_id = decode_cursor(cursor, sort)
+        if sort_name == "id":
+            query = query.where(Cluster.id < last_id if descending else Cluster.id > last_id)
+        else:
+            key = tuple_(sort_col, Cluster.id)
+            query = query.where(key < (value, last_id) if descending else key > (value, last_id))
+
+    order = [sort_col.desc(), Cluster.id.desc()] if descending else [sort_col, Cluster.id]
+    if sort_name == "id":
+        order = order[:1]
+    # bitta ortiqcha qator – keyingi sahifa bormi?
+    result = await db.execute(query.order_by(*order).limit(limit + 1))
+    keys = list(result.keys())
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(sort, last[keys.index(_SORT_OUTPUT[sort_name])], last.id)
+
+    count_key = f"{','.join(statuses)}|{district_code}|{cluster_type}"
+    total = await cluster_count_cache.aget_or_count(count_key, lambda: _count(db, conditions))
+
+    # qatorlar pydantic dan o‘tmaydi – to‘g‘ridan-to‘g‘ri JSON baytlariga
+    return rows_response(keys, rows[:limit], {"next_cursor": next_cursor, "total": total})
@@ -2,6 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
 from auth import get_admin_user
+from changes import next_change_seq
+import data_versions
 from models import Cluster
 from schemas import ClusterAdminView
 
@@ -22,8 +24,11 @@ def approve_cluster(cluster_id: int, comment: str | None = None,
     cluster.status = "approved"
     cluster.admin_comment = comment
     cluster.is_active = True
+    cluster.change_seq = next_change_seq(db)
 
+    versions = data_versions.mark_changed(db, data_versions.CLUSTERS)
     db.commit()
+    data_versions.committed(versions)
     return {"message": "Klaster tasdiqlandi"}
 
 
@@ -37,6 +42,9 @@ def reject_cluster(cluster_id: int, comment: str | None = None,
     cluster.status = "rejected"
     cluster.admin_comment = comment
     cluster.is_active = False
+    cluster.change_seq = next_change_seq(db)
 
+    versions = data_versions.mark_changed(db, data_versions.CLUSTERS)
     db.commit()
+    data_versions.committed(versions)
     return {"message": "Klaster rad etildi"}
@@ -0,0 +1,130 @@
+# agro_summary.py
+"""
+Viloyat paneli uchun KPI yig‘masi – /api/agrodata/summary.
+
+Tasdiqlangan va faol klasterlar hisobotlari yil va tuman bo‘yicha bazaning
+o‘zida guruhlanadi (GROUP BY): yig‘indi, o‘rtacha, klasterlar soni va
+rentabellikning min/max/mediani. Viloyat bo‘yicha jami (yil kesimida)
+xuddi shu so‘rovda UNION ALL bilan olinadi – natija bitta so‘rov.
+
+Median oyna funksiyalari bilan hisoblanadi (SQLite da PERCENTILE_CONT
+yo‘q): har bir guruh ichida ROW_NUMBER() va COUNT(*) OVER, so‘ng o‘rtadagi
+bitta (toq son) yoki ikkita (juft son) qiymatning o‘rtachasi.
+"""
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case, func, literal, null, select, union_all
+
+from cache import district_cache
+from models import Cluster, ClusterReport
+
+# yig‘indi va o‘rtacha hisoblanadigan ko‘rsatkichlar
+SUMMED_FIELDS = ("production", "export", "employment")
+
+# yig‘masi tuman kodi bo‘lmagan klasterlar (agrodata dagi kabi)
+UNKNOWN_DISTRICT = "unknown"
+
+
+def _median(value, row_number, count):
+    # (n+1)/2 va (n+2)/2 – butun bo‘linma: toq n da bitta, juft n da ikkita qator
+    middle = row_number.in_([(count + 1) // 2, (count + 2) // 2])
+    return func.avg(case((middle, value)))
+
+
+def summary_query(year: Optional[int] = None, district: Optional[str] = None):
+    """
+    Qatorlar: (level, year, district_code, clusters, <field>_sum, <field>_avg,
+    profitability_avg/min/max/median). level: "district" | "region".
+    """
+    district_code = func.coalesce(Cluster.district_code, UNKNOWN_DISTRICT)
+    profitability = func.coalesce(ClusterReport.profitability, 0)
+    by_district = {"partition_by": [ClusterReport.year, district_code], "order_by": profitability}
+    by_year = {"partition_by": ClusterReport.year, "order_by": profitability}
+
+    ranked = (
+        select(
+            ClusterReport.year,
+            district_code.label("district_code"),
+            *(func.coalesce(getattr(ClusterReport, f), 0).label(f) for f in SUMMED_FIELDS),
+            profitability.label("profitability"),
+            func.row_number().over(**by_district).label("district_rn"),
+            func.count().over(partition_by=by_district["partition_by"]).label("district_n"),
+            func.row_number().over(**by_year).label("region_rn"),
+            func.count().over(partition_by=by_year["partition_by"]).label("region_n"),
+        )
+        .join(Cluster, Cluster.id == ClusterReport.cluster_id)
+        .where(Cluster.status == "approved", Cluster.is_active == True)  # noqa: E712
+    )
+    if year is not None:
+        ranked = ranked.where(ClusterReport.year == year)
+    if district is not None:
+        ranked = ranked.where(district_code == district)
+    ranked = ranked.cte("ranked")
+
+    def aggregates(level: str):
+        rn, n = ranked.c[level + "_rn"], ranked.c[level + "_n"]
+        columns = [func.count().label("clusters")]
+        for field in SUMMED_FIELDS:
+            columns.append(func.sum(ranked.c[field]).label(field + "_sum"))
+            columns.append(func.avg(ranked.c[field]).label(field + "_avg"))
+        columns += [
+            func.avg(ranked.c.profitability).label("profitability_avg"),
+            func.min(ranked.c.profitability).label("profitability_min"),
+            func.max(ranked.c.profitability).label("profitability_max"),
+            _median(ranked.c.profitability, rn, n).label("profitability_median"),
+        ]
+        return columns
+
+    districts = (
+        select(literal("district").label("level"), ranked.c.year, ranked.c.district_code, *aggregates("district"))
+        .group_by(ranked.c.year, ranked.c.district_code)
+    )
+    region = (
+        select(literal("region").label("level"), ranked.c.year, null().label("district_code"), *aggregates("region"))
+        .group_by(ranked.c.year)
+    )
+    return union_all(districts, region)
+
+
+def _round(value, digits: int = 4):
+    return round(float(value), digits) if value is not None else None
+
+
+def _kpi(row) -> Dict[str, Any]:
+    item: Dict[str, Any] = {"clusters": row.clusters}
+    for field in SUMMED_FIELDS:
+        cast = int if field == "employment" else float
+        item[field] = {
+            "sum": cast(getattr(row, field + "_sum") or 0),
+            "avg": _round(getattr(row, field + "_avg")),
+        }
+    item["profitability"] = {
+        stat: _round(getattr(row, "profitability_" + stat))
+        for stat in ("avg", "min", "max", "median")
+    }
+    return item
+
+
+def summary_from_rows(rows) -> Dict[str, Dict[str, Any]]:
+    """
+    {
+      "2025": {
+        "region": {"clusters": 42, "production": {"sum", "avg"}, ...,
+                   "profitability": {"avg", "min", "max", "median"}},
+        "districts": {"kasbi": {"district": "Kasbi tumani", "clusters": 5, ...}, ...}
+      },
+      ...
+    }
+    """
+    data: Dict[str, Dict[str, Any]] = {}
+    for row in sorted(rows, key=lambda r: (r.year, r.level != "region", r.district_code or "")):
+        year_dict = data.setdefault(str(row.year), {"region": None, "districts": {}})
+        if row.level == "region":
+            year_dict["region"] = _kpi(row)
+        else:
+            code = row.district_code
+            year_dict["districts"][code] = {
+                "district": district_cache.get(code) or code,
+                **_kpi(row),
+            }
+    return data
@@ -1,16 +1,30 @@
 # auth.py
+import threading
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel
+from sqlalchemy import func, literal, select, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from database import get_db
-from models import User, Cluster, District
+from cache import district_cache
+import data_versions
+from database import AsyncReadSessionLocal, SessionLocal
+from events import cluster_registered
+from hashing import (  # noqa: F401  (get_password_hash/verify_password – re-export)
+    HashPoolBusy,
+    get_password_hash,
+    hash_password_async,
+    verify_password,
+    verify_password_async,
+)
+from metrics import db_budget
+from models import ChangeTombstone, User, Cluster, District
 
 # ============================================================
 #  JWT sozlamalari
@@ -22,8 +36,6 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 kun
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
@@ -31,12 +43,15 @@ router = APIRouter(prefix="/auth", tags=["Auth"])
 #  Yordamchi funksiyalar
 # ============================================================
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
+# get_password_hash / verify_password – hashing.py da (sinxron variantlar
+# seed va skriptlar uchun). Endpointlar process pooldagi async variantlarni
+# ishlatadi.
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Server band. Iltimos, birozdan keyin qayta urinib ko‘ring.",
+    headers={"Retry-After": "1"},
+)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -46,14 +61,96 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+# ============================================================
+#  Bekor qilingan (revoked) klasterlar – xotirada
+# ============================================================
+#
+# Token ichida role va cluster_id bor, shuning uchun har so‘rovda users
+# jadvaliga murojaat qilinmaydi. Bloklangan / rad etilgan / o‘chirilgan
+# klasterlar tokenlari shu to‘plam orqali darhol yaroqsiz bo‘ladi.
+# Admin endpointlari to‘plamni yangilaydi, startupda bazadan qayta quriladi.
+
+_revoked_cluster_ids: Set[int] = set()
+_revocation_lock = threading.Lock()
+
+
+def is_cluster_revoked(cluster_id: Optional[int]) -> bool:
+    return cluster_id is not None and cluster_id in _revoked_cluster_ids
+
+
+def _last_issued_cluster_id(db: Session) -> int:
+    """
+    Hozirgacha berilgan eng katta klaster id si: bazadagi sekvensiya
+    (SQLite AUTOINCREMENT – sqlite_sequence, PostgreSQL – SERIAL) va
+    o‘chirish belgilari. Jadvaldagi MAX(id) yetarli emas – eng oxirgi
+    klasterlar o‘chirilgan bo‘lishi mumkin.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        sequence = select(text("seq")).select_from(text("sqlite_sequence")).where(text("name = 'clusters'"))
+    elif dialect == "postgresql":
+        sequence = select(text("pg_sequence_last_value(pg_get_serial_sequence('clusters', 'id'))"))
+    else:
+        sequence = select(literal(None))
+    return db.execute(select(
+        sequence.scalar_subquery(),
+        select(func.max(ChangeTombstone.cluster_id)).scalar_subquery(),
+    )).one()
+
+
+def rebuild_revocations(db: Session) -> None:
+    """
+    Startupda: tasdiqlanmagan/faol bo‘lmagan klasterlar, hamda hozirgacha
+    berilgan id lardan bazada yo‘qlari (o‘chirilgan klasterlar) bekor qilinadi.
+    """
+    rows = db.execute(select(Cluster.id, Cluster.status, Cluster.is_active)).all()
+    existing = {row.id for row in rows}
+    revoked = {row.id for row in rows if row.status != "approved" or not row.is_active}
+    high = max([*existing, *(value or 0 for value in _last_issued_cluster_id(db))], default=0)
+    revoked.update(set(range(1, high + 1)) - existing)
+    global _revoked_cluster_ids
+    with _revocation_lock:
+        _revoked_cluster_ids = revoked
+
+
+def revoke_clusters(cluster_ids: Iterable[int]) -> None:
+    with _revocation_lock:
+        _revoked_cluster_ids.update(cluster_ids)
+
+
+def refresh_cluster_revocations(db: Session, cluster_ids: Iterable[int]) -> None:
+    """
+    Admin qaroridan (commitdan) keyin: berilgan klasterlar holatini bazadan
+    o‘qib, to‘plamni yangilaydi. O‘chirilganlar ham bekor qilinadi.
+    """
+    ids = set(cluster_ids)
+    if not ids:
+        return
+    active = set(db.execute(
+        select(Cluster.id).where(
+            Cluster.id.in_(ids),
+            Cluster.status == "approved",
+            Cluster.is_active == True,  # noqa: E712
+        )
+    ).scalars())
+    with _revocation_lock:
+        _revoked_cluster_ids.difference_update(active)
+        _revoked_cluster_ids.update(ids - active)
+
+
 # ============================================================
 #  Joriy foydalanuvchini olish (Bearer token orqali)
 # ============================================================
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
+class CurrentUser(NamedTuple):
+    """Token claimlaridan olingan foydalanuvchi (bazaga murojaatsiz)."""
+    id: Optional[int]
+    username: str
+    role: str
+    cluster_id: Optional[int]
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token noto‘g‘ri yoki muddati tugagan.",
@@ -67,13 +164,23 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    role = payload.get("role")
+    if role is None:
+        # Eski token (faqat "sub" bilan) – bir martalik bazadan o‘qish
+        async with AsyncReadSessionLocal() as db:
+            user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+        if user is None:
+            raise credentials_exception
+        current = CurrentUser(user.id, user.username, user.role, user.cluster_id)
+    else:
+        current = CurrentUser(payload.get("uid"), username, role, payload.get("cid"))
+
+    if is_cluster_revoked(current.cluster_id):
         raise credentials_exception
-    return user
+    return current
 
 
-def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_admin_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin huquqi talab etiladi.")
     return current_user
@@ -83,26 +190,43 @@ def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
 #  LOGIN endpoint (admin + klaster)
 # ============================================================
 
+def _load_login_user(username: str):
+    # foydalanuvchi + uning klasteri bitta so‘rovda. Qisqa sessiya: ulanish
+    # (va SQLite o‘qish tranzaksiyasi) parol tekshiruvini kutmasdan poolga
+    # qaytadi; ustunlar yuklangan, yopilgan sessiyadan keyin ham o‘qiladi
+    with SessionLocal() as db:
+        return (
+            db.query(User, Cluster)
+            .outerjoin(Cluster, Cluster.id == User.cluster_id)
+            .filter(User.username == username)
+            .first()
+        )
+
+
 @router.post("/login")
-def login(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
-):
+@db_budget(1)
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Admin va klaster foydalanuvchilari uchun umumiy login.
     Front va Swaggerdan:
       - username
       - password
     form-urlencoded ko‘rinishida yuboriladi.
+    Parol tekshiruvi process poolda bajariladi (hashing.py).
     """
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    row = await run_in_threadpool(_load_login_user, form_data.username)
+    user, cluster = row if row else (None, None)
+    try:
+        password_ok = user is not None and await verify_password_async(
+            form_data.password, user.hashed_password
+        )
+    except HashPoolBusy:
+        raise _busy_exception
+    if not password_ok:
         raise HTTPException(status_code=401, detail="Login yoki parol noto‘g‘ri.")
 
     # --- Agar bu klaster foydalanuvchisi bo‘lsa, klaster holatini tekshiramiz
     if user.role == "cluster" and user.cluster_id is not None:
-        cluster = db.query(Cluster).filter(Cluster.id == user.cluster_id).first()
-
         if cluster:
             # Rad etilgan holat
             if getattr(cluster, "status", None) == "rejected":
@@ -125,7 +249,12 @@ def login(
                 )
 
     # --- Admin yoki tasdiqlangan klaster bo‘lsa, token beramiz
-    access_token = create_access_token({"sub": user.username})
+    access_token = create_access_token({
+        "sub": user.username,
+        "uid": user.id,
+        "role": user.role,
+        "cid": user.cluster_id,
+    })
     return {
         "access_token": access_token,
         "token_type": "bearer",
@@ -149,60 +278,101 @@ class ClusterRegisterIn(BaseModel):
     leader_phone: Optional[str] = None
 
 
-@router.post("/register-cluster")
-def register_cluster(
-    payload: ClusterRegisterIn,
-    db: Session = Depends(get_db),
-):
-    """
-    Yangi agroklasterni ro‘yxatdan o‘tkazish:
-      - Cluster(status='pending', is_active=False)
-      - User(role='cluster', cluster_id=cluster.id)
-    Admin tasdiqlamaguncha klaster panelga kira olmaydi.
-    """
+def _check_registration(payload: ClusterRegisterIn) -> None:
+    # 1-2. Login bandligi va tuman kodi – bitta so‘rovda (tumanlar startupda
+    # keshga yuklangan bo‘lsa, faqat login). Qisqa sessiya – xeshlash
+    # davomida ulanish band turmaydi.
+    username_taken = select(User.id).where(User.username == payload.username).exists()
+    with SessionLocal() as db:
+        if district_cache.loaded:
+            taken = db.execute(select(username_taken)).scalar()
+            district = district_cache.get(payload.district_code)
+        else:
+            taken, district = db.execute(select(
+                username_taken,
+                select(District.id).where(District.code == payload.district_code).scalar_subquery(),
+            )).one()
+
     # 1. Login band emasligini tekshirish
-    existing_user = db.query(User).filter(User.username == payload.username).first()
-    if existing_user:
+    if taken:
         raise HTTPException(
             status_code=400,
             detail="Bu login allaqachon band. Iltimos, boshqa login tanlang.",
         )
 
-    # 2. Tuman kodini tekshirish (District jadvali bo‘lsa)
-    district = db.query(District).filter(District.code == payload.district_code).first()
+    # 2. Tuman kodini tekshirish
     if not district:
         raise HTTPException(
             status_code=400,
             detail="Tuman kodi noto‘g‘ri (District jadvalidan topilmadi).",
         )
 
-    # 3. Klasterni yaratish
-    cluster = Cluster(
-        name=payload.cluster_name,
-        district_code=payload.district_code,
-        cluster_type=payload.cluster_type,
-        leader_name=payload.leader_name,
-        leader_phone=payload.leader_phone,
-        status="pending",
-        is_active=False,
-        admin_comment=None,
-    )
-    db.add(cluster)
-    db.flush()  # cluster.id
-
-    # 4. Klasterning asosiy foydalanuvchisi
-    user = User(
-        username=payload.username,
-        hashed_password=get_password_hash(payload.password),
-        role="cluster",
-        cluster_id=cluster.id,
-    )
-    db.add(user)
 
-    db.commit()
-    db.refresh(cluster)
+def _create_cluster_with_user(payload: ClusterRegisterIn, hashed_password: str) -> Tuple[int, Dict[str, int]]:
+    # xeshdan keyin yangi sessiya (tekshiruv sessiyasi allaqachon yopilgan)
+    with SessionLocal() as db:
+        # 3. Klasterni yaratish
+        cluster = Cluster(
+            name=payload.cluster_name,
+            district_code=payload.district_code,
+            cluster_type=payload.cluster_type,
+            leader_name=payload.leader_name,
+            leader_phone=payload.leader_phone,
+            status="pending",
+            is_active=False,
+            admin_comment=None,
+        )
+        db.add(cluster)
+        db.flush()  # cluster.id
+
+        # 4. Klasterning asosiy foydalanuvchisi
+        user = User(
+            username=payload.username,
+            hashed_password=hashed_password,
+            role="cluster",
+            cluster_id=cluster.id,
+        )
+        db.add(user)
+        cluster_id = cluster.id  # commitdan keyin atribut qayta o‘qilmasin (ortiqcha SELECT)
+
+        try:
+            versions = data_versions.mark_changed(db, data_versions.CLUSTERS, data_versions.USERS)
+            db.commit()
+        except IntegrityError:
+            # parallel so‘rov shu loginni bizdan oldin band qilgan
+            db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail="Bu login allaqachon band. Iltimos, boshqa login tanlang.",
+            )
+        return cluster_id, versions
+
+
+@router.post("/register-cluster")
+@db_budget(4)
+async def register_cluster(payload: ClusterRegisterIn):
+    """
+    Yangi agroklasterni ro‘yxatdan o‘tkazish:
+      - Cluster(status='pending', is_active=False)
+      - User(role='cluster', cluster_id=cluster.id)
+    Admin tasdiqlamaguncha klaster panelga kira olmaydi.
+    Parol xeshi process poolda hisoblanadi (hashing.py).
+    """
+    await run_in_threadpool(_check_registration, payload)
+
+    try:
+        hashed_password = await hash_password_async(payload.password)
+    except HashPoolBusy:
+        raise _busy_exception
+
+    cluster_id, versions = await run_in_threadpool(_create_cluster_with_user, payload, hashed_password)
+    # pending klaster – admin tasdiqlaguncha token yaroqsiz
+    revoke_clusters([cluster_id])
+    # admin ro‘yxatlari soni (COUNT keshi) yangilansin – barcha processlarda
+    data_versions.committed(versions)
+    cluster_registered(cluster_id)
 
     return {
         "message": "Ro‘yxatdan o‘tish so‘rovi qabul qilindi. Viloyat admini tasdiqlagach tizimga kira olasiz.",
-        "cluster_id": cluster.id,
+        "cluster_id": cluster_id,
     }
@@ -0,0 +1,89 @@
+# benchmarks/bench_cold_start.py
+"""
+Cold start: jarayon ishga tushgandan birinchi javobgacha qancha vaqt
+ketishini o‘lchaydi (time-to-first-request).
+
+Har bir urinish alohida Python jarayonida bajariladi (import keshlari
+isitilmagan), baza esa har safar asl nusxadan vaqtinchalik papkaga
+ko‘chiriladi – startup sxema/seed ishini har safar bir xil holatdan
+boshlaydi. Har bir urinishda to‘rt nuqta o‘lchanadi:
+    import   – `import main` tugagan payt
+    startup  – lifespan startup tugagan payt (server so‘rov qabul qiladi)
+    ready    – /ready 200 qaytargan payt (keshlar isitilgan)
+    first    – birinchi GET /api/agrodata javobi olingan payt
+
+Ishga tushirish (repo ildizidan; TestClient uchun httpx – requirements-dev.txt):
+    python -m benchmarks.bench_cold_start [--db agro.db] [--runs 5]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_CHILD = r"""
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    startup = time.perf_counter()
+    # /ready bo‘lmagan eski versiyada 404 – startup tugashi yetarli
+    while client.get("/ready").status_code == 503:
+        time.sleep(0.05)
+    ready = time.perf_counter()
+    response = client.get("/api/agrodata")
+    first = time.perf_counter()
+    assert response.status_code == 200, response.status_code
+print(json.dumps({
+    "import": imported - started,
+    "startup": startup - started,
+    "ready": ready - started,
+    "first": first - started,
+}))
+"""
+
+
+def _run_once(db_path: str, repo_root: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        target = os.path.join(tmp, "agro.db")
+        if os.path.exists(db_path):
+            shutil.copyfile(db_path, target)
+        env = dict(os.environ)
+        env.update(
+            DATABASE_URL=f"sqlite:///{target}",
+            HASH_POOL_SIZE=env.get("HASH_POOL_SIZE", "0"),
+            PYTHONPATH=repo_root + os.pathsep + env.get("PYTHONPATH", ""),
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", _CHILD],
+            cwd=tmp, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="agro.db", help="asl SQLite baza (yo‘q bo‘lsa – bo‘sh bazadan)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = [_run_once(os.path.abspath(args.db), repo_root) for _ in range(args.runs)]
+
+    print(f"baza: {args.db}, urinishlar: {args.runs}")
+    print(f"{'nuqta':>8} | {'median':>10} | {'min':>10} | {'max':>10}")
+    for point in ("import", "startup", "ready", "first"):
+        values = [s[point] * 1000 for s in samples]
+        print(
+            f"{point:>8} | {statistics.median(values):8.1f}ms | "
+            f"{min(values):8.1f}ms | {max(values):8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_json_encode.py
+"""
+JSON encode vaqti: admin ro‘yxati (active-clusters) ko‘rinishidagi 10k va
+100k element uchun turli yo‘llar taqqoslanadi:
+
+    jsonable_encoder+json – eski holat: dict lar ro‘yxati FastAPI ning
+                            jsonable_encoder i va stdlib json orqali
+    pydantic model        – response_model (schemas.AdminClusterListItem)
+                            bilan tekshirish + JSON
+    orjson (dict)         – tayyor dict lar -> responses.encode_json
+    orjson (row tuple)    – SQL qator tuple lari -> dict(zip) -> bytes
+                            (responses.rows_response yo‘li)
+
+Ishga tushirish (repo ildizidan):
+    python -m benchmarks.bench_json_encode [--sizes 10000,100000] [--repeat 3]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from responses import encode_json, orjson, rows_to_dicts
+from schemas import AdminClusterListItem
+
+KEYS = (
+    "id", "cluster_name", "district_code", "district_name", "cluster_type",
+    "leader_name", "leader_phone", "status", "created_at", "username", "is_active",
+)
+
+_DISTRICTS = [("kasbi", "Kasbi tumani"), ("qarshi", "Qarshi tumani"), ("guzor", "G‘uzor tumani")]
+
+
+def _rows(count: int) -> List[tuple]:
+    started = datetime(2024, 1, 1)
+    rows = []
+    for i in range(1, count + 1):
+        code, name = _DISTRICTS[i % len(_DISTRICTS)]
+        rows.append((
+            i, f"Klaster №{i}", code, name, "paxta-to‘qimachilik",
+            f"Rahbar {i}", f"+99890{i:07d}", "approved" if i % 5 else "blocked",
+            started + timedelta(minutes=i), f"user{i}", bool(i % 5),
+        ))
+    return rows
+
+
+def _best(fn: Callable[[], bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(List[AdminClusterListItem])
+    print(f"orjson: {'bor' if orjson is not None else 'yo‘q (stdlib json)'}")
+    print(f"{'elementlar':>10} | {'yo‘l':<22} | {'vaqt':>10} | {'hajm':>10}")
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        rows = _rows(size)
+        dicts = rows_to_dicts(KEYS, rows)
+        cases = {
+            "jsonable_encoder+json": lambda: json.dumps(
+                jsonable_encoder(dicts), ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8"),
+            "pydantic model": lambda: adapter.dump_json(adapter.validate_python(dicts)),
+            "orjson (dict)": lambda: encode_json(dicts),
+            "orjson (row tuple)": lambda: encode_json(rows_to_dicts(KEYS, rows)),
+        }
+        for label, fn in cases.items():
+            elapsed = _best(fn, args.repeat)
+            print(f"{size:>10} | {label:<22} | {elapsed * 1000:8.1f}ms | {len(fn()) / 1024:8.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
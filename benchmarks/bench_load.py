@@ -0,0 +1,270 @@
+# benchmarks/bench_load.py
+"""
+Yuklama benchmarki: ASGI ilova jarayon ichida (httpx ASGITransport),
+tarmoqsiz. Har bir route uchun N ta so‘rov C ta parallel "foydalanuvchi"
+bilan yuboriladi; p50/p95/p99 kechikish va throughput (so‘rov/s)
+chiqariladi va JSON faylga saqlanadi – keyingi o‘zgarishlar bilan
+taqqoslash uchun.
+
+Baza har safar vaqtinchalik papkada yaratiladi (benchmarks.gen_data)
+yoki --db dan nusxa olinadi – asl agro.db ga tegilmaydi. Yozuvchi
+route lar (approve/block/delete) har so‘rovda boshqa klaster ustida
+ishlaydi; hovuz tugasa so‘rovlar soni kamayadi.
+
+Ishga tushirish (repo ildizidan; httpx – requirements-dev.txt):
+    pip install -r requirements-dev.txt
+    python -m benchmarks.bench_load [--clusters 2000] [--requests 200] [--concurrency 8]
+    python -m benchmarks.bench_load --out new.json --compare old.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# database/main bu yerda import qilinmaydi: engine lar import paytida
+# DATABASE_URL bo‘yicha yaratiladi, u esa main() da o‘rnatiladi.
+
+# route nomi -> so‘rov yaratuvchi: (client, i) -> response
+RequestFn = Callable[[Any, int], Awaitable[Any]]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentil (sorted_values o‘sish tartibida)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+async def _drive(client, fn: RequestFn, count: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = itertools.count()
+
+    async def worker():
+        while True:
+            i = next(counter)
+            if i >= count:
+                return
+            started = time.perf_counter()
+            response = await fn(client, i)
+            latencies.append(time.perf_counter() - started)
+            key = str(response.status_code)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(n for code, n in statuses.items() if not code.startswith(("2", "3")))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "status": statuses,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def _id_pools(db_path: str) -> Dict[str, List[int]]:
+    conn = sqlite3.connect(db_path)
+    try:
+        pools: Dict[str, List[int]] = {}
+        for status in ("approved", "pending", "rejected"):
+            pools[status] = [row[0] for row in conn.execute(
+                "SELECT c.id FROM clusters c JOIN users u ON u.cluster_id = c.id "
+                "WHERE c.status = ? AND u.username LIKE 'bench%' ORDER BY c.id", (status,)
+            )]
+        return pools
+    finally:
+        conn.close()
+
+
+def _routes(admin: Dict[str, str], cluster_tokens: List[Dict[str, str]],
+            pools: Dict[str, List[int]]) -> Dict[str, tuple]:
+    """route nomi -> (so‘rov funksiyasi, maksimal so‘rovlar soni yoki None)."""
+    history_ids = pools["approved"]
+    to_approve = pools["pending"]
+    to_block = pools["approved"][len(cluster_tokens):]  # token egalariga tegmaymiz
+    to_delete = pools["rejected"]
+
+    def token(i):
+        return cluster_tokens[i % len(cluster_tokens)]
+
+    return {
+        "POST /auth/login": (
+            lambda c, i: c.post("/auth/login", data={"username": "admin", "password": "admin"}), None),
+        "GET /api/agrodata": (
+            lambda c, i: c.get("/api/agrodata"), None),
+        "GET /api/agrodata (If-None-Match)": (
+            lambda c, i: _conditional_get(c, "/api/agrodata"), None),
+        "GET /api/agrodata/{year}": (
+            lambda c, i: c.get(f"/api/agrodata/{2021 + i % 5}"), None),
+        "GET /api/cluster-report": (
+            lambda c, i: c.get("/api/cluster-report", params={"year": 2021 + i % 5}, headers=token(i)), None),
+        "POST /api/cluster-report": (
+            lambda c, i: c.post("/api/cluster-report", headers=token(i), json={
+                "year": 2026, "production": 1000 + i, "export": 100, "employment": 50, "profitability": 12.5,
+            }), None),
+        "GET /api/admin/pending-clusters": (
+            lambda c, i: c.get("/api/admin/pending-clusters", headers=admin), None),
+        "GET /api/admin/active-clusters": (
+            lambda c, i: c.get("/api/admin/active-clusters", params={"sort": "name"}, headers=admin), None),
+        "GET /api/admin/cluster-history/{id}": (
+            lambda c, i: c.get(f"/api/admin/cluster-history/{history_ids[i % len(history_ids)]}",
+                               headers=admin), None),
+        "POST /api/admin/cluster-approve": (
+            lambda c, i: c.post("/api/admin/cluster-approve", json={"cluster_id": to_approve[i]},
+                                headers=admin), len(to_approve)),
+        "POST /api/admin/cluster-block": (
+            lambda c, i: c.post("/api/admin/cluster-block", json={"cluster_id": to_block[i]},
+                                headers=admin), len(to_block)),
+        "DELETE /api/admin/cluster/{id}": (
+            lambda c, i: c.delete(f"/api/admin/cluster/{to_delete[i]}", headers=admin), len(to_delete)),
+    }
+
+
+_etags: Dict[str, str] = {}
+
+
+async def _conditional_get(client, url: str):
+    headers = {"If-None-Match": _etags[url]} if url in _etags else {}
+    response = await client.get(url, headers=headers)
+    if response.status_code == 200:
+        _etags[url] = response.headers.get("etag", "")
+    return response
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _run(args, db_path: str) -> Dict[str, Any]:
+    import httpx
+    import main
+    from benchmarks.gen_data import PASSWORD
+
+    results: Dict[str, Any] = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            while (await client.get("/ready")).status_code != 200:
+                await asyncio.sleep(0.05)
+
+            async def login(username: str, password: str) -> Dict[str, str]:
+                response = await client.post("/auth/login", data={"username": username, "password": password})
+                response.raise_for_status()
+                return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+            pools = _id_pools(db_path)
+            admin = await login("admin", "admin")
+            cluster_tokens = [await login(f"bench{cid}", PASSWORD) for cid in pools["approved"][:args.concurrency]]
+
+            for name, (fn, limit) in _routes(admin, cluster_tokens, pools).items():
+                if args.only and not any(part in name for part in args.only.split(",")):
+                    continue
+                count = args.requests if limit is None else min(args.requests, limit)
+                if count <= 0:
+                    continue
+                # isitish (faqat o‘qish route lari – yozuvchilar hovuzni sarflamasin)
+                if limit is None:
+                    for i in range(min(5, count)):
+                        await fn(client, i)
+                results[name] = await _drive(client, fn, count, args.concurrency)
+                r = results[name]
+                print(f"{name:<38} | {r['requests']:>6} | {r['errors']:>4} | {r['p50_ms']:8.2f} | "
+                      f"{r['p95_ms']:8.2f} | {r['p99_ms']:8.2f} | {r['throughput_rps']:9.1f}")
+    return results
+
+
+def _compare(current: Dict[str, Any], baseline_path: str) -> None:
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)["routes"]
+    print(f"\nTaqqoslash: {baseline_path} (nisbat = yangi / eski, <1 – tezroq)")
+    print(f"{'route':<38} | {'p50':>7} | {'p95':>7} | {'rps':>7}")
+    for name, r in current.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+
+        def ratio(key):
+            return f"{r[key] / old[key]:7.2f}" if old[key] else "      -"
+        print(f"{name:<38} | {ratio('p50_ms')} | {ratio('p95_ms')} | {ratio('throughput_rps')}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="nusxa olinadigan baza (berilmasa – gen_data bilan yaratiladi)")
+    parser.add_argument("--districts", type=int, default=14)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200, help="har bir route uchun")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--only", help="faqat shu qismlarni o‘z ichiga olgan route lar (vergul bilan)")
+    parser.add_argument("--out", help="natijalar JSON fayli (standart: benchmarks/results/load-<vaqt>.json)")
+    parser.add_argument("--compare", help="oldingi natijalar JSON fayli bilan taqqoslash")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="agro-bench-")
+    db_path = os.path.join(tmp, "agro.db")
+    # database import qilinishidan OLDIN – engine lar shu bazaga ulansin
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from benchmarks.gen_data import generate
+
+    try:
+        if args.db:
+            shutil.copyfile(args.db, db_path)
+        counts = generate(db_path, args.districts, args.clusters, args.years)
+
+        print(f"baza: {counts}, so‘rovlar: {args.requests}/route, parallel: {args.concurrency}")
+        print(f"{'route':<38} | {'n':>6} | {'err':>4} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'req/s':>9}")
+        routes = asyncio.run(_run(args, db_path))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": counts,
+            "requests_per_route": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "routes": routes,
+    }
+    out = args.out or os.path.join(
+        "benchmarks", "results", f"load-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, ensure_ascii=False, indent=2)
+    print(f"\nNatijalar: {out}")
+
+    if args.compare:
+        _compare(routes, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_password_hashing.py
+"""
+Login throughput: parol tekshiruvi process pool hajmiga qarab qanday
+o‘sishini o‘lchaydi.
+
+Har bir pool hajmi (1, 2, 4, ... CPU soni) uchun N ta bir vaqtdagi login
+parol tekshiruvi (verify_password_async) yuboriladi va sekundiga nechta
+login bajarilgani chiqariladi. Taqqoslash uchun "inline" qatori – eski
+holat: xesh request threadining o‘zida (standart threadpoolda).
+
+Ishga tushirish (repo ildizidan):
+    python -m benchmarks.bench_password_hashing [--logins 400]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import hashing
+
+
+def _pool_sizes(max_size: int):
+    size = 1
+    while size < max_size:
+        yield size
+        size *= 2
+    yield max_size
+
+
+async def _burst(logins: int, hashed: str) -> float:
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(hashing.verify_password_async("admin", hashed) for _ in range(logins))
+    )
+    elapsed = time.perf_counter() - started
+    assert all(results)
+    return elapsed
+
+
+def _measure(label: str, pool_size: int, logins: int, hashed: str) -> None:
+    hashing.init_pool(size=pool_size, queue_depth=logins)
+
+    async def main():
+        await _burst(max(pool_size, 1) * 2, hashed)  # jarayonlarni qizdirish
+        return await _burst(logins, hashed)
+
+    elapsed = asyncio.run(main())
+    print(f"{label:>12} | {logins / elapsed:10.1f} login/s | {elapsed * 1000:9.1f} ms jami")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--max-pool", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    hashed = hashing.get_password_hash("admin")
+    print(f"CPU: {os.cpu_count()}, loginlar: {args.logins}")
+    print(f"{'pool':>12} | {'throughput':>16} | {'vaqt':>12}")
+    _measure("inline", 0, args.logins, hashed)
+    for size in _pool_sizes(args.max_pool):
+        _measure(f"process x{size}", size, args.logins, hashed)
+    hashing.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/gen_data.py
+"""
+Sintetik ma'lumotlar generatori: SQLite bazani berilgan miqdordagi
+tumanlar, klasterlar, foydalanuvchilar (har klasterga bitta) va yillar
+bo‘yicha ClusterReport qatorlari bilan to‘ldiradi.
+
+Natija takrorlanuvchan: bir xil --seed bir xil ma'lumot beradi.
+Klaster holatlari taqsimoti: 70% approved, 15% pending, 10% blocked,
+5% rejected. Barcha klaster foydalanuvchilarining paroli – PASSWORD
+(xesh bir marta hisoblanadi). Loginlar: bench<N> (N – klaster id).
+
+Ishga tushirish (repo ildizidan):
+    python -m benchmarks.gen_data --db /tmp/bench.db --clusters 2000 --years 5
+    python -m benchmarks.gen_data --db /tmp/bench.db --from agro.db   # nusxa ustiga
+"""
+import argparse
+import os
+import random
+import shutil
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import func, insert, select
+
+from database import Base, dialect_insert, make_engine
+from hashing import get_password_hash
+from migrations import ensure_schema
+from models import Cluster, ClusterReport, District, User
+
+PASSWORD = "bench-parol"
+
+STATUSES = ("approved",) * 14 + ("pending",) * 3 + ("blocked",) * 2 + ("rejected",)
+CLUSTER_TYPES = ("paxta-to‘qimachilik", "bog‘dorchilik", "uzumchilik", "g‘allachilik", "chorvachilik")
+
+# executemany bo‘laklari
+CHUNK_SIZE = 5000
+
+
+def _chunks(rows: List[dict], size: int = CHUNK_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def generate(
+    db_path: str,
+    districts: int = 14,
+    clusters: int = 1000,
+    years: int = 5,
+    last_year: int = 2025,
+    seed: int = 42,
+) -> Dict[str, int]:
+    """
+    db_path dagi bazaga ma'lumot qo‘shadi (sxema kerak bo‘lsa yaratiladi).
+    Qo‘shilgan qatorlar sonini qaytaradi.
+    """
+    rng = random.Random(seed)
+    engine = make_engine(f"sqlite:///{os.path.abspath(db_path)}")
+    ensure_schema(engine, Base.metadata)
+    hashed = get_password_hash(PASSWORD)
+    registered = datetime(last_year - years + 1, 1, 1)
+
+    with engine.begin() as conn:
+        district_rows = [{"code": f"bench{i:03d}", "name": f"Sintetik tuman {i}"} for i in range(1, districts + 1)]
+        conn.execute(
+            dialect_insert(conn.dialect.name)(District.__table__)
+            .on_conflict_do_nothing(index_elements=["code"]),
+            district_rows,
+        )
+        codes = [row["code"] for row in district_rows]
+
+        first_id = (conn.execute(select(func.max(Cluster.id))).scalar() or 0) + 1
+        cluster_rows, user_rows, report_rows = [], [], []
+        for cluster_id in range(first_id, first_id + clusters):
+            status = rng.choice(STATUSES)
+            cluster_rows.append({
+                "id": cluster_id,
+                "name": f"Sintetik klaster {cluster_id}",
+                "district_code": rng.choice(codes),
+                "cluster_type": rng.choice(CLUSTER_TYPES),
+                "leader_name": f"Rahbar {cluster_id}",
+                "leader_phone": f"+99890{cluster_id:07d}",
+                "status": status,
+                "admin_comment": None,
+                "is_active": status == "approved",
+                "created_at": registered + timedelta(minutes=cluster_id),
+            })
+            user_rows.append({
+                "username": f"bench{cluster_id}",
+                "hashed_password": hashed,
+                "role": "cluster",
+                "cluster_id": cluster_id,
+            })
+            production = rng.uniform(500, 50000)
+            for year in range(last_year - years + 1, last_year + 1):
+                production *= rng.uniform(0.85, 1.25)
+                report_rows.append({
+                    "cluster_id": cluster_id,
+                    "year": year,
+                    "production": round(production, 2),
+                    "export": round(production * rng.uniform(0.05, 0.4), 2),
+                    "employment": rng.randint(20, 3000),
+                    "profitability": round(rng.uniform(-5, 35), 2),
+                })
+
+        for table, rows in (
+            (Cluster.__table__, cluster_rows),
+            (User.__table__, user_rows),
+            (ClusterReport.__table__, report_rows),
+        ):
+            for chunk in _chunks(rows):
+                conn.execute(insert(table), chunk)
+
+    engine.dispose()
+    return {
+        "districts": len(district_rows),
+        "clusters": len(cluster_rows),
+        "users": len(user_rows),
+        "reports": len(report_rows),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="to‘ldiriladigan SQLite fayl")
+    parser.add_argument("--from", dest="source", help="avval shu bazadan nusxa olinadi (masalan agro.db)")
+    parser.add_argument("--districts", type=int, default=14)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--last-year", type=int, default=2025)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.source:
+        shutil.copyfile(args.source, args.db)
+    started = time.perf_counter()
+    counts = generate(args.db, args.districts, args.clusters, args.years, args.last_year, args.seed)
+    print(f"{args.db}: " + ", ".join(f"{k}={v}" for k, v in counts.items())
+          + f" ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# cache.py
+"""
+Jarayon ichidagi (in-process) snapshot kesh.
+
+Viloyat paneli /api/agrodata ni doimiy so‘rab turadi. Ma'lumot esa faqat
+hisobot yozilganda yoki admin klaster holatini o‘zgartirganda yangilanadi.
+Shuning uchun tayyor (JSON ga o‘girilgan) javob baytlari "data version"
+bo‘yicha saqlanadi: versiya o‘zgarmaguncha na bazaga, na JSON encoderga
+murojaat qilinadi.
+"""
+import gzip
+import hashlib
+import threading
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+try:  # brotli ixtiyoriy – o‘rnatilmagan bo‘lsa faqat gzip ishlatiladi
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+# ============================================================
+#  Data version – yozuvchi endpointlar commitdan keyin oshiradi
+# ============================================================
+
+_data_version = 0
+_version_lock = threading.Lock()
+
+
+def get_data_version() -> int:
+    return _data_version
+
+
+def bump_data_version() -> int:
+    """
+    Ma'lumot o‘zgarganini bildiradi (commitdan keyin chaqiriladi).
+    Barcha snapshotlar avtomatik eskiradi.
+    """
+    global _data_version
+    with _version_lock:
+        _data_version += 1
+        return _data_version
+
+
+# ============================================================
+#  Snapshot kesh
+# ============================================================
+
+# Bundan kichik javoblarni siqish foyda bermaydi
+COMPRESS_MIN_SIZE = 1024
+
+_ENCODERS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": lambda body: gzip.compress(body, compresslevel=6),
+}
+if brotli is not None:
+    _ENCODERS["br"] = lambda body: brotli.compress(body, quality=5)
+
+# Afzallik tartibi
+_ENCODING_PREFERENCE = ("br", "gzip")
+
+AVAILABLE_ENCODINGS = tuple(e for e in _ENCODING_PREFERENCE if e in _ENCODERS)
+
+
+def choose_encoding(accept_encoding: Optional[str], size: int) -> Optional[str]:
+    """
+    Accept-Encoding bo‘yicha siqish usulini tanlaydi (yoki None – siqilmaydi).
+    """
+    if not accept_encoding or size < COMPRESS_MIN_SIZE:
+        return None
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q=") and params[2:] in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    for encoding in _ENCODING_PREFERENCE:
+        if encoding in _ENCODERS and (encoding in accepted or "*" in accepted):
+            return encoding
+    return None
+
+
+class Snapshot:
+    """
+    Bitta tayyor javob: JSON baytlari, ETag va (so‘ralganda) siqilgan
+    variantlari. Siqish har bir snapshot uchun bir martagina bajariladi.
+    """
+
+    __slots__ = ("version", "body", "etag", "_encoded")
+
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = make_etag(body)
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded[encoding] = _ENCODERS[encoding](self.body)
+        return data
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        # Har bir content-coding uchun alohida strong ETag
+        if encoding is None:
+            return self.etag
+        return self.etag[:-1] + "-" + encoding + '"'
+
+
+def make_etag(body: bytes) -> str:
+    """Kuchli (strong) ETag – javob baytlarining xeshi."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match sarlavhasini tekshiradi ("*", ro‘yxat va W/ prefiksi bilan).
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class SnapshotCache:
+    """
+    Kalit -> Snapshot. Snapshot faqat o‘zi qurilgan versiya joriy versiyaga
+    teng bo‘lsagina yaroqli hisoblanadi. Kalitlar soni max_items bilan
+    cheklanadi (filtrlar kombinatsiyasi cheksiz ko‘payib ketmasligi uchun).
+    """
+
+    def __init__(self, max_items: int = 256):
+        self.max_items = max_items
+        self._items: Dict[str, Snapshot] = {}
+
+    def get(self, key: str, version: int) -> Optional[Snapshot]:
+        snap = self._items.get(key)
+        if snap is not None and snap.version == version:
+            return snap
+        return None
+
+    def put(self, key: str, version: int, body: bytes) -> Snapshot:
+        snap = Snapshot(version, body)
+        if key not in self._items and len(self._items) >= self.max_items:
+            self._evict(version)
+        self._items[key] = snap
+        return snap
+
+    def _evict(self, version: int) -> None:
+        stale = [k for k, v in list(self._items.items()) if v.version != version]
+        for k in stale:
+            self._items.pop(k, None)
+        if len(self._items) >= self.max_items:
+            # eng eski kalit (dict qo‘shilish tartibini saqlaydi)
+            self._items.pop(next(iter(self._items)), None)
+
+    def get_or_build(self, key: str, build: Callable[[], bytes]) -> Snapshot:
+        """
+        Yaroqli snapshotni qaytaradi yoki build() orqali yangisini quradi.
+        Versiya qurishdan OLDIN o‘qiladi: qurish paytida ma'lumot o‘zgarsa,
+        snapshot eski versiya bilan saqlanadi va keyingi so‘rovda qayta quriladi.
+        """
+        version = get_data_version()
+        snap = self.get(key, version)
+        if snap is None:
+            snap = self.put(key, version, build())
+        return snap
+
+    async def aget_or_build(self, key: str, build: Callable[[], Awaitable[bytes]]) -> Snapshot:
+        """get_or_build ning async varianti (async endpointlar uchun)."""
+        version = get_data_version()
+        snap = self.get(key, version)
+        if snap is None:
+            snap = self.put(key, version, await build())
+        return snap
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+agrodata_cache = SnapshotCache()
+# /api/agrodata/summary – kichik javoblar, kalitlar: yil|tuman
+summary_cache = SnapshotCache(max_items=64)
+
+
+# ============================================================
+#  Tumanlar keshi (kod -> nom)
+# ============================================================
+
+class DistrictCache:
+    """
+    Tumanlar ro‘yxati startupda bir marta yuklanadi (ular faqat seed
+    orqali o‘zgaradi). Yuklanmagan bo‘lsa loaded=False – chaqiruvchi
+    bazaga murojaat qiladi.
+    """
+
+    def __init__(self):
+        self._names: Dict[str, str] = {}
+        self.loaded = False
+
+    def replace(self, names: Dict[str, str]) -> None:
+        self._names = dict(names)
+        self.loaded = True
+
+    def get(self, code: str) -> Optional[str]:
+        return self._names.get(code)
+
+    def all(self) -> Dict[str, str]:
+        return dict(self._names)
+
+
+district_cache = DistrictCache()
+
+
+# ============================================================
+#  COUNT keshi
+# ============================================================
+
+class CountCache:
+    """
+    Kalit -> (versiya, son). Ro‘yxatlarning umumiy soni (COUNT(*)) faqat
+    data version o‘zgarganda qayta hisoblanadi – sahifalar narxi jadval
+    hajmiga bog‘liq bo‘lmaydi.
+    """
+
+    def __init__(self, max_items: int = 256):
+        self.max_items = max_items
+        self._items: Dict[str, Tuple[int, int]] = {}
+
+    async def aget_or_count(self, key: str, count: Callable[[], Awaitable[int]]) -> int:
+        version = get_data_version()
+        cached = self._items.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        value = await count()
+        if key not in self._items and len(self._items) >= self.max_items:
+            self._items = {k: v for k, v in self._items.items() if v[0] == version}
+            if len(self._items) >= self.max_items:
+                self._items.pop(next(iter(self._items)), None)
+        self._items[key] = (version, value)
+        return value
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+cluster_count_cache = CountCache()
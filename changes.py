@@ -0,0 +1,159 @@
+# changes.py
+"""
+"O‘zgarishlar kursordan beri" sinxronizatsiyasi – /api/agrodata/changes.
+
+Har bir yozuvchi tranzaksiya change_counter dagi yagona qatorni oshiradi
+(next_change_seq) va o‘zgargan qatorlarga shu qiymatni change_seq qilib
+yozadi: hisobot upserti va importi – cluster_reports ga, admin qarorlari –
+clusters ga. O‘chirilgan klasterlar change_tombstones ga yoziladi.
+
+Hisoblagich qatori commitgacha qulflanadi (SQLite da butun yozish
+tranzaksiyasi ketma-ket), shuning uchun change_seq lar commit tartibida
+o‘sadi: mijoz kursor (since) dan kichik qiymat keyinroq paydo bo‘lishini
+ko‘rmaydi. Baza sekvensiyasi (SERIAL) bunday kafolat bermaydi.
+
+Mijoz: since=0 bilan to‘liq holatni oladi, keyin javobdagi cursor bilan
+faqat o‘zgarishlarni so‘raydi – O(o‘zgarishlar), O(ma'lumotlar) emas.
+"""
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import insert, select, union, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from cache import district_cache
+from database import dialect_insert
+from models import ChangeCounter, ChangeTombstone, Cluster, ClusterReport
+
+CHANGES_DEFAULT_LIMIT = 1000
+CHANGES_MAX_LIMIT = 10000
+
+REPORT_FIELDS = ("production", "export", "employment", "profitability")
+
+
+def ensure_counter(db: Session) -> None:
+    """Startupda: hisoblagich qatori (yangi bazada ham birinchi yozuv bitta UPDATE bo‘lsin)."""
+    insert_stmt = dialect_insert(db.get_bind().dialect.name)(ChangeCounter.__table__)
+    db.execute(insert_stmt.values(id=1, value=0).on_conflict_do_nothing(index_elements=["id"]))
+
+
+def next_change_seq(db: Session) -> int:
+    """
+    Yangi change_seq (joriy tranzaksiya ichida, commit chaqiruvchida).
+    Bitta UPDATE ... RETURNING; hisoblagich qatori yo‘q bo‘lsa (yangi
+    baza) – yaratiladi.
+    """
+    value = db.execute(
+        update(ChangeCounter)
+        .where(ChangeCounter.id == 1)
+        .values(value=ChangeCounter.value + 1)
+        .returning(ChangeCounter.value)
+    ).scalar()
+    if value is None:
+        value = 1
+        db.execute(insert(ChangeCounter).values(id=1, value=value))
+    return value
+
+
+def record_removals(db: Session, cluster_ids: Iterable[int], change_seq: int) -> None:
+    """O‘chiriladigan klasterlar uchun belgilar (bitta executemany)."""
+    rows = [{"cluster_id": cluster_id, "change_seq": change_seq} for cluster_id in cluster_ids]
+    if rows:
+        db.execute(insert(ChangeTombstone), rows)
+
+
+def _visible():
+    return (Cluster.status == "approved", Cluster.is_active == True)  # noqa: E712
+
+
+async def _window(db: AsyncSession, since: int, limit: int):
+    """
+    (upto, has_more): since dan keyingi birinchi ~limit ta o‘zgarish
+    chegarasi. Bitta change_seq (masalan, katta import) bo‘linmaydi.
+    """
+    # har bir jadvaldan limit+1 tadan (SQLite compound a'zolarida LIMIT
+    # uchun ichki subquery kerak)
+    heads = [
+        select(column.label("seq")).where(column > since).order_by(column).limit(limit + 1).subquery()
+        for column in (ClusterReport.change_seq, Cluster.change_seq, ChangeTombstone.change_seq)
+    ]
+    seqs = union_all(*(select(head.c.seq) for head in heads)).subquery()
+    values: List[int] = list((await db.execute(
+        select(seqs.c.seq).order_by(seqs.c.seq).limit(limit + 1)
+    )).scalars())
+    if len(values) <= limit:
+        return (values[-1] if values else since), False
+    boundary = values[limit]
+    # chegaradagi change_seq to‘liq keyingi sahifaga qoladi; birinchi
+    # change_seq ning o‘zi limitdan katta bo‘lsa – u butunligicha beriladi
+    return (boundary - 1 if boundary - 1 >= values[0] else boundary), True
+
+
+async def changes_page(db: AsyncSession, since: int, limit: int = CHANGES_DEFAULT_LIMIT) -> Dict[str, Any]:
+    """
+    {
+      "since": 10, "cursor": 42, "has_more": false,
+      "removed":  [cluster_id, ...],
+      "clusters": [{"id", "name", "district_code", "district", "visible": true}
+                   | {"id", "visible": false}, ...],
+      "reports":  [{"cluster_id", "year", "production", ...}, ...]
+    }
+    Mijoz tartib bilan qo‘llaydi: removed (klaster va hisobotlarini
+    o‘chirish), clusters (visible=false – klaster hisobotlarini yashirish),
+    reports (qo‘shish/yangilash). Ko‘rinishi o‘zgargan klasterning barcha
+    hisobotlari qayta beriladi. Keyingi so‘rov: since=<cursor>.
+    """
+    upto, has_more = await _window(db, since, limit)
+    page: Dict[str, Any] = {"since": since, "cursor": upto, "has_more": has_more,
+                            "removed": [], "clusters": [], "reports": []}
+    if upto <= since:
+        return page
+
+    def in_window(column):
+        return (column > since, column <= upto)
+
+    page["removed"] = list(dict.fromkeys((await db.execute(
+        select(ChangeTombstone.cluster_id)
+        .where(*in_window(ChangeTombstone.change_seq))
+        .order_by(ChangeTombstone.change_seq)
+    )).scalars()))
+
+    clusters = await db.execute(
+        select(
+            Cluster.id, Cluster.name, Cluster.district_code,
+            (Cluster.status == "approved") & (Cluster.is_active == True),  # noqa: E712
+        )
+        .where(*in_window(Cluster.change_seq))
+        .order_by(Cluster.id)
+    )
+    for cluster_id, name, district_code, visible in clusters:
+        if visible:
+            page["clusters"].append({
+                "id": cluster_id,
+                "name": name,
+                "district_code": district_code,
+                "district": district_cache.get(district_code) or district_code,
+                "visible": True,
+            })
+        else:
+            page["clusters"].append({"id": cluster_id, "visible": False})
+
+    # o‘zgargan hisobotlar + ko‘rinishi o‘zgargan klasterlarning barcha
+    # hisobotlari (ikkala tarmoq ham change_seq indeksidan)
+    report_columns = [ClusterReport.id, ClusterReport.cluster_id, ClusterReport.year,
+                      *(getattr(ClusterReport, f) for f in REPORT_FIELDS)]
+    changed = union(
+        select(*report_columns)
+        .join(Cluster, Cluster.id == ClusterReport.cluster_id)
+        .where(*in_window(ClusterReport.change_seq), *_visible()),
+        select(*report_columns)
+        .join(Cluster, Cluster.id == ClusterReport.cluster_id)
+        .where(*in_window(Cluster.change_seq), *_visible()),
+    ).subquery()
+    rows = await db.execute(
+        select(changed.c.cluster_id, changed.c.year, *(changed.c[f] for f in REPORT_FIELDS))
+        .order_by(changed.c.cluster_id, changed.c.year)
+    )
+    keys = ("cluster_id", "year") + REPORT_FIELDS
+    page["reports"] = [dict(zip(keys, row)) for row in rows]
+    return page
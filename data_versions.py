@@ -0,0 +1,152 @@
+# data_versions.py
+"""
+Bir nechta uvicorn worker (yoki konteyner) orasida kesh muvofiqligi.
+
+cache.py dagi data version – process ichidagi hisoblagich: boshqa worker
+hisobot yoki admin qarorini commit qilsa, bu processning snapshotlari,
+tumanlar keshi va token bekor qilish to‘plami eskirib qolardi. Shuning
+uchun bazada har bir domen uchun umumiy versiya saqlanadi:
+
+    data_versions(domain PRIMARY KEY, version)
+    domenlar: reports, clusters, users, districts
+
+Yozuvchi yo‘llar o‘z tranzaksiyasi ichida mark_changed(db, ...) chaqiradi
+(bitta UPDATE ... RETURNING), commitdan keyin – committed(versions): shu
+process keshlari darhol eskiradi, ko‘rilgan versiya esa faqat oraliqda
+boshqa process yozmagan bo‘lsa yangilanadi.
+
+Boshqa processlarning o‘zgarishlari fon vazifasi (watch) orqali
+DATA_VERSION_CHECK_MS da bir marta tekshiriladi: bitta PK bo‘yicha o‘qish
+(4 qator). Versiya oshgan domenlar uchun lokal data version oshiriladi va
+on_change() bilan ro‘yxatdan o‘tgan qayta yuklovchilar chaqiriladi.
+Tashqi kesh serveri (Redis) kerak emas; eskirish – ko‘pi bilan
+DATA_VERSION_CHECK_MS.
+
+Sozlamalar (muhit o‘zgaruvchilari):
+    DATA_VERSION_CHECK_MS – tekshirish oralig‘i (standart: 1000; 0 – o‘chirilgan,
+                            bitta process uchun)
+"""
+import asyncio
+import os
+import threading
+from typing import Callable, Dict, Iterable, List
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from cache import bump_data_version
+from database import AsyncReadSessionLocal, dialect_insert
+from models import DataVersion
+
+DATA_VERSION_CHECK_MS = int(os.getenv("DATA_VERSION_CHECK_MS", "1000"))
+
+REPORTS = "reports"
+CLUSTERS = "clusters"
+USERS = "users"
+DISTRICTS = "districts"
+DOMAINS = (REPORTS, CLUSTERS, USERS, DISTRICTS)
+
+# snapshot keshlari (agrodata, summary, COUNT) shu domenlardan quriladi
+_SNAPSHOT_DOMAINS = frozenset((REPORTS, CLUSTERS, DISTRICTS))
+
+# shu process ko‘rgan oxirgi versiyalar
+_seen: Dict[str, int] = {}
+_seen_lock = threading.Lock()
+_listeners: Dict[str, List[Callable[[], None]]] = {}
+
+
+def ensure_rows(db: Session) -> None:
+    """Startupda: yetishmayotgan domen qatorlari (bitta INSERT, commit chaqiruvchida)."""
+    insert = dialect_insert(db.get_bind().dialect.name)
+    db.execute(
+        insert(DataVersion.__table__)
+        .values([{"domain": domain, "version": 0} for domain in DOMAINS])
+        .on_conflict_do_nothing(index_elements=["domain"])
+    )
+
+
+def load(db: Session) -> None:
+    """Startupda: joriy versiyalar ko‘rilgan deb belgilanadi (qayta yuklash shart emas)."""
+    rows = db.execute(select(DataVersion.domain, DataVersion.version)).all()
+    with _seen_lock:
+        _seen.update(dict(rows))
+
+
+def mark_changed(db: Session, *domains: str) -> Dict[str, int]:
+    """
+    Domen versiyalarini oshiradi – yozuvchi tranzaksiya ichida, commitdan
+    oldin. Yangi versiyalar qaytariladi (committed() uchun).
+    """
+    rows = db.execute(
+        update(DataVersion)
+        .where(DataVersion.domain.in_(domains))
+        .values(version=DataVersion.version + 1)
+        .returning(DataVersion.domain, DataVersion.version)
+        .execution_options(synchronize_session=False)
+    ).all()
+    return dict(rows)
+
+
+def _advance(versions: Dict[str, int]) -> List[str]:
+    with _seen_lock:
+        changed = [domain for domain, version in versions.items() if version > _seen.get(domain, 0)]
+        for domain in changed:
+            _seen[domain] = versions[domain]
+    return changed
+
+
+def committed(versions: Dict[str, int]) -> None:
+    """
+    Commitdan keyin: shu process keshlari darhol eskiradi. Versiya faqat
+    ko‘rilganidan roppa-rosa bittaga oshgan bo‘lsa (ya'ni faqat shu
+    yozuv) ko‘rilgan deb belgilanadi – watch() uni qayta yuklamaydi, lokal
+    yozuvchi yo‘l to‘plamlarni o‘zi yangilaydi. Oraliqda boshqa process
+    ham oshirgan bo‘lsa _seen o‘zgarmaydi: uning o‘zgarishini keyingi
+    check() qayta yuklovchilar bilan oladi.
+    """
+    with _seen_lock:
+        for domain, version in versions.items():
+            if version == _seen.get(domain, 0) + 1:
+                _seen[domain] = version
+    bump_data_version()
+
+
+def on_change(domain: str, reload: Callable[[], None]) -> None:
+    """Boshqa process domenni o‘zgartirganda chaqiriladi (threadpoolda)."""
+    _listeners.setdefault(domain, []).append(reload)
+
+
+async def check() -> List[str]:
+    """Umumiy versiyalarni bir marta o‘qiydi; o‘zgargan domenlar qaytariladi."""
+    async with AsyncReadSessionLocal() as db:
+        rows = (await db.execute(select(DataVersion.domain, DataVersion.version))).all()
+    changed = _advance(dict(rows))
+    if not changed:
+        return changed
+    if _SNAPSHOT_DOMAINS.intersection(changed):
+        bump_data_version()
+    for domain in changed:
+        for reload in _listeners.get(domain, ()):
+            await asyncio.to_thread(reload)
+    return changed
+
+
+async def watch(interval_ms: int = DATA_VERSION_CHECK_MS) -> None:
+    """Lifespan fon vazifasi: har interval_ms da check()."""
+    while True:
+        await asyncio.sleep(interval_ms / 1000)
+        try:
+            changed = await check()
+        except Exception as exc:  # baza vaqtincha band – keyingi aylanishda
+            print(f"[VERSIONS] versiyalarni o‘qib bo‘lmadi: {exc!r}")
+            continue
+        if changed:
+            print(f"[VERSIONS] boshqa process o‘zgartirdi: {', '.join(changed)}")
+
+
+def touched_by(actions: Iterable[str]) -> tuple:
+    """Moderatsiya amallari ta'sir qiladigan domenlar (o‘chirish – kaskad)."""
+    domains = {CLUSTERS}
+    if any(action in ("delete", "archive") for action in actions):
+        domains.update((REPORTS, USERS))
+    return tuple(sorted(domains))
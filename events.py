@@ -0,0 +1,218 @@
+# events.py
+"""
+Jarayon ichidagi (in-process) hodisalar markazi – Server-Sent Events.
+
+Panellar /api/agrodata va admin ro‘yxatlarini taymer bilan so‘rash o‘rniga
+SSE oqimiga ulanadi va faqat nima o‘zgarganini bildiruvchi kichik
+hodisalarni oladi (cluster_id, year, yangi holat) – keyin faqat kerakli
+qismni qayta so‘raydi.
+
+Yozuvchi endpointlar commitdan keyin publish() chaqiradi. Ular odatda
+threadpoolda ishlaydi, shuning uchun hodisa event loop ga
+loop.call_soon_threadsafe orqali uzatiladi. Hodisa bir marta SSE
+kadriga (bayt) aylantiriladi va barcha obunachilarga tarqatiladi.
+
+Bo‘sh turgan ulanish deyarli hech narsa sarflamaydi: obunachi
+asyncio.Event ni kutadi, SSE_KEEPALIVE_SECONDS da bir marta izoh qatori
+yuboriladi (proxy ulanishni uzmasligi uchun).
+
+Sozlamalar (muhit o‘zgaruvchilari):
+    SSE_KEEPALIVE_SECONDS – keep-alive oralig‘i (standart: 15)
+    SSE_MAX_CLIENTS       – bir vaqtdagi ulanishlar chegarasi (standart: 1000)
+    SSE_QUEUE_SIZE        – sekin mijoz uchun navbat; to‘lsa "resync" hodisasi
+    SSE_REPLAY_SIZE       – Last-Event-ID bilan qayta ulanganda qayta
+                            yuboriladigan so‘nggi hodisalar soni
+"""
+import asyncio
+import itertools
+import os
+import threading
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from responses import encode_json
+
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+SSE_MAX_CLIENTS = int(os.getenv("SSE_MAX_CLIENTS", "1000"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "256"))
+SSE_REPLAY_SIZE = int(os.getenv("SSE_REPLAY_SIZE", "256"))
+
+# Mavzular: agrodata – ommaviy (viloyat paneli), admin – faqat admin uchun
+TOPIC_AGRODATA = "agrodata"
+TOPIC_ADMIN = "admin"
+
+_KEEPALIVE_FRAME = b": ping\n\n"
+_RESYNC_EVENT = "resync"
+
+
+def _frame(event_id: int, event: str, data: dict) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event.encode(), encode_json(data))
+
+
+class _Subscriber:
+    __slots__ = ("topics", "frames", "wakeup", "lagged")
+
+    def __init__(self, topics: FrozenSet[str]):
+        self.topics = topics
+        self.frames: Deque[bytes] = deque()
+        self.wakeup = asyncio.Event()
+        self.lagged = False
+
+    def push(self, frame: bytes) -> None:
+        if len(self.frames) >= SSE_QUEUE_SIZE:
+            # mijoz ulgurmayapti – navbatni tashlab, to‘liq qayta yuklashni so‘raymiz
+            self.frames.clear()
+            self.lagged = True
+        else:
+            self.frames.append(frame)
+        self.wakeup.set()
+
+
+class EventHub:
+    """
+    Obunachilar faqat event loop ichida o‘zgartiriladi; publish() istalgan
+    threaddan chaqirilishi mumkin.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Set[_Subscriber] = set()
+        self._ids = itertools.count(1)
+        self._ids_lock = threading.Lock()
+        # (id, mavzu, kadr) – Last-Event-ID bilan qayta ulanganlar uchun
+        self._recent: Deque[Tuple[int, str, bytes]] = deque(maxlen=SSE_REPLAY_SIZE)
+        self._closed = False
+
+    # ---- hayot sikli (lifespan) ----
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._closed = False
+
+    def close(self) -> None:
+        """Barcha oqimlarni yakunlaydi (server to‘xtayotganda)."""
+        self._closed = True
+        for subscriber in self._subscribers:
+            subscriber.wakeup.set()
+        self._loop = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscribers) >= SSE_MAX_CLIENTS
+
+    # ---- nashr qilish ----
+
+    def publish(self, topic: str, event: str, data: dict) -> None:
+        """
+        Hodisani barcha mos obunachilarga yuboradi. Threadpooldan ham,
+        event loop ichidan ham chaqirish mumkin; loop yo‘q bo‘lsa
+        (skriptlar, testlar) hodisa tashlab yuboriladi.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        with self._ids_lock:
+            event_id = next(self._ids)
+        frame = _frame(event_id, event, data)
+        try:
+            loop.call_soon_threadsafe(self._fanout, event_id, topic, frame)
+        except RuntimeError:  # loop yopilgan
+            pass
+
+    def _fanout(self, event_id: int, topic: str, frame: bytes) -> None:
+        self._recent.append((event_id, topic, frame))
+        for subscriber in self._subscribers:
+            if topic in subscriber.topics:
+                subscriber.push(frame)
+
+    # ---- obuna ----
+
+    def _replay(self, subscriber: _Subscriber, last_event_id: int) -> None:
+        if self._recent and self._recent[0][0] > last_event_id + 1:
+            # oraliqdagi hodisalar buferdan chiqib ketgan
+            subscriber.lagged = True
+            subscriber.wakeup.set()
+            return
+        for event_id, topic, frame in self._recent:
+            if event_id > last_event_id and topic in subscriber.topics:
+                subscriber.push(frame)
+
+    async def stream(self, topics: Iterable[str], last_event_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        SSE kadrlari oqimi (StreamingResponse uchun). Ulanishlar chegarasi
+        (full) endpointda tekshiriladi. Mijoz uzilganda Starlette
+        generatorni bekor qiladi – obuna finally da olib tashlanadi.
+        """
+        subscriber = _Subscriber(frozenset(topics))
+        self._subscribers.add(subscriber)
+        # obuna bilan bir vaqtda (await siz) – hodisa ikki marta kelmaydi
+        if last_event_id is not None:
+            self._replay(subscriber, last_event_id)
+        try:
+            # brauzer uzilsa 3 soniyadan keyin qayta ulanadi
+            yield b"retry: 3000\n\n"
+            while not self._closed:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield _KEEPALIVE_FRAME
+                    continue
+                subscriber.wakeup.clear()
+                if subscriber.lagged:
+                    subscriber.lagged = False
+                    with self._ids_lock:
+                        event_id = next(self._ids)
+                    yield _frame(event_id, _RESYNC_EVENT, {})
+                frames = list(subscriber.frames)
+                subscriber.frames.clear()
+                if frames:
+                    yield b"".join(frames)
+        finally:
+            self._subscribers.discard(subscriber)
+
+
+hub = EventHub()
+
+
+# ============================================================
+#  Yozuvchi endpointlar uchun qisqa yordamchilar
+# ============================================================
+
+# moderatsiya amali -> klasterning yangi holati (unblock – oldingi holatga
+# bog‘liq, status null: mijoz qayta so‘raydi)
+_ACTION_STATUS: Dict[str, str] = {
+    "approve": "approved",
+    "reject": "rejected",
+    "block": "blocked",
+    "delete": "deleted",
+    "archive": "archived",
+}
+
+
+def report_changed(cluster_id: int, year: int) -> None:
+    hub.publish(TOPIC_AGRODATA, "report", {"cluster_id": cluster_id, "year": year})
+
+
+def reports_imported(cluster_id: Optional[int], years: Iterable[int], rows: int) -> None:
+    hub.publish(TOPIC_AGRODATA, "import", {"cluster_id": cluster_id, "years": sorted(years), "rows": rows})
+
+
+def cluster_registered(cluster_id: int) -> None:
+    hub.publish(TOPIC_ADMIN, "cluster", {"cluster_id": cluster_id, "action": "register", "status": "pending"})
+
+
+def cluster_moderated(cluster_id: int, action: str) -> None:
+    status = _ACTION_STATUS.get(action)
+    hub.publish(TOPIC_ADMIN, "cluster", {"cluster_id": cluster_id, "action": action, "status": status})
+    # tasdiqlash/bloklash/o‘chirish klaster qatorlarining /api/agrodata da
+    # ko‘rinishini o‘zgartiradi; rad etilgan (pending) klaster u yerda yo‘q edi
+    if action != "reject":
+        hub.publish(TOPIC_AGRODATA, "visibility", {"cluster_id": cluster_id})
+
+
+def job_finished(job_id: int, kind: str, status: str) -> None:
+    hub.publish(TOPIC_ADMIN, "job", {"job_id": job_id, "kind": kind, "status": status})
@@ -0,0 +1,111 @@
+# hashing.py
+"""
+Parol xeshlash (pbkdf2_sha256) va uni alohida process poolda bajarish.
+
+pbkdf2 ataylab sekin: ertalabki login to‘lqinida u request worker
+threadlarini band qilib, boshqa endpointlarni ham kutib qoldiradi.
+Shuning uchun login/register xeshlashni cheklangan process poolga
+yuboradi va natijani await qiladi – event loop ham, threadpool ham band
+bo‘lmaydi.
+
+Sozlamalar (muhit o‘zgaruvchilari):
+    HASH_POOL_SIZE    – jarayonlar soni (standart: CPU yadrolari soni,
+                        0 – pool o‘chirilgan, threadpoolda bajariladi)
+    HASH_QUEUE_DEPTH  – bir vaqtda kutayotgan/bajarilayotgan xeshlar
+                        chegarasi; oshsa HashPoolBusy (503) qaytadi
+
+Bu modul ataylab yengil (faqat passlib): pool jarayonlari uni import qiladi.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", str(os.cpu_count() or 1)))
+HASH_QUEUE_DEPTH = int(os.getenv("HASH_QUEUE_DEPTH", str(max(HASH_POOL_SIZE, 1) * 8)))
+
+
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+# ============================================================
+#  Process pool
+# ============================================================
+
+class HashPoolBusy(RuntimeError):
+    """Navbat to‘lgan – so‘rovni keyinroq qaytarish kerak."""
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = HASH_POOL_SIZE
+_queue_depth = HASH_QUEUE_DEPTH
+_in_flight = 0
+_lock = threading.Lock()
+
+
+def init_pool(size: Optional[int] = None, queue_depth: Optional[int] = None) -> None:
+    """
+    Poolni qayta sozlaydi (eski pool yopiladi). Jarayonlar birinchi
+    xeshda ishga tushadi.
+    """
+    global _pool_size, _queue_depth
+    shutdown_pool()
+    with _lock:
+        if size is not None:
+            _pool_size = size
+        if queue_depth is not None:
+            _queue_depth = queue_depth
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    with _lock:
+        if _pool is None and _pool_size > 0:
+            # "spawn" – ishlayotgan server threadlari bilan fork qilmaslik uchun
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+async def _run(fn: Callable[..., Any], *args: Any) -> Any:
+    global _in_flight
+    with _lock:
+        if _in_flight >= _queue_depth:
+            raise HashPoolBusy("Xeshlash navbati to‘lgan.")
+        _in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        # pool o‘chirilgan bo‘lsa (HASH_POOL_SIZE=0) – standart threadpool executor
+        return await loop.run_in_executor(_get_pool(), fn, *args)
+    finally:
+        with _lock:
+            _in_flight -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run(verify_password, plain_password, hashed_password)
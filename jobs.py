@@ -0,0 +1,429 @@
+# jobs.py
+"""
+Fon vazifalari (background jobs) – og‘ir admin amallari uchun.
+
+Endpoint vazifani jobs jadvaliga (agro.db) yozadi va darhol 202 + job id
+qaytaradi; so‘rov kechikishi vazifa hajmiga bog‘liq bo‘lmaydi, proxy
+(Railway) timeoutiga ham tushmaydi. Vazifalarni lifespan da ishga
+tushiriladigan worker threadlar bajaradi.
+
+Navbat – jadvalning o‘zi: worker eng eski status='queued' qatorni bitta
+UPDATE ... WHERE status='queued' RETURNING bilan egallaydi, shuning uchun
+bir nechta uvicorn worker (process) bir vazifani ikki marta olmaydi.
+Yangi vazifa shu processda qo‘shilsa workerlar darhol uyg‘otiladi,
+boshqa processlar qo‘shganlari JOB_POLL_SECONDS da bir topiladi.
+
+Vazifa fayli (import uchun yuklangan CSV/JSONL) vazifa bilan bitta
+tranzaksiyada job_payloads jadvaliga bo‘laklab yoziladi: vazifani boshqa
+process yoki konteyner olsa ham faylni o‘qiy oladi (lokal /tmp faqat
+yuklagan processga ko‘rinardi). Vazifa tugagach bo‘laklar o‘chiriladi.
+
+Egallangan vazifa ijaraga (lease) olinadi: owner (host:pid:runner) va
+lease_expires_at yoziladi, heartbeat thread ishlayotgan vazifalar
+ijarasini har JOB_LEASE_SECONDS/4 da uzaytiradi. Worker, process yoki
+konteyner to‘xtasa ijara uzaytirilmaydi: muddati o‘tgan vazifani istalgan
+process qayta navbatga qo‘yadi (JOB_MAX_ATTEMPTS urinishdan keyin –
+failed). Shuning uchun handlerlar qayta bajarilishga chidamli
+(idempotent) bo‘lishi kerak. SQLite da heartbeat vazifaning o‘z yozish
+tranzaksiyasi ortida kutishi mumkin – lekin ijarani boshqa process ham
+faqat shu qulf bo‘shagach qaytarib ola oladi; natija faqat ijara egasi
+tomonidan yoziladi.
+
+Jarayon (progress) xotirada saqlanadi va jadvalga faqat tugaganda
+yoziladi: SQLite da yozuvchi bitta – import tranzaksiyasi davomida
+alohida UPDATE kutib qolgan bo‘lardi. Holat endpointi ishlayotgan
+vazifaning jonli progressini shu processdan oladi.
+
+Sozlamalar (muhit o‘zgaruvchilari):
+    JOB_WORKERS          – worker threadlar soni (standart: 2; 0 – o‘chirilgan)
+    JOB_POLL_SECONDS     – navbatni tekshirish oralig‘i (standart: 2)
+    JOB_LEASE_SECONDS    – vazifa ijarasi, sekund: heartbeatsiz shuncha vaqt
+                           o‘tsa vazifa qayta navbatga qo‘yiladi (standart: 60)
+    JOB_MAX_ATTEMPTS     – urinishlar soni, keyin failed (standart: 3)
+    JOB_RETENTION_DAYS   – tugagan vazifalar saqlanadigan muddat (standart: 7)
+    JOB_PAYLOAD_CHUNK_BYTES – vazifa fayli bo‘lagi hajmi, bayt (standart: 1 MiB)
+    JOB_SHUTDOWN_TIMEOUT – to‘xtashda ishlayotgan vazifalarni kutish, sekund
+"""
+import io
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from events import job_finished
+from models import Job, JobPayload
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_HEARTBEAT_SECONDS = JOB_LEASE_SECONDS / 4
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+JOB_PAYLOAD_CHUNK_BYTES = int(os.getenv("JOB_PAYLOAD_CHUNK_BYTES", str(1024 * 1024)))
+JOB_SHUTDOWN_TIMEOUT = float(os.getenv("JOB_SHUTDOWN_TIMEOUT", "30"))
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+
+class JobFailed(Exception):
+    """Kutilgan xato: xabari vazifaning error maydoniga yoziladi."""
+
+
+class JobContext:
+    """Handlerga beriladi: parametrlar va progress xabari."""
+
+    def __init__(self, runner: "JobRunner", job_id: int, params: Dict[str, Any]):
+        self.job_id = job_id
+        self.params = params
+        self._runner = runner
+
+    def progress(self, done: int, total: Optional[int] = None) -> None:
+        self._runner._live[self.job_id] = (done, total)
+
+    def open_payload(self, db: Session) -> BinaryIO:
+        """Vazifa fayli (submit(payload=...)) – db sessiyasi orqali bo‘laklab o‘qiladi."""
+        return io.BufferedReader(_PayloadReader(db, self.job_id), JOB_PAYLOAD_CHUNK_BYTES)
+
+
+Handler = Callable[[JobContext], Optional[Dict[str, Any]]]
+
+_HANDLERS: Dict[str, Handler] = {}
+
+
+def job_handler(kind: str):
+    """
+    Vazifa turi uchun handler:
+        @job_handler("import_reports")
+        def _import_reports_job(ctx: JobContext) -> dict: ...
+    Qaytgan dict – vazifa natijasi (result).
+    """
+    def decorator(fn: Handler) -> Handler:
+        _HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def _store_payload(db: Session, job_id: int, fileobj: BinaryIO) -> None:
+    """Faylni job_payloads ga bo‘laklab yozadi (xotirada bitta bo‘lak)."""
+    seq = 0
+    while True:
+        data = fileobj.read(JOB_PAYLOAD_CHUNK_BYTES)
+        if not data:
+            return
+        db.execute(insert(JobPayload).values(job_id=job_id, seq=seq, data=data))
+        seq += 1
+
+
+class _PayloadReader(io.RawIOBase):
+    """job_payloads bo‘laklarini seq tartibida o‘qiydigan fayl obyekti."""
+
+    def __init__(self, db: Session, job_id: int):
+        self._db = db
+        self._job_id = job_id
+        self._seq = 0
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._pending:
+            data = self._db.execute(
+                select(JobPayload.data).where(JobPayload.job_id == self._job_id, JobPayload.seq == self._seq)
+            ).scalar()
+            if data is None:
+                return 0
+            self._seq += 1
+            self._pending = memoryview(data)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() + "Z" if value is not None else None
+
+
+def job_to_dict(job: Job, live: Optional[Tuple[int, Optional[int]]] = None) -> Dict[str, Any]:
+    done, total = live if live is not None else (job.progress_done, job.progress_total)
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "progress": {"done": done, "total": total},
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_by": job.created_by,
+        "created_at": _iso(job.created_at),
+        "started_at": _iso(job.started_at),
+        "finished_at": _iso(job.finished_at),
+    }
+
+
+class JobRunner:
+    def __init__(self):
+        self._threads: List[threading.Thread] = []
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._heartbeat_stop = threading.Event()
+        self._wakeup = threading.Event()
+        # jobs.owner: boshqa host/process/runner ijarasidan ajratish uchun
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # job_id -> (done, total): shu processda ishlayotgan vazifalar
+        self._live: Dict[int, Tuple[int, Optional[int]]] = {}
+
+    # ---- hayot sikli (lifespan) ----
+
+    def start(self, workers: int = JOB_WORKERS) -> None:
+        self._recover()
+        self._stop.clear()
+        for n in range(workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if workers:
+            self._heartbeat_stop.clear()
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+            self._heartbeat_thread.start()
+        print(f"[JOBS] {workers} ta worker ishga tushdi")
+
+    def stop(self, timeout: float = JOB_SHUTDOWN_TIMEOUT) -> None:
+        """Yangi vazifa olinmaydi; ishlayotganlari timeout gacha kutiladi."""
+        self._stop.set()
+        self._wakeup.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in self._threads):
+            print(f"[JOBS] {len(self._live)} ta vazifa tugamay qoldi (to‘xtatish timeouti)")
+        self._threads = []
+        # tugamay qolgan vazifalar ijarasi endi uzaytirilmaydi – boshqa
+        # process ularni muddat o‘tgach qayta navbatga qo‘yadi
+        self._heartbeat_stop.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join(max(0.0, deadline - time.monotonic()))
+            self._heartbeat_thread = None
+
+    @property
+    def running_count(self) -> int:
+        return len(self._live)
+
+    def live_progress(self, job_id: int) -> Optional[Tuple[int, Optional[int]]]:
+        return self._live.get(job_id)
+
+    # ---- navbatga qo‘shish ----
+
+    def submit(
+        self,
+        db: Session,
+        kind: str,
+        params: Dict[str, Any],
+        created_by: Optional[str] = None,
+        payload: Optional[BinaryIO] = None,
+    ) -> int:
+        """
+        Vazifani yozadi va commit qiladi (bitta INSERT ... RETURNING).
+        payload – vazifa fayli: shu tranzaksiyada job_payloads ga yoziladi,
+        handler ctx.open_payload(db) bilan o‘qiydi.
+        """
+        if kind not in _HANDLERS:
+            raise ValueError(f"Noma'lum vazifa turi: {kind}")
+        job_id = db.execute(
+            insert(Job)
+            .values(kind=kind, status="queued", params=json.dumps(params), created_by=created_by,
+                    progress_done=0, created_at=datetime.utcnow())
+            .returning(Job.id)
+        ).scalar_one()
+        if payload is not None:
+            _store_payload(db, job_id, payload)
+        db.commit()
+        self._wakeup.set()
+        return job_id
+
+    # ---- worker ----
+
+    def _recover(self) -> None:
+        """Startupda: ijarasi o‘tgan vazifalar va eski tugagan vazifalar."""
+        self._reclaim_expired()
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            # tugagan vazifalar fayllari (odatda tugashda o‘chiriladi)
+            db.execute(
+                delete(JobPayload)
+                .where(JobPayload.job_id.in_(select(Job.id).where(Job.status.in_(FINISHED_STATUSES))))
+                .execution_options(synchronize_session=False)
+            )
+            purged = db.execute(
+                delete(Job)
+                .where(Job.status.in_(FINISHED_STATUSES), Job.finished_at < now - timedelta(days=JOB_RETENTION_DAYS))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+        if purged:
+            print(f"[JOBS] {purged} ta eski vazifa o‘chirildi")
+
+    def _reclaim_expired(self) -> Tuple[int, int]:
+        """
+        Ijarasi o‘tgan "running" vazifalar (egasi to‘xtagan): urinishlar
+        JOB_MAX_ATTEMPTS dan kam bo‘lsa – qayta navbatga, aks holda failed.
+        (qayta navbatga qo‘yilganlar soni, failed lar soni) qaytaradi.
+        """
+        now = datetime.utcnow()
+        # ijarasiz "running" – migratsiyadan oldingi qatorlar
+        expired = (Job.status == "running", or_(Job.lease_expires_at < now, Job.lease_expires_at.is_(None)))
+        with SessionLocal() as db:
+            # odatda yo‘q – yozish qulfini olmaslik uchun avval arzon o‘qish
+            if db.execute(select(Job.id).where(*expired).limit(1)).first() is None:
+                return 0, 0
+            requeued = db.execute(
+                update(Job)
+                .where(*expired, Job.attempts < JOB_MAX_ATTEMPTS)
+                .values(status="queued", owner=None, lease_expires_at=None)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            failed = db.execute(
+                update(Job)
+                .where(*expired)
+                .values(
+                    status="failed",
+                    error=f"Vazifa tugallanmadi: worker to‘xtadi ({JOB_MAX_ATTEMPTS} urinish).",
+                    owner=None,
+                    lease_expires_at=None,
+                    finished_at=now,
+                )
+                .returning(Job.id, Job.kind)
+                .execution_options(synchronize_session=False)
+            ).all()
+            if failed:
+                db.execute(delete(JobPayload).where(JobPayload.job_id.in_([row.id for row in failed])))
+            db.commit()
+        if requeued:
+            self._wakeup.set()
+        if requeued or failed:
+            print(f"[JOBS] ijarasi o‘tgan vazifalar: {requeued} ta qayta navbatga, {len(failed)} ta failed")
+        for row in failed:
+            job_finished(row.id, row.kind, "failed")
+        return requeued, len(failed)
+
+    def _renew_leases(self) -> int:
+        """Shu runnerda ishlayotgan vazifalar ijarasini uzaytiradi (bitta UPDATE)."""
+        job_ids = list(self._live)
+        if not job_ids:
+            return 0
+        with SessionLocal() as db:
+            renewed = db.execute(
+                update(Job)
+                .where(Job.id.in_(job_ids), Job.owner == self.owner, Job.status == "running")
+                .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+        return renewed
+
+    def _heartbeat(self) -> None:
+        while not self._heartbeat_stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                self._renew_leases()
+                self._reclaim_expired()
+            except Exception as exc:  # baza band (SQLite: vazifaning o‘z tranzaksiyasi) – keyingi safar
+                print(f"[JOBS] heartbeat: {exc!r}")
+
+    def _claim(self) -> Optional[Tuple[int, str, Dict[str, Any]]]:
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            # bo‘sh navbatda yozish qulfini olmaslik uchun avval arzon o‘qish
+            if db.execute(select(Job.id).where(Job.status == "queued").limit(1)).first() is None:
+                return None
+            oldest = select(Job.id).where(Job.status == "queued").order_by(Job.id).limit(1).scalar_subquery()
+            row = db.execute(
+                update(Job)
+                .where(Job.id == oldest, Job.status == "queued")
+                .values(
+                    status="running",
+                    started_at=now,
+                    owner=self.owner,
+                    lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    attempts=Job.attempts + 1,
+                )
+                .returning(Job.id, Job.kind, Job.params)
+                .execution_options(synchronize_session=False)
+            ).first()
+            db.commit()
+        if row is None:  # boshqa worker ulgurdi
+            return None
+        return row.id, row.kind, json.loads(row.params or "{}")
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = self._claim()
+            except Exception as exc:  # baza vaqtincha band – keyingi aylanishda
+                print(f"[JOBS] navbatni o‘qib bo‘lmadi: {exc!r}")
+                claimed = None
+            if claimed is None:
+                self._wakeup.wait(JOB_POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+            try:
+                self._run(*claimed)
+            except Exception as exc:  # natijani yozib bo‘lmadi – worker to‘xtamasin
+                print(f"[JOBS] #{claimed[0]} natijasini yozib bo‘lmadi: {exc!r}")
+
+    def _run(self, job_id: int, kind: str, params: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        self._live[job_id] = (0, None)
+        result: Optional[Dict[str, Any]] = None
+        error: Optional[str] = None
+        try:
+            handler = _HANDLERS.get(kind)
+            if handler is None:
+                raise JobFailed(f"Noma'lum vazifa turi: {kind}")
+            result = handler(JobContext(self, job_id, params))
+        except JobFailed as exc:
+            error = str(exc)
+        except Exception as exc:
+            error = repr(exc)
+        status = "failed" if error is not None else "succeeded"
+        done, total = self._live.get(job_id, (0, None))
+        try:
+            with SessionLocal() as db:
+                # ijara o‘tib, vazifa boshqa workerga berilgan bo‘lsa – 0 qator
+                owned = db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.owner == self.owner, Job.status == "running")
+                    .values(
+                        status=status,
+                        result=json.dumps(result) if result is not None else None,
+                        error=error,
+                        progress_done=done,
+                        progress_total=total,
+                        finished_at=datetime.utcnow(),
+                        owner=None,
+                        lease_expires_at=None,
+                    )
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if owned:
+                    db.execute(delete(JobPayload).where(JobPayload.job_id == job_id))
+                db.commit()
+        finally:
+            self._live.pop(job_id, None)
+        if not owned:
+            print(f"[JOBS] #{job_id} {kind}: ijara muddati o‘tgan – vazifa qayta navbatga qo‘yilgan, natija yozilmadi")
+            return
+        print(f"[JOBS] #{job_id} {kind}: {status}, {(time.perf_counter() - started) * 1000:.0f} ms"
+              + (f" – {error}" if error else ""))
+        job_finished(job_id, kind, status)
+
+
+runner = JobRunner()
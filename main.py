@@ -1,15 +1,208 @@
 # main.py
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, Literal, Tuple
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
+
+from admin_lists import DEFAULT_LIMIT, MAX_LIMIT, SortKey, cluster_page
+from agro_summary import summary_from_rows, summary_query
+from changes import CHANGES_DEFAULT_LIMIT, CHANGES_MAX_LIMIT, changes_page, ensure_counter, next_change_seq
+from database import (
+    ENGINES,
+    Base,
+    ReadSessionLocal,
+    SessionLocal,
+    dialect_insert,
+    engine,
+    get_async_read_db,
+    get_db,
+    pool_status,
+)
+import data_versions
+import events
+from hashing import shutdown_pool
+import jobs
+from jobs import JobContext, job_handler, job_to_dict
+from metrics import (
+    METRICS_TOKEN,
+    MetricsMiddleware,
+    add_gauge_source,
+    db_budget,
+    install_db_hooks,
+    routes_without_budget,
+)
+from metrics import render as render_metrics
+from migrations import ensure_schema
+from moderation import ModerationBatch, ModerationItem, apply_moderation
+from report_export import MEDIA_TYPES, ExportFormatError, check_format, export_filename, stream_export
+from report_import import ImportFormatError, ReportImporter, detect_format
+from responses import FastJSONResponse, encode_json
+from schemas import AdminClusterPage, ClusterHistory, ClusterHistoryBatch
+from models import District, Cluster, User, ClusterReport, Job
+from auth import (
+    router as auth_router,
+    CurrentUser,
+    get_current_user,
+    get_admin_user,
+    get_password_hash,
+    rebuild_revocations,
+    refresh_cluster_revocations,
+    revoke_clusters,
+)
+from cache import (
+    AVAILABLE_ENCODINGS,
+    Snapshot,
+    agrodata_cache,
+    choose_encoding,
+    district_cache,
+    etag_matches,
+    summary_cache,
+)
+
+# ============================================================
+#  Lifespan: sxema + seed + keshlarni isitish
+# ============================================================
+
+DISTRICTS_SEED = [
+    ("qarshi", "Qarshi tumani"),
+    ("kasbi", "Kasbi tumani"),
+    ("nishon", "Nishon tumani"),
+    ("mirishkor", "Mirishkor tumani"),
+    ("kitob", "Kitob tumani"),
+    ("shahrisabz", "Shahrisabz tumani"),
+    ("guzor", "G‘uzor tumani"),
+]
+
+
+def _prepare_database() -> None:
+    started = time.perf_counter()
+    # 1. Sxema: versiya mos bo‘lsa DDL umuman bajarilmaydi
+    schema = ensure_schema(engine, Base.metadata)
+
+    # 2. Admin foydalanuvchi va tumanlarni seed qilish
+    db: Session = SessionLocal()
+    try:
+        # Admin user (login: admin, parol: admin)
+        if db.execute(select(User.id).where(User.username == "admin")).first() is None:
+            db.add(User(
+                username="admin",
+                hashed_password=get_password_hash("admin"),
+                role="admin",
+                cluster_id=None,
+            ))
+            print("[SEED] Admin foydalanuvchi yaratildi: admin/admin")
+
+        # Tumanlar – bitta INSERT ... ON CONFLICT (code) DO NOTHING
+        insert = dialect_insert(db.get_bind().dialect.name)
+        seeded = db.execute(
+            insert(District.__table__)
+            .values([{"code": code, "name": name} for code, name in DISTRICTS_SEED])
+            .on_conflict_do_nothing(index_elements=["code"])
+        ).rowcount
+        data_versions.ensure_rows(db)
+        ensure_counter(db)
+        if seeded:
+            data_versions.mark_changed(db, data_versions.DISTRICTS)
+        db.commit()
+
+        # 3. Tumanlar keshi, bekor qilingan klaster tokenlari to‘plami va
+        # ular qurilgan umumiy versiyalar
+        data_versions.load(db)
+        district_cache.replace(dict(db.execute(select(District.code, District.name)).all()))
+        rebuild_revocations(db)
+    finally:
+        db.close()
+    print(f"[STARTUP] sxema: {schema}, {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def _reload_districts() -> None:
+    db = ReadSessionLocal()
+    try:
+        district_cache.replace(dict(db.execute(select(District.code, District.name)).all()))
+    finally:
+        db.close()
+
+
+def _reload_revocations() -> None:
+    db = ReadSessionLocal()
+    try:
+        rebuild_revocations(db)
+    finally:
+        db.close()
+
+
+# boshqa process (worker/konteyner) o‘zgartirganda – data_versions.watch()
+data_versions.on_change(data_versions.DISTRICTS, _reload_districts)
+data_versions.on_change(data_versions.CLUSTERS, _reload_revocations)
+
+
+def _warm_agrodata() -> None:
+    # Viloyat panelining standart so‘rovi (/api/agrodata, filtrsiz)
+    key = _agro_cache_key(None, None, AGRO_FIELDS, True)
+    db: Session = ReadSessionLocal()
+    try:
+        snap = agrodata_cache.get_or_build(key, lambda: encode_json(_build_agrodata(db)))
+        # KPI plitkalari (/api/agrodata/summary, filtrsiz)
+        summary_cache.get_or_build(
+            _summary_cache_key(None, None), lambda: encode_json(summary_from_rows(db.execute(summary_query()).all()))
+        )
+    finally:
+        db.close()
+    # eng ko‘p so‘raladigan siqilgan variant (br, bo‘lmasa gzip) ham tayyor bo‘lsin
+    if AVAILABLE_ENCODINGS:
+        snap.encoded(AVAILABLE_ENCODINGS[0])
+
+
+async def _warm_caches(app: FastAPI) -> None:
+    started = time.perf_counter()
+    try:
+        await run_in_threadpool(_warm_agrodata)
+    except Exception as exc:  # kesh keyinroq birinchi so‘rovda quriladi
+        print(f"[STARTUP] agrodata keshini isitib bo‘lmadi: {exc!r}")
+    else:
+        print(f"[STARTUP] agrodata keshi isitildi, {(time.perf_counter() - started) * 1000:.0f} ms")
+    app.state.ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    unbudgeted = routes_without_budget(app.routes)
+    if unbudgeted:
+        print(f"[BUDGET] @db_budget e'lon qilinmagan endpointlar: {', '.join(unbudgeted)}")
+    await run_in_threadpool(_prepare_database)
+    # SSE hodisalari markazi threadpooldagi endpointlardan shu loop ga uzatadi
+    events.hub.start(asyncio.get_running_loop())
+    # og‘ir admin amallari uchun fon workerlari
+    await run_in_threadpool(jobs.runner.start)
+    # boshqa processlar yozuvlari – umumiy versiyalarni davriy tekshirish
+    watcher = asyncio.create_task(data_versions.watch()) if data_versions.DATA_VERSION_CHECK_MS > 0 else None
+    # Keshlar fonda isitiladi: server so‘rov qabul qila boshlaydi,
+    # /ready esa isitish tugaguncha 503 qaytaradi.
+    warmup = asyncio.create_task(_warm_caches(app))
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        warmup.cancel()
+        if watcher is not None:
+            watcher.cancel()
+        # ishlayotgan vazifalar JOB_SHUTDOWN_TIMEOUT gacha kutiladi
+        await run_in_threadpool(jobs.runner.stop)
+        # ochiq SSE oqimlari yakunlansin – aks holda server ularni kutib qoladi
+        events.hub.close()
+        # parol xeshlash process poolini yopish
+        shutdown_pool()
 
-from database import Base, engine, get_db
-from models import District, Cluster, User, ClusterReport
-from auth import router as auth_router, get_current_user, get_admin_user, get_password_hash
 
 # ============================================================
 #  FastAPI ilovasi
@@ -18,7 +211,10 @@ from auth import router as auth_router, get_current_user, get_admin_user, get_pa
 app = FastAPI(
     title="Qashqadaryo agroklaster backend",
     version="0.2.0",
-    description="Klaster panel, admin panel va viloyat paneli uchun backend"
+    description="Klaster panel, admin panel va viloyat paneli uchun backend",
+    lifespan=lifespan,
+    # dict/list javoblar orjson bilan (responses.py)
+    default_response_class=FastJSONResponse,
 )
 
 # CORS (browserdan localhostdan kelayotgan so‘rovlar uchun)
@@ -34,59 +230,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Har bir so‘rov: route/status/kechikish va SQL soni/vaqti (/metrics)
+app.add_middleware(MetricsMiddleware)
+install_db_hooks(ENGINES.values())
+
 # Auth routerini ulaymiz: /auth/login, /auth/register-cluster va hok.
 app.include_router(auth_router)
 
 
-# ============================================================
-#  Startup: jadval yaratish + admin va tumanlarni seed qilish
-# ============================================================
-
-@app.on_event("startup")
-def on_startup():
-    # 1. Jadval strukturasini yaratish
-    Base.metadata.create_all(bind=engine)
-
-    # 2. Admin foydalanuvchi va tumanlarni seed qilish
-    db: Session = next(get_db())
-    try:
-        # Admin user (login: admin, parol: admin)
-        admin = db.query(User).filter(User.username == "admin").first()
-        if not admin:
-            admin = User(
-                username="admin",
-                hashed_password=get_password_hash("admin"),
-                role="admin",
-                cluster_id=None,
-                created_at=datetime.utcnow(),
-            )
-            db.add(admin)
-            print("[SEED] Admin foydalanuvchi yaratildi: admin/admin")
-
-        # Tumanlar (agar yo‘q bo‘lsa)
-        districts_seed = [
-            ("qarshi", "Qarshi tumani"),
-            ("kasbi", "Kasbi tumani"),
-            ("nishon", "Nishon tumani"),
-            ("mirishkor", "Mirishkor tumani"),
-            ("kitob", "Kitob tumani"),
-            ("shahrisabz", "Shahrisabz tumani"),
-            ("guzor", "G‘uzor tumani"),
-        ]
-        for code, name in districts_seed:
-            if not db.query(District).filter(District.code == code).first():
-                db.add(District(code=code, name=name))
-        db.commit()
-    finally:
-        db.close()
-
-
 # ============================================================
 #  Model: joriy foydalanuvchi (faqat type hint uchun)
 # ============================================================
 
-# Agar sizning models.py ichida User klassi bo‘lsa, shundan foydalanamiz.
-# get_current_user shuni qaytaradi.
+# get_current_user token claimlaridan auth.CurrentUser qaytaradi
+# (id, username, role, cluster_id) – bazaga murojaat qilinmaydi.
 
 # ============================================================
 #  Cluster report – klaster xodimi uchun
@@ -112,10 +269,11 @@ class ClusterReportOut(BaseModel):
 
 
 @app.get("/api/cluster-report", response_model=Optional[ClusterReportOut])
-def get_my_cluster_report(
+@db_budget(1)
+async def get_my_cluster_report(
     year: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Joriy klaster foydalanuvchisi uchun tanlangan yil bo‘yicha hisobotni qaytaradi.
@@ -123,22 +281,21 @@ def get_my_cluster_report(
     if current_user.role != "cluster":
         raise HTTPException(status_code=403, detail="Faqat klaster foydalanuvchilari uchun.")
 
-    report = (
-        db.query(ClusterReport)
-        .filter(
+    report = (await db.execute(
+        select(ClusterReport).where(
             ClusterReport.cluster_id == current_user.cluster_id,
             ClusterReport.year == year,
         )
-        .first()
-    )
+    )).scalars().first()
     return report
 
 
 @app.post("/api/cluster-report", response_model=ClusterReportOut)
+@db_budget(3)
 def upsert_my_cluster_report(
     payload: ClusterReportIn,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Joriy klaster foydalanuvchisi uchun yillik hisobotni yaratish/yoki yangilash.
@@ -149,46 +306,99 @@ def upsert_my_cluster_report(
     if current_user.cluster_id is None:
         raise HTTPException(status_code=400, detail="Foydalanuvchi biror klasterga biriktirilmagan.")
 
+    # Bitta SQL: klaster tasdiqlangan va faol bo‘lsagina INSERT ... SELECT
+    # qator beradi; (cluster_id, year) band bo‘lsa – UPDATE. Qator
+    # qaytmasa – klaster yo‘q yoki tasdiqlanmagan (sababi alohida so‘rovda).
+    values = payload.model_dump()
+    fields = list(values)
+    values["change_seq"] = next_change_seq(db)
+    upsert = dialect_insert(db.get_bind().dialect.name)(ClusterReport).from_select(
+        ["cluster_id", *values],
+        select(Cluster.id, *(literal(value) for value in values.values())).where(
+            Cluster.id == current_user.cluster_id,
+            Cluster.status == "approved",
+            Cluster.is_active.is_(True),
+        ),
+    )
+    upsert = upsert.on_conflict_do_update(
+        index_elements=["cluster_id", "year"],
+        set_={name: upsert.excluded[name] for name in values if name != "year"},
+    ).returning(*(ClusterReport.__table__.c[name] for name in fields))
+    report = db.execute(upsert).mappings().first()
+
+    if report is None:
+        db.rollback()
+        if db.query(Cluster.id).filter(Cluster.id == current_user.cluster_id).first() is None:
+            raise HTTPException(status_code=404, detail="Klaster topilmadi.")
+        # Faqat tasdiqlangan klaster ma’lumot kiritishi mumkin
+        raise HTTPException(
+            status_code=403,
+            detail="Klasteringiz hali tasdiqlanmagan yoki faollashtirilmagan."
+        )
+
+    report = dict(report)
+    versions = data_versions.mark_changed(db, data_versions.REPORTS)
+    db.commit()
+    data_versions.committed(versions)
+    events.report_changed(current_user.cluster_id, report["year"])
+    return report
+
+
+def _detect_import_format(file: UploadFile, format: Optional[str]) -> str:
+    try:
+        return detect_format(file.filename, format)
+    except ImportFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def _import_reports(db: Session, fileobj, fmt: str, cluster_id: Optional[int], on_progress=None) -> Dict[str, Any]:
+    importer = ReportImporter(db, cluster_id=cluster_id, on_progress=on_progress)
+    try:
+        result = importer.run(fileobj, fmt)
+        versions = data_versions.mark_changed(db, data_versions.REPORTS) if result["imported"] else {}
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if result["imported"]:
+        data_versions.committed(versions)
+        events.reports_imported(cluster_id, importer.years, result["imported"])
+    return result
+
+
+@app.post("/api/cluster-report/import")
+@db_budget(None)
+def import_my_cluster_reports(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Joriy klaster uchun ko‘p yillik hisobotlarni fayldan yuklash.
+    Format: CSV (sarlavha: year,production,export,employment,profitability)
+    yoki JSONL (har qatorda bitta JSON obyekt).
+    Mavjud yillar yangilanadi. Javobda har bir xato qator raqami bilan qaytadi:
+      { "total_rows": ..., "imported": ..., "error_count": ..., "errors": [{"row": 3, "error": "..."}] }
+    """
+    if current_user.role != "cluster":
+        raise HTTPException(status_code=403, detail="Faqat klaster foydalanuvchilari uchun.")
+
+    if current_user.cluster_id is None:
+        raise HTTPException(status_code=400, detail="Foydalanuvchi biror klasterga biriktirilmagan.")
+
     cluster = db.query(Cluster).filter(Cluster.id == current_user.cluster_id).first()
     if not cluster:
         raise HTTPException(status_code=404, detail="Klaster topilmadi.")
 
-    # Faqat tasdiqlangan klaster ma’lumot kiritishi mumkin
     if cluster.status != "approved" or not getattr(cluster, "is_active", False):
         raise HTTPException(
             status_code=403,
             detail="Klasteringiz hali tasdiqlanmagan yoki faollashtirilmagan."
         )
 
-    report = (
-        db.query(ClusterReport)
-        .filter(
-            ClusterReport.cluster_id == current_user.cluster_id,
-            ClusterReport.year == payload.year,
-        )
-        .first()
-    )
-
-    if not report:
-        # E’TIBOR BERING: created_at argumenti olib tashlandi
-        report = ClusterReport(
-            cluster_id=current_user.cluster_id,
-            year=payload.year,
-            production=payload.production,
-            export=payload.export,
-            employment=payload.employment,
-            profitability=payload.profitability,
-        )
-        db.add(report)
-    else:
-        report.production = payload.production
-        report.export = payload.export
-        report.employment = payload.employment
-        report.profitability = payload.profitability
-
-    db.commit()
-    db.refresh(report)
-    return report
+    return _import_reports(db, file.file, _detect_import_format(file, format), current_user.cluster_id)
 
 
 # ============================================================
@@ -196,8 +406,195 @@ def upsert_my_cluster_report(
 #  Strukturasi: { "2025": { "kasbi": [ {id, name, production,...}, ... ] }, ... }
 # ============================================================
 
+def _snapshot_response(request: Request, snap: Snapshot) -> Response:
+    """
+    Tayyor snapshot baytlarini qaytaradi (kerak bo‘lsa gzip/br bilan siqib),
+    If-None-Match mos kelsa – 304.
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding"), len(snap.body))
+    etag = snap.etag_for(encoding)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if etag_matches(if_none_match, etag) or etag_matches(if_none_match, snap.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=snap.encoded(encoding), media_type="application/json", headers=headers)
+
+
+AGRO_FIELDS = ("production", "export", "employment", "profitability")
+
+
+def _parse_agro_fields(fields: Optional[str]) -> Tuple[Tuple[str, ...], bool]:
+    """
+    ?fields=production,export,trend -> (("production", "export"), True)
+    Ko‘rsatilmasa – barcha ko‘rsatkichlar va trend. Faqat ?fields=trend –
+    barcha ko‘rsatkichlar trendi bilan (ko‘rsatkichsiz trend bo‘sh bo‘lardi).
+    """
+    if not fields:
+        return AGRO_FIELDS, True
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(AGRO_FIELDS) - {"trend"}
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Noma'lum maydon(lar): {', '.join(sorted(unknown))}.",
+        )
+    selected = tuple(f for f in AGRO_FIELDS if f in requested)
+    return selected or AGRO_FIELDS, "trend" in requested
+
+
+def _agro_rows_query(
+    year: Optional[int] = None,
+    district: Optional[str] = None,
+    fields: Tuple[str, ...] = AGRO_FIELDS,
+    with_trend: bool = True,
+):
+    """
+    Hisobotlar + o‘sha klasterning oldingi hisobot yilidagi qiymatlari.
+    Oldingi yil LAG() oyna funksiyasi bilan bitta so‘rovda olinadi –
+    har bir klaster uchun alohida so‘rov yuborilmaydi.
+    Yil, tuman va maydonlar filtri SQL darajasida qo‘llanadi.
+    """
+    window = {
+        "partition_by": ClusterReport.cluster_id,
+        "order_by": ClusterReport.year,
+    }
+    columns = [ClusterReport.cluster_id, ClusterReport.year]
+    if with_trend:
+        columns.append(func.lag(ClusterReport.year).over(**window).label("prev_year"))
+    for field in fields:
+        col = getattr(ClusterReport, field)
+        columns.append(col.label(field))
+        if with_trend:
+            columns.append(func.lag(col).over(**window).label("prev_" + field))
+    reports = select(*columns)
+    if year is not None:
+        # trend uchun oldingi yillar ham kerak – ular LAG dan keyin kesiladi
+        reports = reports.where(ClusterReport.year <= year if with_trend else ClusterReport.year == year)
+    reports = reports.subquery()
+
+    query = (
+        select(reports, Cluster.name, Cluster.district_code, District.name.label("district_name"))
+        .join(Cluster, Cluster.id == reports.c.cluster_id)
+        .join(District, District.code == Cluster.district_code, isouter=True)
+        .where(Cluster.status == "approved", Cluster.is_active == True)  # noqa: E712
+    )
+    if year is not None:
+        query = query.where(reports.c.year == year)
+    if district is not None:
+        query = query.where(Cluster.district_code == district)
+    return query
+
+
+def _trend(current: float, previous: Optional[float]) -> Tuple[float, Optional[float]]:
+    """
+    (farq, foiz) – oldingi yilga nisbatan.
+      - oldingi yil bo‘lmasa – (0, 0);
+      - oldingi qiymat 0 bo‘lsa – foiz None (JSON da null): 0 dan o‘sish
+        foizda aniqlanmagan, 0 esa "o‘zgarishsiz" deb o‘qilardi.
+    """
+    if previous is None:
+        return 0, 0
+    delta = round(current - previous, 4)
+    if previous == 0:
+        return delta, None
+    return delta, round(delta / previous * 100, 2)
+
+
+_AGRO_CASTS = {"production": float, "export": float, "employment": int, "profitability": float}
+
+
+def _agrodata_from_rows(
+    rows,
+    fields: Tuple[str, ...] = AGRO_FIELDS,
+    with_trend: bool = True,
+) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    data: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+
+    for row in rows:
+        year_key = str(row.year)
+        dist_code = row.district_code or "unknown"
+
+        year_dict = data.setdefault(year_key, {})
+        dist_list = year_dict.setdefault(dist_code, [])
+
+        item = {
+            "id": row.cluster_id,
+            "name": row.name,
+            "district": row.district_name or dist_code,
+        }
+        for field in fields:
+            item[field] = _AGRO_CASTS[field](getattr(row, field) or 0)
+
+        if with_trend:
+            trend: Dict[str, Optional[float]] = {}
+            trend_delta: Dict[str, float] = {}
+            for field in fields:
+                previous = getattr(row, "prev_" + field)
+                if row.prev_year is not None and previous is None:
+                    previous = 0
+                trend_delta[field], trend[field] = _trend(item[field], previous)
+            item["trend"] = trend              # oldingi yilga nisbatan, % (null – oldingisi 0)
+            item["trend_delta"] = trend_delta  # oldingi yilga nisbatan, mutlaq farq
+
+        dist_list.append(item)
+
+    return data
+
+
+def _build_agrodata(
+    db: Session,
+    year: Optional[int] = None,
+    district: Optional[str] = None,
+    fields: Tuple[str, ...] = AGRO_FIELDS,
+    with_trend: bool = True,
+) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    rows = db.execute(_agro_rows_query(year, district, fields, with_trend)).all()
+    return _agrodata_from_rows(rows, fields, with_trend)
+
+
+def _agro_cache_key(
+    year: Optional[int],
+    district: Optional[str],
+    fields: Tuple[str, ...],
+    with_trend: bool,
+) -> str:
+    return f"{year}|{district}|{','.join(fields)}|{int(with_trend)}"
+
+
+async def _agrodata_response(
+    request: Request,
+    db: AsyncSession,
+    year: Optional[int],
+    district: Optional[str],
+    fields: Optional[str],
+) -> Response:
+    selected, with_trend = _parse_agro_fields(fields)
+    key = _agro_cache_key(year, district, selected, with_trend)
+
+    async def build() -> bytes:
+        rows = (await db.execute(_agro_rows_query(year, district, selected, with_trend))).all()
+        # dict qurish va JSON – CPU ishi, event loopni band qilmaslik uchun threadda
+        return await run_in_threadpool(
+            lambda: encode_json(_agrodata_from_rows(rows, selected, with_trend))
+        )
+
+    snap = await agrodata_cache.aget_or_build(key, build)
+    return _snapshot_response(request, snap)
+
+
 @app.get("/api/agrodata")
-def get_agrodata(db: Session = Depends(get_db)) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+@db_budget(1)
+async def get_agrodata(
+    request: Request,
+    year: Optional[int] = None,
+    district: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """
     Viloyat paneli uchun barcha yillar bo‘yicha:
     {
@@ -211,7 +608,8 @@ def get_agrodata(db: Session = Depends(get_db)) -> Dict[str, Dict[str, List[Dict
             "export": ...,
             "employment": ...,
             "profitability": ...,
-            "trend": { "production": 0, "export": 0, "employment": 0, "profitability": 0 }
+            "trend": { "production": 12.5, "export": -3.0, ... },       # %
+            "trend_delta": { "production": 40.0, "export": -1.2, ... }  # mutlaq
           },
           ...
         ],
@@ -220,105 +618,268 @@ def get_agrodata(db: Session = Depends(get_db)) -> Dict[str, Dict[str, List[Dict
       ...
     }
     Faqat tasdiqlangan va aktiv klasterlar olinadi.
+    Trend – klasterning oldingi hisobot yiliga nisbatan o‘zgarish
+    (birinchi hisobot yili uchun 0).
+
+    Ixtiyoriy filtrlar:
+      - year=2025          – faqat shu yil
+      - district=kasbi     – faqat shu tuman
+      - fields=production,export,trend – faqat shu ko‘rsatkichlar
+        (id, name, district doim qaytadi; trend ko‘rsatilmasa hisoblanmaydi;
+        fields=trend yolg‘iz – barcha ko‘rsatkichlar trendi bilan)
+
+    Javob data version bo‘yicha keshlanadi (ETag bilan). Ma'lumot o‘zgarmagan
+    bo‘lsa baza ham, JSON encoder ham ishlatilmaydi. Katta javoblar
+    Accept-Encoding bo‘yicha gzip/br bilan siqiladi.
     """
-    # ClusterReport + Cluster + District join
-    rows = (
-        db.query(ClusterReport, Cluster, District)
-        .join(Cluster, Cluster.id == ClusterReport.cluster_id)
-        .join(District, District.code == Cluster.district_code, isouter=True)
-        .filter(Cluster.status == "approved", Cluster.is_active == True)  # noqa: E712
-        .all()
-    )
+    return await _agrodata_response(request, db, year, district, fields)
 
-    data: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
 
-    for report, cluster, district in rows:
-        year_key = str(report.year)
-        dist_code = cluster.district_code or "unknown"
+def _summary_cache_key(year: Optional[int], district: Optional[str]) -> str:
+    return f"{year}|{district}"
 
-        year_dict = data.setdefault(year_key, {})
-        dist_list = year_dict.setdefault(dist_code, [])
 
-        dist_list.append({
-            "id": cluster.id,
-            "name": cluster.name,
-            "district": district.name if district else dist_code,
-            "production": float(report.production or 0),
-            "export": float(report.export or 0),
-            "employment": int(report.employment or 0),
-            "profitability": float(report.profitability or 0),
-            # hozircha trendlarni 0 qilib beramiz – front-end default bilan ishlaydi
-            "trend": {
-                "production": 0,
-                "export": 0,
-                "employment": 0,
-                "profitability": 0,
-            },
-        })
+@app.get("/api/agrodata/summary")
+@db_budget(1)
+async def get_agrodata_summary(
+    request: Request,
+    year: Optional[int] = None,
+    district: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Viloyat paneli KPI plitkalari uchun yig‘ma (tasdiqlangan va faol
+    klasterlar), yil va tuman kesimida hamda viloyat bo‘yicha jami:
+    {
+      "2025": {
+        "region": {
+          "clusters": 42,
+          "production": {"sum": ..., "avg": ...},
+          "export": {"sum": ..., "avg": ...},
+          "employment": {"sum": ..., "avg": ...},
+          "profitability": {"avg": ..., "min": ..., "max": ..., "median": ...}
+        },
+        "districts": {
+          "kasbi": {"district": "Kasbi tumani", "clusters": 5, ...},
+          ...
+        }
+      },
+      ...
+    }
+    Agregatsiya bazada (GROUP BY, median – oyna funksiyalari) bitta
+    so‘rovda bajariladi. Ixtiyoriy filtrlar: year=2025, district=kasbi
+    (district berilsa "region" – shu tuman bo‘yicha).
 
-    return data
+    Javob data version bo‘yicha keshlanadi (ETag bilan).
+    """
+    async def build() -> bytes:
+        rows = (await db.execute(summary_query(year, district))).all()
+        return encode_json(summary_from_rows(rows))
+
+    snap = await summary_cache.aget_or_build(_summary_cache_key(year, district), build)
+    return _snapshot_response(request, snap)
+
+
+@app.get("/api/agrodata/changes")
+@db_budget(4)
+async def get_agrodata_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(CHANGES_DEFAULT_LIMIT, ge=1, le=CHANGES_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Kursordan beri o‘zgarishlar (delta sinxronizatsiya):
+    {
+      "since": 10, "cursor": 42, "has_more": false,
+      "removed": [7],
+      "clusters": [{"id": 5, "name": ..., "district_code": ..., "district": ..., "visible": true},
+                   {"id": 6, "visible": false}],
+      "reports": [{"cluster_id": 5, "year": 2025, "production": ..., ...}]
+    }
+    Birinchi so‘rov since=0 (to‘liq holat), keyingilari since=<cursor>;
+    has_more=true bo‘lsa darhol yana so‘raladi. Qo‘llash tartibi: removed,
+    clusters (visible=false – klaster hisobotlari yashiriladi), reports.
+    Javob hajmi o‘zgarishlar soniga bog‘liq, ma'lumotlar hajmiga emas.
+    """
+    return await changes_page(db, since, limit)
+
+
+@app.get("/api/agrodata/{year:int}")
+@db_budget(1)
+async def get_agrodata_year(
+    request: Request,
+    year: int,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Bitta yil bo‘yicha kesim: { "2025": { "kasbi": [...], ... } }.
+    Har bir kesim alohida keshlanadi va o‘z ETag iga ega.
+    """
+    return await _agrodata_response(request, db, year, None, fields)
+
+
+@app.get("/api/agrodata/{year:int}/{district}")
+@db_budget(1)
+async def get_agrodata_year_district(
+    request: Request,
+    year: int,
+    district: str,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Bitta yil va bitta tuman bo‘yicha kesim: { "2025": { "kasbi": [...] } }.
+    """
+    return await _agrodata_response(request, db, year, district, fields)
+
+
+# ============================================================
+#  Server-Sent Events – panellar uchun o‘zgarish hodisalari
+# ============================================================
+
+def _event_stream(request: Request, topics: Tuple[str, ...]) -> StreamingResponse:
+    if events.hub.full:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Hodisalar oqimiga ulanishlar soni chegarada.",
+            headers={"Retry-After": "5"},
+        )
+    last_event_id = request.headers.get("last-event-id")
+    return StreamingResponse(
+        events.hub.stream(topics, int(last_event_id) if last_event_id and last_event_id.isdigit() else None),
+        media_type="text/event-stream",
+        # nginx va boshqa proxylar oqimni buferlamasin
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/events")
+@db_budget(0)
+async def agrodata_events(request: Request):
+    """
+    Viloyat paneli uchun SSE oqimi (EventSource("/api/events")):
+      event: report     data: {"cluster_id": 5, "year": 2025}
+      event: import     data: {"cluster_id": 5 | null, "years": [2024, 2025], "rows": 12}
+      event: visibility data: {"cluster_id": 5} – klaster tasdiqlandi/bloklandi/
+                                                  o‘chirildi (ko‘rinishi o‘zgardi)
+      event: resync     data: {}                – hodisalar o‘tkazib yuborildi,
+                                                  hammasini qayta so‘rang
+    Hodisa kelganda faqat tegishli kesim qayta so‘raladi
+    (/api/agrodata/{year}, /api/agrodata/summary, ETag bilan).
+    Qayta ulanganda brauzer Last-Event-ID yuboradi – o‘tkazib yuborilgan
+    hodisalar qayta beriladi.
+    """
+    return _event_stream(request, (events.TOPIC_AGRODATA,))
+
+
+@app.get("/api/admin/events", dependencies=[Depends(get_admin_user)])
+@db_budget(0)
+async def admin_events(request: Request):
+    """
+    Admin paneli uchun SSE oqimi: /api/events dagi hodisalar va
+      event: cluster data: {"cluster_id": 5, "action": "register" | "approve" | ...,
+                            "status": "pending" | "approved" | ... | null}
+    Token Authorization sarlavhasida (fetch asosidagi SSE mijozi bilan).
+    """
+    return _event_stream(request, (events.TOPIC_AGRODATA, events.TOPIC_ADMIN))
 
 
 # ============================================================
 #  Admin endpointlari
 # ============================================================
 
+# o‘chiriladigan klasterlar tokeni holatni o‘qimasdan bekor qilinadi
+_REMOVING_ACTIONS = ("delete", "archive")
+
+
+def _moderate_one(db: Session, cluster_id: int, action: str, comment: Optional[str] = None) -> None:
+    """Bitta klaster uchun qaror (batch bilan bir xil yo‘l), 404 – topilmasa."""
+    result = apply_moderation(db, [ModerationItem(cluster_id=cluster_id, action=action, comment=comment)])[0]
+    if result["result"] == "not_found":
+        raise HTTPException(status_code=404, detail=result["detail"])
+    if result["result"] != "ok":
+        raise HTTPException(status_code=400, detail=result["detail"])
+    versions = data_versions.mark_changed(db, *data_versions.touched_by([action]))
+    db.commit()
+    data_versions.committed(versions)
+    events.cluster_moderated(cluster_id, action)
+    if action in _REMOVING_ACTIONS:
+        # klaster yo‘q – holatini bazadan o‘qish shart emas
+        revoke_clusters([cluster_id])
+    else:
+        refresh_cluster_revocations(db, [cluster_id])
+
+
 class AdminDecision(BaseModel):
     cluster_id: int
     comment: Optional[str] = None
 
 
-@app.get("/api/admin/pending-clusters", dependencies=[Depends(get_admin_user)])
-def get_pending_clusters(db: Session = Depends(get_db)):
+@app.get(
+    "/api/admin/pending-clusters",
+    # javob admin_lists da tayyor baytlarga aylanadi (response_model
+    # tekshiruvisiz) – sxema faqat OpenAPI uchun
+    responses={200: {"model": AdminClusterPage}},
+    dependencies=[Depends(get_admin_user)],
+)
+@db_budget(2)
+async def get_pending_clusters(
+    district_code: Optional[str] = None,
+    cluster_type: Optional[str] = None,
+    sort: SortKey = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """
-    Tasdiqlash kutilayotgan klasterlar ro'yxati.
+    Tasdiqlash kutilayotgan klasterlar ro'yxati (sahifalab).
     Telefon raqami, login va ro'yxatdan o'tgan sana bilan.
+
+    Javob: {"items": [...], "next_cursor": "..." | null, "total": 123}
+    Keyingi sahifa: ?cursor=<next_cursor> (boshqa parametrlar o‘sha-o‘sha).
+    Filtrlar: district_code, cluster_type. Saralash: sort=id|-id|name|-name.
     """
-    rows = (
-        db.query(Cluster, User, District)
-        .join(User, User.cluster_id == Cluster.id)
-        .join(District, District.code == Cluster.district_code, isouter=True)
-        .filter(Cluster.status == "pending")
-        .all()
+    return await cluster_page(
+        db, ["pending"], district_code, cluster_type, sort, cursor, limit,
     )
 
-    result = []
-    for cluster, user, district in rows:
-        result.append({
-            "id": cluster.id,
-            "cluster_name": cluster.name,
-            "district_code": cluster.district_code,
-            "district_name": district.name if district else None,
-            "cluster_type": cluster.cluster_type,
-            "leader_name": cluster.leader_name,
-            "leader_phone": cluster.leader_phone,
-            "status": cluster.status,
-            "created_at": getattr(cluster, "created_at", None).isoformat()
-                if getattr(cluster, "created_at", None) else None,
-            "username": user.username,
-        })
-    return result
 
+HISTORY_REPORTS_LIMIT = 50
+HISTORY_MAX_CLUSTERS = 100
 
-@app.get("/api/admin/cluster-history/{cluster_id}", dependencies=[Depends(get_admin_user)])
-def get_cluster_history(cluster_id: int, db: Session = Depends(get_db)):
+
+def _cluster_history_query(
+    cluster_ids: List[int],
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    before_year: Optional[int] = None,
+):
     """
-    Admin uchun: klasterning ro'yxatdan o'tish ma'lumotlari va hisobotlar tarixi.
-    Parollar qaytarilmaydi.
+    Klaster(lar) + foydalanuvchi logini + hisobotlar – bitta so‘rovda.
+    Hisobotlar Cluster.reports munosabati orqali LEFT JOIN bilan olinadi
+    (contains_eager): yil filtrlari JOIN shartida, shuning uchun hisoboti
+    yo‘q klaster ham qaytadi.
     """
-    cluster = db.query(Cluster).filter(Cluster.id == cluster_id).first()
-    if not cluster:
-        raise HTTPException(status_code=404, detail="Klaster topilmadi.")
-
-    user = db.query(User).filter(User.cluster_id == cluster_id).first()
-
-    reports = (
-        db.query(ClusterReport)
-        .filter(ClusterReport.cluster_id == cluster_id)
-        .order_by(ClusterReport.year.desc())
-        .all()
+    report_filters = []
+    if year_from is not None:
+        report_filters.append(ClusterReport.year >= year_from)
+    if year_to is not None:
+        report_filters.append(ClusterReport.year <= year_to)
+    if before_year is not None:
+        report_filters.append(ClusterReport.year < before_year)
+
+    return (
+        select(Cluster, User.username)
+        .outerjoin(User, User.cluster_id == Cluster.id)
+        .outerjoin(Cluster.reports.and_(*report_filters))
+        .options(contains_eager(Cluster.reports))
+        .where(Cluster.id.in_(cluster_ids))
+        .order_by(Cluster.id, ClusterReport.year.desc())
     )
 
+
+def _cluster_history(cluster: Cluster, username: Optional[str], reports: List[ClusterReport]) -> Dict[str, Any]:
     return {
         "cluster": {
             "id": cluster.id,
@@ -328,14 +889,11 @@ def get_cluster_history(cluster_id: int, db: Session = Depends(get_db)):
             "leader_name": cluster.leader_name,
             "leader_phone": cluster.leader_phone,
             "status": cluster.status,
-            "admin_comment": getattr(cluster, "admin_comment", None),
-            "created_at": getattr(cluster, "created_at", None).isoformat()
-                if getattr(cluster, "created_at", None) else None,
+            "admin_comment": cluster.admin_comment,
+            "created_at": cluster.created_at,
         },
         "user": {
-            "username": user.username if user else None,
-            "created_at": getattr(user, "created_at", None).isoformat()
-                if (user and getattr(user, "created_at", None)) else None,
+            "username": username,
         },
         "reports": [
             {
@@ -344,35 +902,103 @@ def get_cluster_history(cluster_id: int, db: Session = Depends(get_db)):
                 "export": r.export,
                 "employment": r.employment,
                 "profitability": r.profitability,
-                "created_at": getattr(r, "created_at", None).isoformat()
-                    if getattr(r, "created_at", None) else None,
             }
             for r in reports
         ],
     }
 
 
+@app.get(
+    "/api/admin/cluster-history/{cluster_id}",
+    response_model=ClusterHistory,
+    dependencies=[Depends(get_admin_user)],
+)
+@db_budget(1)
+async def get_cluster_history(
+    cluster_id: int,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    before_year: Optional[int] = None,
+    limit: int = Query(HISTORY_REPORTS_LIMIT, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Admin uchun: klasterning ro'yxatdan o'tish ma'lumotlari va hisobotlar tarixi.
+    Parollar qaytarilmaydi.
+
+    Hisobotlar yil bo‘yicha kamayish tartibida, sahifalab:
+      - year_from / year_to – yil oralig‘i (ikkalasi ham ixtiyoriy)
+      - limit – sahifadagi hisobotlar soni
+      - before_year=<next_before_year> – keyingi sahifa
+    """
+    result = await db.execute(
+        _cluster_history_query([cluster_id], year_from, year_to, before_year).limit(limit + 1)
+    )
+    row = result.unique().first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Klaster topilmadi.")
+
+    cluster, username = row
+    reports = list(cluster.reports)
+    next_before_year = reports[limit - 1].year if len(reports) > limit else None
+    history = _cluster_history(cluster, username, reports[:limit])
+    history["next_before_year"] = next_before_year
+    return history
+
+
+@app.get(
+    "/api/admin/cluster-history",
+    response_model=ClusterHistoryBatch,
+    dependencies=[Depends(get_admin_user)],
+)
+@db_budget(1)
+async def get_cluster_histories(
+    ids: str,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Bir nechta klaster tarixi bitta chaqiruvda (admin taqqoslash ko‘rinishi):
+        /api/admin/cluster-history?ids=1,2,3&year_from=2022&year_to=2025
+    Javob: {"items": [<cluster-history>, ...], "not_found": [id, ...]}
+    Hisobotlar sahifalanmaydi – yil oralig‘i bilan cheklanadi.
+    """
+    try:
+        cluster_ids = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids – vergul bilan ajratilgan butun sonlar.")
+    if not cluster_ids:
+        raise HTTPException(status_code=400, detail="Kamida bitta klaster id berilishi kerak.")
+    if len(cluster_ids) > HISTORY_MAX_CLUSTERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bir so‘rovda ko‘pi bilan {HISTORY_MAX_CLUSTERS} ta klaster.",
+        )
+
+    result = await db.execute(_cluster_history_query(cluster_ids, year_from, year_to))
+    found = {cluster.id: _cluster_history(cluster, username, cluster.reports)
+             for cluster, username in result.unique().all()}
+    return {
+        "items": [found[cid] for cid in cluster_ids if cid in found],
+        "not_found": [cid for cid in cluster_ids if cid not in found],
+    }
+
+
 @app.post("/api/admin/cluster-approve", dependencies=[Depends(get_admin_user)])
+@db_budget(5)
 def approve_cluster(decision: AdminDecision, db: Session = Depends(get_db)):
     """
     Klasterni tasdiqlash.
     status -> 'approved', is_active -> True
     comment bo'lsa, admin_comment ga yoziladi.
     """
-    cluster = db.query(Cluster).filter(Cluster.id == decision.cluster_id).first()
-    if not cluster:
-        raise HTTPException(status_code=404, detail="Klaster topilmadi.")
-
-    cluster.status = "approved"
-    cluster.is_active = True
-    if decision.comment:
-        cluster.admin_comment = decision.comment
-
-    db.commit()
+    _moderate_one(db, decision.cluster_id, "approve", decision.comment)
     return {"message": "Klaster tasdiqlandi."}
 
 
 @app.post("/api/admin/cluster-reject", dependencies=[Depends(get_admin_user)])
+@db_budget(5)
 def reject_cluster(decision: AdminDecision, db: Session = Depends(get_db)):
     """
     Klasterni rad etish.
@@ -381,17 +1007,57 @@ def reject_cluster(decision: AdminDecision, db: Session = Depends(get_db)):
     if not decision.comment:
         raise HTTPException(status_code=400, detail="Rad etishda izoh majburiy.")
 
-    cluster = db.query(Cluster).filter(Cluster.id == decision.cluster_id).first()
-    if not cluster:
-        raise HTTPException(status_code=404, detail="Klaster topilmadi.")
-
-    cluster.status = "rejected"
-    cluster.is_active = False
-    cluster.admin_comment = decision.comment
-
-    db.commit()
+    _moderate_one(db, decision.cluster_id, "reject", decision.comment)
     return {"message": "Klaster ro‘yxatdan o‘tish so‘rovi rad etildi."}
 
+# 1 (vazifa) + fayl bo‘laklari soni (JOB_PAYLOAD_CHUNK_BYTES) – fayl hajmiga bog‘liq
+@app.post("/api/admin/cluster-report/import", status_code=status.HTTP_202_ACCEPTED)
+@db_budget(None)
+def admin_import_cluster_reports(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    db: Session = Depends(get_db),
+    admin: CurrentUser = Depends(get_admin_user),
+):
+    """
+    Admin (viloyat) uchun: istalgan klasterlar hisobotlarini fayldan yuklash.
+    Har bir qatorda cluster_id majburiy:
+      cluster_id,year,production,export,employment,profitability
+    Import fon vazifasi sifatida bajariladi: javob – 202 va job id;
+    natija (import hisoboti) /api/admin/jobs/{id} da. Fayl vazifa bilan
+    birga bazaga yoziladi – vazifani istalgan worker (process/konteyner)
+    bajara oladi.
+    """
+    fmt = _detect_import_format(file, format)
+    job_id = jobs.runner.submit(db, "import_reports", {"format": fmt}, admin.username, payload=file.file)
+    return _job_accepted(job_id, "Import navbatga qo‘shildi.")
+
+@app.get("/api/admin/export/reports", dependencies=[Depends(get_admin_user)])
+@db_budget(1)
+def export_cluster_reports(
+    format: Literal["csv", "jsonl", "parquet", "arrow"] = "csv",
+    year: Optional[int] = None,
+    district: Optional[str] = None,
+):
+    """
+    Statistika boshqarmasi uchun to‘liq eksport: har bir hisobot qatori
+    klaster va tuman ma'lumotlari bilan (barcha holatdagi klasterlar).
+      - format=csv | jsonl | parquet | arrow (Arrow IPC stream)
+      - year=2025, district=kasbi – ixtiyoriy filtrlar
+    Javob oqim (streaming) ko‘rinishida: qatorlar bazadan bo‘laklab
+    o‘qiladi va darhol yuboriladi – xotira eksport hajmiga bog‘liq emas.
+    """
+    try:
+        check_format(format)
+    except ExportFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    filename = export_filename(format, year, district)
+    return StreamingResponse(
+        stream_export(format, year, district),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 # ====================== YANGI ADMIN API-lar ============================
 
 class BlockRequest(BaseModel):
@@ -399,85 +1065,241 @@ class BlockRequest(BaseModel):
     blocked: bool = True
 
 
-@app.get("/api/admin/active-clusters", dependencies=[Depends(get_admin_user)])
-def get_active_clusters(db: Session = Depends(get_db)):
+@app.get(
+    "/api/admin/active-clusters",
+    responses={200: {"model": AdminClusterPage}},
+    dependencies=[Depends(get_admin_user)],
+)
+@db_budget(2)
+async def get_active_clusters(
+    status: Optional[Literal["approved", "blocked"]] = None,
+    district_code: Optional[str] = None,
+    cluster_type: Optional[str] = None,
+    sort: SortKey = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """
-    Ro'yxatdan o'tgan klasterlar ro'yxati (tasdiqlangan + bloklangan).
+    Ro'yxatdan o'tgan klasterlar ro'yxati (tasdiqlangan + bloklangan),
+    sahifalab. status=approved|blocked – faqat shu holat.
+    Javob va parametrlar – /api/admin/pending-clusters bilan bir xil.
     """
-    rows = (
-        db.query(Cluster, User, District)
-        .join(User, User.cluster_id == Cluster.id)
-        .join(District, District.code == Cluster.district_code, isouter=True)
-        .filter(Cluster.status.in_(["approved", "blocked"]))
-        .all()
+    statuses = [status] if status else ["approved", "blocked"]
+    return await cluster_page(
+        db, statuses, district_code, cluster_type, sort, cursor, limit, with_active=True,
     )
 
-    result = []
-    for cluster, user, district in rows:
-        result.append({
-            "id": cluster.id,
-            "cluster_name": cluster.name,
-            "district_code": cluster.district_code,
-            "district_name": district.name if district else None,
-            "cluster_type": cluster.cluster_type,
-            "leader_name": cluster.leader_name,
-            "leader_phone": cluster.leader_phone,
-            "status": cluster.status,
-            "is_active": bool(getattr(cluster, "is_active", False)),
-            "created_at": getattr(cluster, "created_at", None).isoformat()
-                if getattr(cluster, "created_at", None) else None,
-            "username": user.username,
-        })
-    return result
-
 
 @app.post("/api/admin/cluster-block", dependencies=[Depends(get_admin_user)])
+@db_budget(5)
 def block_cluster(req: BlockRequest, db: Session = Depends(get_db)):
     """
     Klasterni login qilishdan cheklash yoki cheklovni olib tashlash.
     blocked=True  -> bloklash (is_active=False, status='blocked')
     blocked=False -> blokdan chiqarish (is_active=True, status='approved')
     """
-    cluster = db.query(Cluster).filter(Cluster.id == req.cluster_id).first()
-    if not cluster:
-        raise HTTPException(status_code=404, detail="Klaster topilmadi.")
-
-    if req.blocked:
-        cluster.is_active = False
-        cluster.status = "blocked"
-    else:
-        cluster.is_active = True
-        # agar avval approved bo‘lgan bo‘lsa shu holatga qaytaramiz
-        if cluster.status == "blocked":
-            cluster.status = "approved"
-
-    db.commit()
+    _moderate_one(db, req.cluster_id, "block" if req.blocked else "unblock")
     return {"message": "Holat yangilandi."}
 
 
+# Eng yomon holat (archive) – 8: mavjudlik SELECT, change_seq, belgi,
+# 3 ta arxiv nusxasi, DELETE, data_versions
 @app.delete("/api/admin/cluster/{cluster_id}", dependencies=[Depends(get_admin_user)])
-def delete_cluster(cluster_id: int, db: Session = Depends(get_db)):
+@db_budget(8)
+def delete_cluster(cluster_id: int, archive: bool = False, db: Session = Depends(get_db)):
     """
     Klasterni bazadan butunlay o'chirish.
-    Klasterga biriktirilgan user va barcha hisobotlar ham o'chiriladi.
+    Klasterga biriktirilgan user va barcha hisobotlar ham o'chiriladi
+    (ON DELETE CASCADE, bitta tranzaksiya).
+    archive=true – o‘chirishdan oldin qatorlar *_archive jadvallariga
+    ko‘chiriladi.
+    Sinxron (fon vazifasi emas): amal bitta tranzaksiya, javobdan oldin
+    klaster tokenlari bekor qilinadi.
     """
-    cluster = db.query(Cluster).filter(Cluster.id == cluster_id).first()
-    if not cluster:
-        raise HTTPException(status_code=404, detail="Klaster topilmadi.")
+    if archive:
+        _moderate_one(db, cluster_id, "archive")
+        return {"message": "Klaster va unga tegishli ma'lumotlar arxivga ko'chirildi."}
+    _moderate_one(db, cluster_id, "delete")
+    return {"message": "Klaster va unga tegishli ma'lumotlar o'chirildi."}
 
-    # hisobotlarni o'chiramiz
-    db.query(ClusterReport).filter(ClusterReport.cluster_id == cluster_id).delete()
-    # foydalanuvchini o'chiramiz
-    db.query(User).filter(User.cluster_id == cluster_id).delete()
 
-    db.delete(cluster)
-    db.commit()
-    return {"message": "Klaster va unga tegishli ma'lumotlar o'chirildi."}
+# Eng yomon holat (oltala amal bitta paketda) – 15: mavjudlik SELECT,
+# change_seq, 4 ta UPDATE, 2 ta belgi (delete, archive), 3 ta arxiv
+# nusxasi, 2 ta DELETE, data_versions, bekor qilish to‘plami SELECT
+@app.post("/api/admin/clusters/batch", dependencies=[Depends(get_admin_user)])
+@db_budget(15)
+def moderate_clusters_batch(batch: ModerationBatch, db: Session = Depends(get_db)):
+    """
+    Ko‘p klasterlar bo‘yicha qarorlar bitta so‘rovda:
+    {
+      "items": [
+        {"cluster_id": 5, "action": "approve", "comment": "..."},
+        {"cluster_id": 6, "action": "reject", "comment": "Hujjatlar to‘liq emas"},
+        {"cluster_id": 7, "action": "block"},
+        {"cluster_id": 8, "action": "unblock"},
+        {"cluster_id": 9, "action": "delete"}
+      ]
+    }
+    Har bir amal set-based UPDATE/DELETE bilan, hammasi bitta tranzaksiyada.
+    Javob – har bir klaster uchun natija (ok / not_found / invalid).
+    """
+    results = apply_moderation(db, batch.items)
+    applied = sum(1 for r in results if r["result"] == "ok")
+    if applied:
+        applied_results = [r for r in results if r["result"] == "ok"]
+        versions = data_versions.mark_changed(
+            db, *data_versions.touched_by(r["action"] for r in applied_results)
+        )
+        db.commit()
+        data_versions.committed(versions)
+        for r in applied_results:
+            events.cluster_moderated(r["cluster_id"], r["action"])
+        revoke_clusters([r["cluster_id"] for r in applied_results if r["action"] in _REMOVING_ACTIONS])
+        refresh_cluster_revocations(
+            db, [r["cluster_id"] for r in applied_results if r["action"] not in _REMOVING_ACTIONS]
+        )
+    return {"applied": applied, "results": results}
+
+# ============================================================
+#  Fon vazifalari – og‘ir admin amallari (jobs.py)
+# ============================================================
+
+def _job_accepted(job_id: int, message: str) -> Response:
+    url = f"/api/admin/jobs/{job_id}"
+    return FastJSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"job_id": job_id, "status": "queued", "status_url": url, "message": message},
+        headers={"Location": url},
+    )
+
+
+@job_handler("import_reports")
+def _import_reports_job(ctx: JobContext) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        return _import_reports(db, ctx.open_payload(db), ctx.params["format"], None, on_progress=ctx.progress)
+    finally:
+        db.close()
+
+
+@job_handler("rebuild_caches")
+def _rebuild_caches_job(ctx: JobContext) -> Dict[str, Any]:
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        # barcha domenlar – boshqa processlar ham o‘z keshlarini qayta quradi
+        versions = data_versions.mark_changed(db, *data_versions.DOMAINS)
+        db.commit()
+        data_versions.committed(versions)
+        _reload_districts()
+        rebuild_revocations(db)
+    finally:
+        db.close()
+    _warm_agrodata()
+    return {"ms": round((time.perf_counter() - started) * 1000)}
+
+
+@app.post("/api/admin/cache/rebuild", status_code=status.HTTP_202_ACCEPTED)
+@db_budget(1)
+def rebuild_caches(db: Session = Depends(get_db), admin: CurrentUser = Depends(get_admin_user)):
+    """agrodata/summary keshlari va token bekor qilish to‘plamini qayta qurish (fon vazifasi)."""
+    job_id = jobs.runner.submit(db, "rebuild_caches", {}, admin.username)
+    return _job_accepted(job_id, "Keshlarni qayta qurish navbatga qo‘shildi.")
+
+
+@app.get("/api/admin/jobs", dependencies=[Depends(get_admin_user)])
+@db_budget(1)
+async def list_jobs(
+    status: Optional[Literal["queued", "running", "succeeded", "failed"]] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """So‘nggi fon vazifalari (yangilari birinchi)."""
+    query = select(Job).order_by(Job.id.desc()).limit(limit)
+    if status is not None:
+        query = query.where(Job.status == status)
+    return {"items": [
+        job_to_dict(job, jobs.runner.live_progress(job.id)) for job in (await db.execute(query)).scalars()
+    ]}
+
+
+@app.get("/api/admin/jobs/{job_id}", dependencies=[Depends(get_admin_user)])
+@db_budget(1)
+async def get_job(job_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Vazifa holati va progressi:
+    {"id": 12, "kind": "import_reports", "status": "running",
+     "progress": {"done": 40000, "total": null}, "result": null, "error": null, ...}
+    status: queued | running | succeeded | failed. Ishlayotgan vazifaning
+    progressi jonli (shu processda bajarilayotgan bo‘lsa), natija – result da.
+    """
+    job = await db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Vazifa topilmadi.")
+    return job_to_dict(job, jobs.runner.live_progress(job_id))
+
+
+@app.get("/api/admin/db-pool", dependencies=[Depends(get_admin_user)])
+@db_budget(0)
+def get_db_pool_status():
+    """
+    Connection pool holati (har bir engine uchun): band ulanishlar soni,
+    pool hajmi, kutish vaqtlari va timeoutlar.
+    """
+    return pool_status()
+
+
+def _pool_gauges():
+    status_by_engine = pool_status()
+    for key, name, help_text in (
+        ("in_use", "db_pool_in_use", "Band ulanishlar soni."),
+        ("size", "db_pool_size", "Pool hajmi."),
+        ("checkouts", "db_pool_checkouts", "Pooldan olingan ulanishlar soni (jarayon boshidan)."),
+        ("timeouts", "db_pool_timeouts", "Pool timeoutlari soni (jarayon boshidan)."),
+        ("wait_seconds_max", "db_pool_wait_seconds_max", "Ulanish kutishning eng uzun vaqti, sekund."),
+    ):
+        samples = [((("engine", engine_name),), info[key])
+                   for engine_name, info in status_by_engine.items() if key in info]
+        yield name, help_text, samples
+
+
+add_gauge_source(_pool_gauges)
+add_gauge_source(lambda: [("sse_clients", "Ochiq SSE ulanishlar soni.", [((), events.hub.subscriber_count)])])
+add_gauge_source(lambda: [("jobs_running", "Shu processda bajarilayotgan fon vazifalari.", [((), jobs.runner.running_count)])])
+
+
+@app.get("/metrics", include_in_schema=False)
+@db_budget(0)
+def get_metrics(request: Request):
+    """
+    Prometheus text exposition formati: HTTP so‘rovlar (route/metod/status),
+    kechikish histogrammalari, route bo‘yicha SQL soni va vaqti, sekin SQL
+    soni va pool holati. METRICS_TOKEN berilgan bo‘lsa – Bearer token bilan.
+    """
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Metrika tokeni noto‘g‘ri.")
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 
 # ============================================================
-#  Root
+#  Root va readiness
 # ============================================================
 
 @app.get("/")
+@db_budget(0)
 def root():
     return {"message": "Qashqadaryo agroklaster backend ishlamoqda."}
+
+
+@app.get("/ready")
+@db_budget(0)
+def ready(request: Request):
+    """
+    Readiness: startup (sxema, seed) va keshlarni isitish tugagach 200,
+    undan oldin va to‘xtash paytida 503. Load balancer / deploy health
+    check uchun.
+    """
+    if not getattr(request.app.state, "ready", False):
+        return FastJSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "starting"})
+    return {"status": "ready"}
@@ -0,0 +1,379 @@
+# metrics.py
+"""
+Prometheus text formatidagi metrikalar (/metrics) – tashqi kutubxonasiz.
+
+  - MetricsMiddleware  – har bir so‘rov: route shabloni (/api/agrodata/{year}),
+                         metod, status kodi, kechikish histogrammasi
+  - install_db_hooks() – SQLAlchemy before/after_cursor_execute: so‘rov
+                         ichidagi SQL soni va DB vaqti (contextvars orqali),
+                         SLOW_QUERY_MS dan sekin so‘rovlar logga yoziladi
+  - render()           – barcha metrikalar text exposition formatida
+  - @db_budget(n)      – endpoint uchun so‘rovdagi SQL soni chegarasi;
+    query_budget(n)    – xuddi shu, istalgan kod bloki uchun (testlarda)
+
+Sozlamalar (muhit o‘zgaruvchilari):
+    SLOW_QUERY_MS      – sekin SQL chegarasi, ms (standart: 200; 0 – o‘chiq)
+    METRICS_TOKEN      – berilsa /metrics faqat "Authorization: Bearer <token>" bilan
+    QUERY_BUDGET_MODE  – off | warn (standart: log + metrika) |
+                         raise (dev/CI uchun: javob to‘liq yuborilgandan
+                         keyin QueryBudgetExceeded – yozuv va commitdan
+                         keyingi ishlar bekor qilinmaydi, test esa yiqiladi)
+    DEBUG_DB_HEADERS   – 1 bo‘lsa har javobga X-DB-Queries, X-DB-Time-Ms,
+                         X-DB-Query-Budget sarlavhalari qo‘shiladi
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger("agro.sql")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "warn").lower()
+DEBUG_DB_HEADERS = os.getenv("DEBUG_DB_HEADERS", "0").lower() in ("1", "true", "yes", "on")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+# ============================================================
+#  Metrika turlari
+# ============================================================
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        # labels -> [bucket hisoblari..., sum, count]
+        self._values: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            data = self._values.get(labels)
+            if data is None:
+                data = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(labels, list(data)) for labels, data in self._values.items()]
+        for labels, data in items:
+            for i, bound in enumerate(self.buckets):
+                yield f"{self.name}_bucket{_format_labels(labels, ('le', _format_value(float(bound))))} {data[i]}"
+            yield f"{self.name}_bucket{_format_labels(labels, ('le', '+Inf'))} {data[-1]}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(float(data[-2]))}"
+            yield f"{self.name}_count{_format_labels(labels)} {data[-1]}"
+
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP so‘rovlar soni (route, metod, status bo‘yicha).")
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP so‘rov davomiyligi, sekund.", LATENCY_BUCKETS,
+)
+DB_QUERIES = Counter("db_queries_total", "SQL so‘rovlar soni (HTTP route bo‘yicha).")
+DB_SECONDS = Counter("db_query_seconds_total", "SQL so‘rovlarda o‘tgan vaqt, sekund (HTTP route bo‘yicha).")
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "Bitta HTTP so‘rovdagi SQL so‘rovlar soni.", QUERY_COUNT_BUCKETS,
+)
+DB_SLOW_QUERIES = Counter("db_slow_queries_total", "SLOW_QUERY_MS dan sekin SQL so‘rovlar soni.")
+DB_BUDGET_EXCEEDED = Counter(
+    "db_query_budget_exceeded_total", "SQL byudjetidan oshgan HTTP so‘rovlar soni (route bo‘yicha).",
+)
+
+_METRICS = (
+    HTTP_REQUESTS, HTTP_LATENCY, DB_QUERIES, DB_SECONDS, DB_QUERIES_PER_REQUEST, DB_SLOW_QUERIES,
+    DB_BUDGET_EXCEEDED,
+)
+
+# Qo‘shimcha gauge manbalari: () -> [(nom, help, [(labels, qiymat), ...]), ...]
+_gauge_sources: List[Callable[[], Iterable[Tuple[str, str, Iterable[Tuple[Labels, float]]]]]] = []
+
+
+def add_gauge_source(source) -> None:
+    _gauge_sources.append(source)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for source in _gauge_sources:
+        for name, help_text, samples in source():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================
+#  So‘rov konteksti (contextvars)
+# ============================================================
+
+_NO_BUDGET = object()
+
+
+class RequestStats:
+    """Bitta HTTP so‘rov (yoki query_budget bloki) ichidagi SQL statistikasi."""
+
+    __slots__ = ("scope", "queries", "db_seconds", "limit")
+
+    def __init__(self, scope: dict, limit=_NO_BUDGET):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+        # query_budget() bloki uchun aniq chegara; aks holda endpointnikidan
+        self.limit = limit
+
+    @property
+    def route(self) -> str:
+        # router scope ga mos kelgan route ni yozadi (endpoint chaqirilishidan oldin)
+        return getattr(self.scope.get("route"), "path", None) or "unmatched"
+
+    @property
+    def budget(self) -> Optional[int]:
+        if self.limit is not _NO_BUDGET:
+            return self.limit
+        return getattr(self.scope.get("endpoint"), "query_budget", None)
+
+
+# Sync endpointlar threadpoolda ishlaydi – kontekst (va shu obyekt) u yerga
+# ham ko‘chiriladi, shuning uchun hisoblagichlar bitta joyda yig‘iladi.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+# ============================================================
+#  SQLAlchemy hooklari
+# ============================================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # faqat hisoblanadi: byudjet so‘rov (yoki blok) oxirida tekshiriladi –
+    # bu yerda xato commitdan keyingi SQL ni (muvaffaqiyatli yozuvdan
+    # keyin) 500 ga aylantirib, yon ta'sirlarni o‘tkazib yuborardi
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    stats = current_request.get()
+    if stats is not None:
+        stats.db_seconds += elapsed
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        DB_SLOW_QUERIES.inc()
+        logger.warning(
+            "Sekin SQL (%.1f ms, route=%s): %s",
+            elapsed * 1000,
+            stats.route if stats is not None else "-",
+            " ".join(statement.split())[:500],
+        )
+
+
+def _handle_error(exception_context):
+    # xato bo‘lgan so‘rov uchun after_cursor_execute chaqirilmaydi
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def install_db_hooks(sync_engines: Iterable) -> None:
+    """Har bir (sync) engine ga SQL hisoblagich hooklarini o‘rnatadi."""
+    for sync_engine in sync_engines:
+        if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+            continue
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _handle_error)
+
+
+# ============================================================
+#  Query budget
+# ============================================================
+
+class QueryBudgetExceeded(AssertionError):
+    """So‘rov (yoki blok) e'lon qilingan SQL sonidan ko‘p so‘rov yubordi."""
+
+
+def _exceeded(stats: RequestStats, where: str) -> QueryBudgetExceeded:
+    return QueryBudgetExceeded(f"SQL byudjeti oshdi ({where}): {stats.queries} > {stats.budget}")
+
+
+def db_budget(max_queries: Optional[int]):
+    """
+    Endpoint uchun bitta HTTP so‘rovdagi SQL chegarasini e'lon qiladi
+    (dependency lar ham hisobga kiradi):
+
+        @app.get("/api/agrodata")
+        @db_budget(1)
+        async def get_agrodata(...): ...
+
+    None – ataylab chegarasiz (masalan, hajmi faylga bog‘liq import).
+    """
+    def decorator(fn):
+        fn.query_budget = max_queries
+        return fn
+    return decorator
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[RequestStats]:
+    """
+    Blok ichida max_queries dan ko‘p SQL bajarilsa, blok tugagach
+    QueryBudgetExceeded (blok ishi to‘liq bajariladi). Testlar va
+    skriptlar uchun:
+
+        with query_budget(2) as stats:
+            client.get("/api/admin/cluster-history/5")
+    """
+    stats = RequestStats({}, limit=max_queries)
+    token = current_request.set(stats)
+    try:
+        yield stats
+    finally:
+        current_request.reset(token)
+    if stats.queries > max_queries:
+        raise _exceeded(stats, "query_budget")
+
+
+def api_routes(routes, prefix: str = "") -> Iterator[Tuple[str, str, Callable]]:
+    """
+    (metod, yo‘l, endpoint) – barcha API endpointlar, include_router bilan
+    ulanganlari ham (yangi FastAPI ularni app.routes da bitta obyekt
+    sifatida saqlaydi).
+    """
+    for route in routes:
+        included = getattr(route, "original_router", None)
+        if included is not None:
+            context = getattr(route, "include_context", None)
+            yield from api_routes(included.routes, prefix + (getattr(context, "prefix", "") or ""))
+            continue
+        # faqat APIRoute (dependant bor); /docs, /openapi.json – Starlette Route
+        if not hasattr(route, "dependant"):
+            continue
+        for method in sorted(route.methods):
+            yield method, prefix + route.path, route.endpoint
+
+
+def routes_without_budget(routes) -> List[str]:
+    """@db_budget e'lon qilinmagan API endpointlar ("METOD /yo‘l")."""
+    return [f"{method} {path}" for method, path, endpoint in api_routes(routes)
+            if not hasattr(endpoint, "query_budget")]
+
+
+# ============================================================
+#  ASGI middleware
+# ============================================================
+
+class MetricsMiddleware:
+    """
+    Sof ASGI middleware (BaseHTTPMiddleware emas – javob oqimini
+    buferlamaydi). Route yorlig‘i – shablon (scope["route"].path), shuning
+    uchun /api/admin/cluster-history/5 va /7 bitta qatorga tushadi.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status_code = 500
+        exceeded = False
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if DEBUG_DB_HEADERS:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(stats.queries).encode()))
+                    headers.append((b"x-db-time-ms", f"{stats.db_seconds * 1000:.2f}".encode()))
+                    if stats.budget is not None:
+                        headers.append((b"x-db-query-budget", str(stats.budget).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            method = scope.get("method", "")
+            route_labels = (("method", method), ("route", stats.route))
+            HTTP_REQUESTS.inc(route_labels + (("status", str(status_code)),))
+            HTTP_LATENCY.observe(elapsed, route_labels)
+            DB_QUERIES.inc(route_labels, stats.queries)
+            DB_SECONDS.inc(route_labels, stats.db_seconds)
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, route_labels)
+            budget = stats.budget
+            if QUERY_BUDGET_MODE != "off" and budget is not None and stats.queries > budget:
+                exceeded = True
+                DB_BUDGET_EXCEEDED.inc(route_labels)
+                logger.warning(
+                    "SQL byudjeti oshdi: %s %s – %d so‘rov (byudjet %d)",
+                    method, stats.route, stats.queries, budget,
+                )
+        # javob allaqachon yuborilgan, commit va yon ta'sirlar bajarilgan:
+        # xato faqat dev/CI da (server logi, TestClient) ko‘rinadi
+        if exceeded and QUERY_BUDGET_MODE == "raise":
+            raise _exceeded(stats, f"{method} {stats.route}")
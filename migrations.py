@@ -0,0 +1,498 @@
+# migrations.py
+"""
+Yengil versiyalangan migratsiya runner.
+
+Base.metadata.create_all faqat yo‘q jadvallarni yaratadi – mavjud agro.db
+ga yangi indeks yoki ustun qo‘sha olmaydi. Shuning uchun sxema
+o‘zgarishlari shu yerda raqamlangan migratsiyalar sifatida yoziladi va
+startupda ketma-ket qo‘llanadi. Qo‘llangan versiyalar schema_migrations
+jadvalida saqlanadi.
+
+Startupda ensure_schema() chaqiriladi: saqlangan versiya LATEST_VERSION
+ga teng bo‘lsa hech qanday DDL bajarilmaydi (create_all ham). Shuning
+uchun yangi jadval ham migratsiya qadami sifatida qo‘shilishi kerak.
+Bo‘sh bazada esa create_all oxirgi sxemani to‘liq yaratadi va barcha
+migratsiyalar qo‘llangan deb belgilanadi.
+
+Qo‘lda ishga tushirish va hot so‘rovlar indeks ishlatayotganini tekshirish:
+    python migrations.py --check
+"""
+import sys
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Sequence, Tuple, Union
+
+from sqlalchemy import DateTime, MetaData, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+Step = Union[str, Callable[[Connection], None]]
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    steps: Sequence[Step]
+    # False – SQLite da tashqi kalitlar tekshiruvi migratsiya davomida
+    # o‘chiriladi (ota jadvalni qayta qurish bolalarni kaskad bilan
+    # o‘chirib yubormasin); oxirida PRAGMA foreign_key_check qilinadi
+    foreign_keys: bool = True
+
+
+# ============================================================
+#  Migratsiya qadamlari (callable)
+# ============================================================
+
+# SQLite mavjud ustunning tashqi kalitini o‘zgartira olmaydi – jadval
+# qayta quriladi: eski jadval nomi o‘zgartiriladi, yangisi (CASCADE bilan)
+# yaratiladi, qatorlar bitta INSERT ... SELECT bilan ko‘chiriladi.
+_SQLITE_CASCADE_TABLES = {
+    "users": (
+        "CREATE TABLE users ("
+        " id INTEGER NOT NULL,"
+        " username VARCHAR NOT NULL,"
+        " hashed_password VARCHAR NOT NULL,"
+        " role VARCHAR,"
+        " cluster_id INTEGER,"
+        " PRIMARY KEY (id),"
+        " FOREIGN KEY(cluster_id) REFERENCES clusters (id) ON DELETE CASCADE)",
+        ("id", "username", "hashed_password", "role", "cluster_id"),
+        (
+            "CREATE INDEX ix_users_id ON users (id)",
+            "CREATE UNIQUE INDEX ix_users_username ON users (username)",
+            "CREATE INDEX ix_users_cluster_id ON users (cluster_id)",
+        ),
+    ),
+    "cluster_reports": (
+        "CREATE TABLE cluster_reports ("
+        " id INTEGER NOT NULL,"
+        " cluster_id INTEGER NOT NULL,"
+        " year INTEGER NOT NULL,"
+        " production FLOAT,"
+        " export FLOAT,"
+        " employment INTEGER,"
+        " profitability FLOAT,"
+        " PRIMARY KEY (id),"
+        " FOREIGN KEY(cluster_id) REFERENCES clusters (id) ON DELETE CASCADE)",
+        ("id", "cluster_id", "year", "production", "export", "employment", "profitability"),
+        (
+            "CREATE INDEX ix_cluster_reports_id ON cluster_reports (id)",
+            "CREATE UNIQUE INDEX ux_cluster_reports_cluster_year ON cluster_reports (cluster_id, year)",
+        ),
+    ),
+}
+
+
+def _cascade_foreign_keys(conn: Connection) -> None:
+    if conn.dialect.name == "postgresql":
+        for table in ("users", "cluster_reports"):
+            conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_cluster_id_fkey"))
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD CONSTRAINT {table}_cluster_id_fkey "
+                "FOREIGN KEY (cluster_id) REFERENCES clusters (id) ON DELETE CASCADE"
+            ))
+        return
+
+    for table, spec in _SQLITE_CASCADE_TABLES.items():
+        _rebuild_sqlite_table(conn, table, *spec)
+
+
+def _rebuild_sqlite_table(conn: Connection, table: str, create_sql: str,
+                          columns: Sequence[str], indexes: Sequence[str]) -> None:
+    old_indexes = conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t AND sql IS NOT NULL"),
+        {"t": table},
+    ).scalars().all()
+    for name in old_indexes:
+        conn.execute(text(f'DROP INDEX "{name}"'))
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {table}__old"))
+    conn.execute(text(create_sql))
+    cols = ", ".join(columns)
+    conn.execute(text(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {table}__old"))
+    conn.execute(text(f"DROP TABLE {table}__old"))
+    for sql in indexes:
+        conn.execute(text(sql))
+
+
+def _add_clusters_created_at(conn: Connection) -> None:
+    # ustun turi dialekt bo‘yicha: SQLite – DATETIME, PostgreSQL – TIMESTAMP
+    # (PostgreSQL da DATETIME turi yo‘q)
+    column_type = DateTime().compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE clusters ADD COLUMN created_at {column_type}"))
+
+
+# SQLite AUTOINCREMENT siz eng katta id ni o‘chirilgandan keyin qayta beradi:
+# o‘chirilgan klasterning eski tokeni (cid) yangi klasterga tegishli bo‘lib
+# qolardi. AUTOINCREMENT qo‘shish ham faqat jadvalni qayta qurish bilan.
+_SQLITE_AUTOINCREMENT_TABLES = {
+    "clusters": (
+        "CREATE TABLE clusters ("
+        " id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,"
+        " name VARCHAR NOT NULL,"
+        " district_code VARCHAR NOT NULL,"
+        " cluster_type VARCHAR,"
+        " leader_name VARCHAR,"
+        " leader_phone VARCHAR,"
+        " status VARCHAR,"
+        " admin_comment VARCHAR,"
+        " is_active BOOLEAN,"
+        " created_at DATETIME,"
+        " change_seq INTEGER DEFAULT '0' NOT NULL,"
+        " FOREIGN KEY(district_code) REFERENCES districts (code))",
+        ("id", "name", "district_code", "cluster_type", "leader_name", "leader_phone",
+         "status", "admin_comment", "is_active", "created_at", "change_seq"),
+        (
+            "CREATE INDEX ix_clusters_id ON clusters (id)",
+            "CREATE INDEX ix_clusters_status ON clusters (status)",
+            "CREATE INDEX ix_clusters_district_code ON clusters (district_code)",
+            "CREATE INDEX ix_clusters_status_name ON clusters (status, name)",
+            "CREATE INDEX ix_clusters_change_seq ON clusters (change_seq)",
+        ),
+    ),
+    "users": (
+        _SQLITE_CASCADE_TABLES["users"][0].replace(
+            " id INTEGER NOT NULL,", " id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,"
+        ).replace(" PRIMARY KEY (id),", ""),
+        _SQLITE_CASCADE_TABLES["users"][1],
+        _SQLITE_CASCADE_TABLES["users"][2],
+    ),
+}
+
+# sqlite_sequence boshlang‘ich qiymati: jadvalda ham, o‘chirish belgilari va
+# arxivda ham uchragan eng katta id (o‘chirilgan id lar qayta berilmasin)
+_SQLITE_ID_HIGH_WATER = {
+    "clusters": (
+        "SELECT MAX(id) FROM clusters",
+        "SELECT MAX(cluster_id) FROM change_tombstones",
+        "SELECT MAX(id) FROM clusters_archive",
+    ),
+    "users": (
+        "SELECT MAX(id) FROM users",
+        "SELECT MAX(id) FROM users_archive",
+    ),
+}
+
+
+def _autoincrement_ids(conn: Connection) -> None:
+    # PostgreSQL SERIAL sekvensiyasi id larni qayta bermaydi
+    if conn.dialect.name != "sqlite":
+        return
+    # ota jadval (clusters) nomi o‘zgarganda bolalardagi REFERENCES clusters
+    # "clusters__old" ga qayta yozilmasin
+    conn.execute(text("PRAGMA legacy_alter_table=ON"))
+    try:
+        for table, spec in _SQLITE_AUTOINCREMENT_TABLES.items():
+            _rebuild_sqlite_table(conn, table, *spec)
+    finally:
+        conn.execute(text("PRAGMA legacy_alter_table=OFF"))
+
+    for table, queries in _SQLITE_ID_HIGH_WATER.items():
+        high = max((conn.execute(text(sql)).scalar() or 0) for sql in queries)
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :t"), {"t": table})
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:t, :seq)"), {"t": table, "seq": high})
+
+
+def _create_archive_tables(conn: Connection) -> None:
+    from models import cluster_reports_archive, clusters_archive, users_archive
+
+    for table in (clusters_archive, users_archive, cluster_reports_archive):
+        table.create(conn, checkfirst=True)
+
+
+def _create_change_tables(conn: Connection) -> None:
+    from models import ChangeCounter, ChangeTombstone
+
+    for model in (ChangeCounter, ChangeTombstone):
+        model.__table__.create(conn, checkfirst=True)
+    # mavjud qatorlar 1-o‘zgarish sifatida belgilanadi (since=0 – hammasi)
+    conn.execute(text("DELETE FROM change_counter"))
+    conn.execute(text("INSERT INTO change_counter (id, value) VALUES (1, 1)"))
+
+
+def _create_jobs_table(conn: Connection) -> None:
+    from models import Job
+
+    Job.__table__.create(conn, checkfirst=True)
+
+
+def _create_job_payloads_table(conn: Connection) -> None:
+    from models import JobPayload
+
+    JobPayload.__table__.create(conn, checkfirst=True)
+
+
+def _add_job_lease_columns(conn: Connection) -> None:
+    # jobs jadvali migratsiya 5 gacha bo‘lmagan bazada create_all bilan
+    # (yangi ustunlari bilan) yaratilgan bo‘ladi
+    existing = {column["name"] for column in inspect(conn).get_columns("jobs")}
+    columns = {
+        "owner": "VARCHAR",
+        "lease_expires_at": DateTime().compile(dialect=conn.dialect),
+        "attempts": "INTEGER NOT NULL DEFAULT 0",
+    }
+    for name, ddl in columns.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE jobs ADD COLUMN {name} {ddl}"))
+    # eski "running" vazifalar – ijarasi yo‘q (muddati o‘tgan deb olinadi)
+    conn.execute(text("UPDATE jobs SET attempts = 1 WHERE status <> 'queued'"))
+
+
+def _create_data_versions_table(conn: Connection) -> None:
+    # qatorlar startupda data_versions.ensure_rows() bilan qo‘shiladi
+    from models import DataVersion
+
+    DataVersion.__table__.create(conn, checkfirst=True)
+
+
+# ============================================================
+#  Migratsiyalar ro‘yxati (faqat oxiriga qo‘shiladi!)
+# ============================================================
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1,
+        "Hot so‘rovlar uchun indekslar, (cluster_id, year) unikal",
+        (
+            # Unikal indeksdan oldin takroriy hisobotlarni tozalaymiz –
+            # har bir (cluster_id, year) uchun eng oxirgi yozuv qoladi.
+            "DELETE FROM cluster_reports WHERE id NOT IN "
+            "(SELECT MAX(id) FROM cluster_reports GROUP BY cluster_id, year)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_cluster_reports_cluster_year "
+            "ON cluster_reports (cluster_id, year)",
+            "CREATE INDEX IF NOT EXISTS ix_clusters_status ON clusters (status)",
+            "CREATE INDEX IF NOT EXISTS ix_clusters_district_code ON clusters (district_code)",
+            "CREATE INDEX IF NOT EXISTS ix_users_cluster_id ON users (cluster_id)",
+        ),
+    ),
+    Migration(
+        2,
+        "clusters.created_at va admin ro‘yxatlari uchun (status, name) indeksi",
+        (
+            _add_clusters_created_at,
+            "CREATE INDEX IF NOT EXISTS ix_clusters_status_name ON clusters (status, name)",
+        ),
+    ),
+    Migration(
+        3,
+        "users/cluster_reports.cluster_id uchun ON DELETE CASCADE, arxiv jadvallari",
+        (
+            # Yetim qatorlar (klasteri yo‘q) – kaskad semantikasi bo‘yicha o‘chiriladi,
+            # aks holda tashqi kalit tekshiruvi qayta qurishni to‘xtatadi.
+            "DELETE FROM cluster_reports WHERE cluster_id NOT IN (SELECT id FROM clusters)",
+            "DELETE FROM users WHERE cluster_id IS NOT NULL "
+            "AND cluster_id NOT IN (SELECT id FROM clusters)",
+            _cascade_foreign_keys,
+            _create_archive_tables,
+        ),
+    ),
+    Migration(
+        4,
+        "change_seq ustunlari, o‘zgarishlar hisoblagichi va o‘chirish belgilari",
+        (
+            "ALTER TABLE clusters ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE cluster_reports ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0",
+            _create_change_tables,
+            "UPDATE clusters SET change_seq = 1",
+            "UPDATE cluster_reports SET change_seq = 1",
+            "CREATE INDEX IF NOT EXISTS ix_clusters_change_seq ON clusters (change_seq)",
+            "CREATE INDEX IF NOT EXISTS ix_cluster_reports_change_seq ON cluster_reports (change_seq)",
+        ),
+    ),
+    Migration(
+        5,
+        "Fon vazifalari jadvali (jobs)",
+        (_create_jobs_table,),
+    ),
+    Migration(
+        6,
+        "Processlar orasidagi kesh muvofiqligi uchun data_versions jadvali",
+        (_create_data_versions_table,),
+    ),
+    Migration(
+        7,
+        "clusters/users id lari qayta ishlatilmaydi (SQLite AUTOINCREMENT)",
+        (_autoincrement_ids,),
+        foreign_keys=False,
+    ),
+    Migration(
+        8,
+        "Vazifa fayllari bazada (job_payloads) – istalgan worker o‘qiy oladi",
+        (_create_job_payloads_table,),
+    ),
+    Migration(
+        9,
+        "Vazifa ijarasi (owner, lease_expires_at, attempts) – heartbeat",
+        (_add_job_lease_columns,),
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# ============================================================
+#  Runner
+# ============================================================
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INTEGER PRIMARY KEY,"
+        " description VARCHAR NOT NULL,"
+        " applied_at VARCHAR NOT NULL)"
+    ))
+
+
+def current_version(conn: Connection) -> int:
+    _ensure_version_table(conn)
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+
+def _record(conn: Connection, migration: Migration) -> None:
+    conn.execute(
+        text(
+            "INSERT INTO schema_migrations (version, description, applied_at) "
+            "VALUES (:version, :description, :applied_at)"
+        ),
+        {
+            "version": migration.version,
+            "description": migration.description,
+            "applied_at": datetime.utcnow().isoformat(),
+        },
+    )
+
+
+def _apply(conn: Connection, migration: Migration, check_foreign_keys: bool = False) -> None:
+    for step in migration.steps:
+        if callable(step):
+            step(conn)
+        else:
+            conn.execute(text(step))
+    if check_foreign_keys:
+        violations = conn.execute(text("PRAGMA foreign_key_check")).all()
+        if violations:
+            raise RuntimeError(
+                f"Migratsiya {migration.version}: tashqi kalit buzilgan qatorlar: {violations[:10]}"
+            )
+    _record(conn, migration)
+
+
+def run_migrations(engine: Engine) -> int:
+    """
+    Qo‘llanmagan migratsiyalarni tartib bilan bajaradi.
+    Har bir migratsiya alohida tranzaksiyada: xato bo‘lsa o‘sha migratsiya
+    to‘liq bekor qilinadi. Qo‘llangan migratsiyalar sonini qaytaradi.
+    """
+    with engine.begin() as conn:
+        applied = current_version(conn)
+
+    count = 0
+    for migration in MIGRATIONS:
+        if migration.version <= applied:
+            continue
+        with engine.connect() as conn:
+            # PRAGMA foreign_keys tranzaksiya ichida e'tiborsiz qoldiriladi
+            toggle_fk = not migration.foreign_keys and conn.dialect.name == "sqlite"
+            if toggle_fk:
+                conn.execute(text("PRAGMA foreign_keys=OFF"))
+                conn.commit()
+            try:
+                with conn.begin():
+                    _apply(conn, migration, check_foreign_keys=toggle_fk)
+            finally:
+                if toggle_fk:
+                    # ulanish poolga qaytadi – PRAGMA qayta yoqiladi
+                    conn.execute(text("PRAGMA foreign_keys=ON"))
+                    conn.commit()
+        print(f"[MIGRATE] {migration.version}: {migration.description}")
+        count += 1
+    return count
+
+
+def ensure_schema(engine: Engine, metadata: MetaData) -> str:
+    """
+    Startup uchun sxema tekshiruvi:
+      "current"  – versiya mos, DDL bajarilmadi;
+      "created"  – bo‘sh baza: create_all + barcha migratsiyalar belgilandi;
+      "migrated" – mavjud baza: create_all (yangi jadvallar) + run_migrations.
+    """
+    with engine.connect() as conn:
+        inspector = inspect(conn)
+        existing = set(inspector.get_table_names())
+        if "schema_migrations" in existing:
+            version = conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar()
+            if (version or 0) >= LATEST_VERSION:
+                return "current"
+
+    metadata.create_all(bind=engine)
+    if existing & set(metadata.tables):
+        run_migrations(engine)
+        return "migrated"
+
+    # create_all modellarning joriy holatini yaratdi – migratsiyalar shart emas
+    with engine.begin() as conn:
+        applied = current_version(conn)
+        for migration in MIGRATIONS:
+            if migration.version > applied:
+                _record(conn, migration)
+    return "created"
+
+
+# ============================================================
+#  EXPLAIN QUERY PLAN – hot so‘rovlar indeksdan foydalanadimi?
+# ============================================================
+
+HOT_QUERIES: Dict[str, Tuple[str, dict]] = {
+    "cluster-report (cluster_id, year)": (
+        "SELECT * FROM cluster_reports WHERE cluster_id = :cid AND year = :year",
+        {"cid": 1, "year": 2025},
+    ),
+    "admin ro‘yxatlari (status)": (
+        "SELECT * FROM clusters WHERE status = :status",
+        {"status": "pending"},
+    ),
+    "admin ro‘yxatlari, keyset (status, name, id)": (
+        "SELECT * FROM clusters WHERE status = :status AND (name, id) > (:name, :id) "
+        "ORDER BY name, id LIMIT 50",
+        {"status": "pending", "name": "", "id": 0},
+    ),
+    "tuman bo‘yicha klasterlar (district_code)": (
+        "SELECT * FROM clusters WHERE district_code = :code",
+        {"code": "kasbi"},
+    ),
+    "o‘zgarishlar (cluster_reports.change_seq)": (
+        "SELECT change_seq FROM cluster_reports WHERE change_seq > :since ORDER BY change_seq LIMIT 1000",
+        {"since": 0},
+    ),
+    "fon vazifalari navbati (jobs.status, id)": (
+        "SELECT id FROM jobs WHERE status = :status ORDER BY id LIMIT 1",
+        {"status": "queued"},
+    ),
+    "klaster foydalanuvchisi (users.cluster_id)": (
+        "SELECT * FROM users WHERE cluster_id = :cid",
+        {"cid": 1},
+    ),
+}
+
+
+def check_query_plans(engine: Engine) -> Dict[str, Tuple[bool, List[str]]]:
+    """
+    SQLite uchun: har bir hot so‘rovning EXPLAIN QUERY PLAN natijasi va
+    u indeks ishlatadimi (to‘liq jadval skani emas).
+    """
+    result: Dict[str, Tuple[bool, List[str]]] = {}
+    with engine.connect() as conn:
+        for name, (sql, params) in HOT_QUERIES.items():
+            plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params)]
+            uses_index = any("USING" in line and "INDEX" in line for line in plan)
+            result[name] = (uses_index, plan)
+    return result
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    run_migrations(engine)
+    if "--check" in sys.argv:
+        ok = True
+        for name, (uses_index, plan) in check_query_plans(engine).items():
+            print(f"[{'OK' if uses_index else 'SCAN'}] {name}: {' | '.join(plan)}")
+            ok = ok and uses_index
+        sys.exit(0 if ok else 1)
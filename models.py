@@ -1,6 +1,8 @@
 # models.py ichida muhim qismlar
 
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Index, LargeBinary, Table, Text
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -16,12 +18,19 @@ class District(Base):
 
 class Cluster(Base):
     __tablename__ = "clusters"
+    __table_args__ = (
+        # admin ro‘yxatlari: status bo‘yicha filtr + nom bo‘yicha keyset
+        Index("ix_clusters_status_name", "status", "name"),
+        # o‘chirilgan klaster id si qayta berilmaydi – eski tokenlar
+        # (cid claim) yangi klasterga o‘tib qolmasin
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
     # asosiy ma'lumotlar
     name = Column(String, nullable=False)
-    district_code = Column(String, ForeignKey("districts.code"), nullable=False)
+    district_code = Column(String, ForeignKey("districts.code"), nullable=False, index=True)
     cluster_type = Column(String, nullable=True)
 
     # rahbar ma'lumotlari
@@ -29,33 +38,45 @@ class Cluster(Base):
     leader_phone = Column(String, nullable=True)
 
     # admin nazorati uchun
-    status = Column(String, default="pending")       # pending / approved / rejected
+    status = Column(String, default="pending", index=True)  # pending / approved / rejected
     admin_comment = Column(String, nullable=True)
     is_active = Column(Boolean, default=False)
+    # ro‘yxatdan o‘tgan vaqt (eski yozuvlarda – NULL)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=True)
+    # o‘zgarishlar ketma-ketligi (changes.py): admin qarori beradi;
+    # 0 – hali tasdiqlanmagan yangi klaster
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0", index=True)
 
     # bog'lanishlar
     district_obj = relationship("District", back_populates="clusters")
 
-    reports = relationship("ClusterReport", back_populates="cluster")
+    # bolalar qatorlarini baza o‘zi o‘chiradi (ON DELETE CASCADE)
+    reports = relationship("ClusterReport", back_populates="cluster", passive_deletes=True)
+    users = relationship("User", back_populates="cluster", passive_deletes=True)
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = {"sqlite_autoincrement": True}  # uid claim ham qayta ishlatilmasin
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     role = Column(String, default="cluster")  # "cluster" yoki "admin"
-    cluster_id = Column(Integer, ForeignKey("clusters.id"), nullable=True)
+    cluster_id = Column(Integer, ForeignKey("clusters.id", ondelete="CASCADE"), nullable=True, index=True)
 
-    cluster = relationship("Cluster")
+    cluster = relationship("Cluster", back_populates="users")
 
 
 class ClusterReport(Base):
     __tablename__ = "cluster_reports"
+    __table_args__ = (
+        # bitta klaster – bitta yil uchun bitta hisobot
+        Index("ux_cluster_reports_cluster_year", "cluster_id", "year", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    cluster_id = Column(Integer, ForeignKey("clusters.id"), nullable=False)
+    cluster_id = Column(Integer, ForeignKey("clusters.id", ondelete="CASCADE"), nullable=False)
     year = Column(Integer, nullable=False)
 
     production = Column(Float, default=0)
@@ -63,4 +84,138 @@ class ClusterReport(Base):
     employment = Column(Integer, default=0)
     profitability = Column(Float, default=0)
 
+    # o‘zgarishlar ketma-ketligi (changes.py) – har bir yozishda yangilanadi
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0", index=True)
+
     cluster = relationship("Cluster", back_populates="reports")
+
+
+# ============================================================
+#  O‘zgarishlar ketma-ketligi (/api/agrodata/changes)
+# ============================================================
+
+class ChangeCounter(Base):
+    """Bitta qator (id=1): oxirgi berilgan change_seq."""
+    __tablename__ = "change_counter"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False)
+
+
+class ChangeTombstone(Base):
+    """O‘chirilgan (yoki arxivlangan) klaster – uning hisobotlari ham."""
+    __tablename__ = "change_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    cluster_id = Column(Integer, nullable=False)
+    change_seq = Column(Integer, nullable=False, index=True)
+
+
+# ============================================================
+#  Umumiy ma'lumot versiyalari (data_versions.py)
+# ============================================================
+
+class DataVersion(Base):
+    """Har bir domen (reports, clusters, users, districts) uchun bitta qator."""
+    __tablename__ = "data_versions"
+
+    domain = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# ============================================================
+#  Fon vazifalari (jobs.py)
+# ============================================================
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # worker navbatdagi eng eski vazifani oladi: status='queued' ORDER BY id
+        Index("ix_jobs_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    # queued -> running -> succeeded | failed
+    status = Column(String, nullable=False, default="queued")
+    params = Column(Text, nullable=True)      # JSON
+    result = Column(Text, nullable=True)      # JSON
+    error = Column(Text, nullable=True)
+    progress_done = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer, nullable=True)
+    created_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # ishlayotgan vazifa egasi (host:pid:runner) va uning ijara muddati:
+    # worker heartbeat bilan uzaytiradi, muddati o‘tsa vazifa qayta navbatga
+    owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class JobPayload(Base):
+    """
+    Vazifa fayli (masalan, import uchun yuklangan CSV) – bazada, bo‘laklab:
+    vazifani istalgan process/konteyner workeri olishi mumkin, lokal disk
+    (/tmp) esa faqat yuklagan processga ko‘rinadi.
+    """
+    __tablename__ = "job_payloads"
+
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+
+
+# ============================================================
+#  Arxiv jadvallari (klasterni o‘chirish o‘rniga arxivlash)
+# ============================================================
+#
+# Asl jadval ustunlari + archived_at. Asl id saqlanadi, lekin kalit emas
+# (SQLite o‘chirilgan id ni qayta berishi mumkin) – archive_id kalit.
+# Tashqi kalit va unikal cheklovlar yo‘q: arxivdagi login yangi
+# ro‘yxatdan o‘tishga xalaqit bermaydi.
+
+def _archive_table(name: str, *columns: Column) -> Table:
+    return Table(
+        name,
+        Base.metadata,
+        Column("archive_id", Integer, primary_key=True),
+        *columns,
+        Column("archived_at", DateTime, nullable=False),
+    )
+
+
+clusters_archive = _archive_table(
+    "clusters_archive",
+    Column("id", Integer, nullable=False, index=True),
+    Column("name", String, nullable=False),
+    Column("district_code", String, nullable=False),
+    Column("cluster_type", String),
+    Column("leader_name", String),
+    Column("leader_phone", String),
+    Column("status", String),
+    Column("admin_comment", String),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+)
+
+users_archive = _archive_table(
+    "users_archive",
+    Column("id", Integer, nullable=False),
+    Column("username", String, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("role", String),
+    Column("cluster_id", Integer, index=True),
+)
+
+cluster_reports_archive = _archive_table(
+    "cluster_reports_archive",
+    Column("id", Integer, nullable=False),
+    Column("cluster_id", Integer, nullable=False, index=True),
+    Column("year", Integer, nullable=False),
+    Column("production", Float),
+    Column("export", Float),
+    Column("employment", Integer),
+    Column("profitability", Float),
+)
@@ -0,0 +1,171 @@
+# moderation.py
+"""
+Admin moderatsiyasi: klasterlarni tasdiqlash / rad etish / bloklash /
+blokdan chiqarish / o‘chirish.
+
+Qarorlar set-based tarzda qo‘llanadi: har bir amal uchun bitta
+UPDATE ... WHERE id IN (...). O‘chirishda – bitta DELETE FROM clusters:
+hisobotlar va foydalanuvchilarni baza o‘zi o‘chiradi (ON DELETE CASCADE).
+Arxivlashda har jadval uchun bitta INSERT ... SELECT arxivga, keyin o‘sha
+DELETE. Python tomonda qatorlar yuklanmaydi.
+Commit chaqiruvchi endpoint tomonidan qilinadi, shuning uchun 500 ta
+klaster ham bitta tranzaksiyada yoziladi.
+
+Butun paket bitta change_seq oladi (changes.py): yangilangan klasterlarga
+yoziladi, o‘chirilganlar uchun change_tombstones ga belgi qo‘yiladi.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional, Sequence
+
+from pydantic import BaseModel
+from sqlalchemy import case, delete, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from changes import next_change_seq, record_removals
+from models import (
+    Cluster,
+    ClusterReport,
+    User,
+    cluster_reports_archive,
+    clusters_archive,
+    users_archive,
+)
+
+Action = Literal["approve", "reject", "block", "unblock", "delete", "archive"]
+
+
+class ModerationItem(BaseModel):
+    cluster_id: int
+    action: Action
+    comment: Optional[str] = None
+
+
+class ModerationBatch(BaseModel):
+    items: List[ModerationItem]
+
+
+def _comment_values(items: Sequence[ModerationItem]):
+    """Har bir klasterga o‘z izohi: CASE id WHEN .. THEN .. ELSE admin_comment END."""
+    comments = {item.cluster_id: item.comment for item in items if item.comment}
+    if not comments:
+        return {}
+    return {"admin_comment": case(comments, value=Cluster.id, else_=Cluster.admin_comment)}
+
+
+def _ids(items: Sequence[ModerationItem]) -> List[int]:
+    return [item.cluster_id for item in items]
+
+
+def _approve(db: Session, items: Sequence[ModerationItem], change_seq: int) -> None:
+    db.execute(
+        update(Cluster)
+        .where(Cluster.id.in_(_ids(items)))
+        .values(status="approved", is_active=True, change_seq=change_seq, **_comment_values(items))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _reject(db: Session, items: Sequence[ModerationItem], change_seq: int) -> None:
+    db.execute(
+        update(Cluster)
+        .where(Cluster.id.in_(_ids(items)))
+        .values(status="rejected", is_active=False, change_seq=change_seq, **_comment_values(items))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _block(db: Session, items: Sequence[ModerationItem], change_seq: int) -> None:
+    db.execute(
+        update(Cluster)
+        .where(Cluster.id.in_(_ids(items)))
+        .values(status="blocked", is_active=False, change_seq=change_seq, **_comment_values(items))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _unblock(db: Session, items: Sequence[ModerationItem], change_seq: int) -> None:
+    # agar avval approved bo‘lgan bo‘lsa shu holatga qaytaramiz
+    db.execute(
+        update(Cluster)
+        .where(Cluster.id.in_(_ids(items)))
+        .values(
+            is_active=True,
+            status=case((Cluster.status == "blocked", "approved"), else_=Cluster.status),
+            change_seq=change_seq,
+            **_comment_values(items),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _delete(db: Session, items: Sequence[ModerationItem], change_seq: int) -> None:
+    record_removals(db, _ids(items), change_seq)
+    # users va cluster_reports – ON DELETE CASCADE
+    db.execute(
+        delete(Cluster).where(Cluster.id.in_(_ids(items)))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _copy_to_archive(db: Session, archive, model, where, archived_at: datetime) -> None:
+    # change_seq kabi xizmat ustunlari arxivlanmaydi
+    columns = [c.name for c in model.__table__.columns if c.name in archive.c]
+    db.execute(
+        insert(archive).from_select(
+            columns + ["archived_at"],
+            select(*(getattr(model, name) for name in columns), literal(archived_at))
+            .where(where),
+        )
+    )
+
+
+def _archive(db: Session, items: Sequence[ModerationItem], change_seq: int) -> None:
+    ids = _ids(items)
+    archived_at = datetime.utcnow()
+    _copy_to_archive(db, cluster_reports_archive, ClusterReport, ClusterReport.cluster_id.in_(ids), archived_at)
+    _copy_to_archive(db, users_archive, User, User.cluster_id.in_(ids), archived_at)
+    _copy_to_archive(db, clusters_archive, Cluster, Cluster.id.in_(ids), archived_at)
+    _delete(db, items, change_seq)
+
+
+_HANDLERS = {
+    "approve": _approve,
+    "reject": _reject,
+    "block": _block,
+    "unblock": _unblock,
+    "delete": _delete,
+    "archive": _archive,
+}
+
+
+def apply_moderation(db: Session, items: Sequence[ModerationItem]) -> List[Dict[str, Any]]:
+    """
+    Qarorlarni qo‘llaydi va har bir element uchun natija qaytaradi:
+      {"cluster_id": 5, "action": "approve", "result": "ok" | "not_found" | "invalid", "detail": ...}
+    Commit qilinmaydi.
+    """
+    ids = {item.cluster_id for item in items}
+    existing = set(db.execute(select(Cluster.id).where(Cluster.id.in_(ids))).scalars()) if ids else set()
+
+    results: List[Dict[str, Any]] = []
+    grouped: Dict[str, List[ModerationItem]] = {}
+    seen = set()
+    for item in items:
+        outcome = {"cluster_id": item.cluster_id, "action": item.action, "result": "ok", "detail": None}
+        if item.cluster_id not in existing:
+            outcome.update(result="not_found", detail="Klaster topilmadi.")
+        elif item.cluster_id in seen:
+            outcome.update(result="invalid", detail="Bitta so‘rovda klaster faqat bir marta bo‘lishi mumkin.")
+        elif item.action == "reject" and not item.comment:
+            outcome.update(result="invalid", detail="Rad etishda izoh majburiy.")
+        else:
+            seen.add(item.cluster_id)
+            grouped.setdefault(item.action, []).append(item)
+        results.append(outcome)
+
+    if grouped:
+        change_seq = next_change_seq(db)
+        for action, group in grouped.items():
+            _HANDLERS[action](db, group, change_seq)
+
+    return results
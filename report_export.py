@@ -0,0 +1,203 @@
+# report_export.py
+"""
+Hisobotlarni ommaviy eksport qilish (CSV / JSONL / Parquet / Arrow IPC).
+
+ClusterReport + Cluster + District qatorlari bazadan yield_per bilan
+bo‘laklab o‘qiladi (PostgreSQL da server-side cursor, SQLite da
+fetchmany) va har bir bo‘lak darhol kodlanib javobga yoziladi. Xotira
+eksport hajmiga bog‘liq emas – faqat bitta bo‘lak (EXPORT_BATCH_SIZE
+qator) ushlab turiladi.
+
+Generator o‘z sessiyasini ochadi: StreamingResponse tanasi endpoint
+qaytganidan keyin o‘qiladi, dependency sessiyasi esa o‘sha paytda
+yopilgan bo‘ladi.
+
+Parquet va Arrow uchun pyarrow kerak (ixtiyoriy bog‘liqlik).
+"""
+import csv
+import io
+import os
+import re
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from database import ReadSessionLocal
+from models import Cluster, ClusterReport, District
+from responses import encode_json
+
+try:  # pyarrow ixtiyoriy – o‘rnatilmagan bo‘lsa faqat csv/jsonl
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+
+FORMATS = ("csv", "jsonl", "parquet", "arrow")
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+EXTENSIONS = {"csv": "csv", "jsonl": "jsonl", "parquet": "parquet", "arrow": "arrows"}
+
+COLUMNS: Tuple[str, ...] = (
+    "cluster_id", "cluster_name", "district_code", "district_name", "cluster_type",
+    "cluster_status", "year", "production", "export", "employment", "profitability",
+)
+
+
+class ExportFormatError(ValueError):
+    pass
+
+
+def check_format(fmt: str) -> None:
+    if fmt not in FORMATS:
+        raise ExportFormatError(f"Noma'lum format: {fmt}. Mumkin: {', '.join(FORMATS)}.")
+    if fmt in COLUMNAR_FORMATS and pyarrow is None:
+        raise ExportFormatError(f"{fmt} formati uchun serverda pyarrow o‘rnatilmagan.")
+
+
+def export_filename(fmt: str, year: Optional[int], district: Optional[str]) -> str:
+    parts = ["cluster-reports"] + [str(p) for p in (year, district) if p is not None]
+    # Content-Disposition ichiga faqat xavfsiz belgilar
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", "-".join(parts)) + "." + EXTENSIONS[fmt]
+
+
+def export_query(year: Optional[int] = None, district: Optional[str] = None):
+    query = (
+        select(
+            ClusterReport.cluster_id,
+            Cluster.name,
+            Cluster.district_code,
+            District.name,
+            Cluster.cluster_type,
+            Cluster.status,
+            ClusterReport.year,
+            ClusterReport.production,
+            ClusterReport.export,
+            ClusterReport.employment,
+            ClusterReport.profitability,
+        )
+        .join(Cluster, Cluster.id == ClusterReport.cluster_id)
+        .join(District, District.code == Cluster.district_code, isouter=True)
+    )
+    if year is not None:
+        query = query.where(ClusterReport.year == year)
+    if district is not None:
+        query = query.where(Cluster.district_code == district)
+    # ux_cluster_reports_cluster_year indeksi tartibida – saralash uchun vaqtinchalik jadval kerak emas
+    return query.order_by(ClusterReport.cluster_id, ClusterReport.year)
+
+
+def _batches(year: Optional[int], district: Optional[str]) -> Iterator[List[tuple]]:
+    db = ReadSessionLocal()
+    try:
+        result = db.execute(export_query(year, district).execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+# ============================================================
+#  Kodlovchilar: qator bo‘laklari -> bayt bo‘laklari
+# ============================================================
+
+def _csv(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    # Excel UTF-8 ni to‘g‘ri ochishi uchun BOM
+    writer.writerow(COLUMNS)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _jsonl(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"".join(encode_json(dict(zip(COLUMNS, row))) + b"\n" for row in batch)
+
+
+class _DrainableSink(io.RawIOBase):
+    """pyarrow yozuvchisi uchun fayl: yozilgan baytlar drain() bilan olinadi."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_schema():
+    return pyarrow.schema([
+        ("cluster_id", pyarrow.int64()),
+        ("cluster_name", pyarrow.string()),
+        ("district_code", pyarrow.string()),
+        ("district_name", pyarrow.string()),
+        ("cluster_type", pyarrow.string()),
+        ("cluster_status", pyarrow.string()),
+        ("year", pyarrow.int32()),
+        ("production", pyarrow.float64()),
+        ("export", pyarrow.float64()),
+        ("employment", pyarrow.int64()),
+        ("profitability", pyarrow.float64()),
+    ])
+
+
+def _columnar(batches: Iterator[List[tuple]], fmt: str) -> Iterator[bytes]:
+    schema = _arrow_schema()
+    sink = _DrainableSink()
+    if fmt == "parquet":
+        # har bir bo‘lak – alohida row group
+        writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pyarrow.ipc.new_stream(sink, schema)
+    try:
+        for batch in batches:
+            columns = list(zip(*batch))
+            writer.write_batch(pyarrow.RecordBatch.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    # parquet footer / arrow stream oxiri
+    yield sink.drain()
+
+
+def stream_export(fmt: str, year: Optional[int] = None, district: Optional[str] = None) -> Iterator[bytes]:
+    """StreamingResponse uchun bayt bo‘laklari generatori (format oldindan tekshirilgan)."""
+    batches = _batches(year, district)
+    if fmt == "csv":
+        chunks = _csv(batches)
+    elif fmt == "jsonl":
+        chunks = _jsonl(batches)
+    else:
+        chunks = _columnar(batches, fmt)
+    try:
+        yield from chunks
+    finally:
+        # mijoz uzilsa ham sessiya darhol yopilsin
+        batches.close()
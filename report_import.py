@@ -0,0 +1,198 @@
+# report_import.py
+"""
+Hisobotlarni ommaviy import qilish (CSV / JSONL).
+
+Fayl qatorma-qator o‘qiladi, qatorlar CHUNK_SIZE lik bo‘laklarda
+tekshiriladi va har bir bo‘lak bitta
+    INSERT ... ON CONFLICT (cluster_id, year) DO UPDATE
+executemany bilan yoziladi. Butun import bitta tranzaksiyada – commit
+endpoint tomonidan bir marta qilinadi; barcha yozilgan qatorlar bitta
+change_seq oladi (changes.py).
+"""
+import csv
+import io
+import json
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from changes import next_change_seq
+from database import dialect_insert
+from models import Cluster, ClusterReport
+
+CHUNK_SIZE = 1000
+# Javobda qaytariladigan xatolar soni (umumiy soni error_count da)
+MAX_ERRORS = 1000
+
+REPORT_FIELDS = ("production", "export", "employment", "profitability")
+
+FORMATS = ("csv", "jsonl")
+
+
+class ImportRow(BaseModel):
+    cluster_id: Optional[int] = None
+    year: int
+    production: float
+    export: float
+    employment: int
+    profitability: float
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(filename: Optional[str], fmt: Optional[str]) -> str:
+    """Format aniq berilmasa fayl kengaytmasidan aniqlanadi."""
+    if fmt:
+        fmt = fmt.lower()
+        if fmt == "ndjson":
+            fmt = "jsonl"
+        if fmt not in FORMATS:
+            raise ImportFormatError(f"Noma'lum format: {fmt}. Mumkin: csv, jsonl.")
+        return fmt
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    raise ImportFormatError("Fayl formatini aniqlab bo‘lmadi (format=csv yoki format=jsonl bering).")
+
+
+def _iter_raw_rows(fileobj: BinaryIO, fmt: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    (qator raqami, xom dict, xato) ketma-ketligi. Fayl xotiraga to‘liq
+    o‘qilmaydi.
+    """
+    text_stream = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text_stream)
+            for row_no, raw in enumerate(reader, start=1):
+                # bo‘sh kataklar – qiymat berilmagan
+                yield row_no, {k: v for k, v in raw.items() if k and v not in (None, "")}, None
+        else:
+            row_no = 0
+            for line in text_stream:
+                if not line.strip():
+                    continue
+                row_no += 1
+                try:
+                    raw = json.loads(line)
+                except ValueError as exc:
+                    yield row_no, None, f"JSON xato: {exc}"
+                    continue
+                if not isinstance(raw, dict):
+                    yield row_no, None, "Har bir qator JSON obyekt bo‘lishi kerak."
+                    continue
+                yield row_no, raw, None
+    finally:
+        # UploadFile ning o‘z faylini yopib qo‘ymaslik uchun
+        text_stream.detach()
+
+
+def _upsert_statement(dialect_name: str):
+    stmt = dialect_insert(dialect_name)(ClusterReport.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=["cluster_id", "year"],
+        set_={field: stmt.excluded[field] for field in REPORT_FIELDS + ("change_seq",)},
+    )
+
+
+class ReportImporter:
+    """
+    Bitta import jarayoni. cluster_id berilsa (klaster foydalanuvchisi) –
+    barcha qatorlar shu klasterga yoziladi; berilmasa (admin) – har bir
+    qatorda cluster_id majburiy.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        cluster_id: Optional[int] = None,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ):
+        self.db = db
+        self.cluster_id = cluster_id
+        # har bir bo‘lakdan keyin o‘qilgan qatorlar soni bilan chaqiriladi (fon vazifasi)
+        self.on_progress = on_progress
+        self.statement = _upsert_statement(db.get_bind().dialect.name)
+        self.total_rows = 0
+        self.imported = 0
+        self.error_count = 0
+        self.errors: List[Dict[str, Any]] = []
+        # yozilgan yillar (o‘zgarish hodisasi uchun)
+        self.years: Set[int] = set()
+        # birinchi yozuvda olinadi – faqat xatolardan iborat import hisoblagichga tegmaydi
+        self.change_seq: Optional[int] = None
+
+    def _error(self, row_no: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"row": row_no, "error": message})
+
+    def run(self, fileobj: BinaryIO, fmt: str) -> Dict[str, Any]:
+        chunk: List[Tuple[int, ImportRow]] = []
+        for row_no, raw, error in _iter_raw_rows(fileobj, fmt):
+            self.total_rows += 1
+            if error is not None:
+                self._error(row_no, error)
+                continue
+            try:
+                row = ImportRow.model_validate(raw)
+            except ValidationError as exc:
+                self._error(row_no, "; ".join(
+                    f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors()
+                ))
+                continue
+
+            if self.cluster_id is not None:
+                if row.cluster_id not in (None, self.cluster_id):
+                    self._error(row_no, "Faqat o‘z klasteringiz uchun hisobot yuklash mumkin.")
+                    continue
+                row.cluster_id = self.cluster_id
+            elif row.cluster_id is None:
+                self._error(row_no, "cluster_id majburiy.")
+                continue
+
+            chunk.append((row_no, row))
+            if len(chunk) >= CHUNK_SIZE:
+                self._flush(chunk)
+                chunk = []
+        if chunk:
+            self._flush(chunk)
+
+        return {
+            "total_rows": self.total_rows,
+            "imported": self.imported,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+    def _flush(self, chunk: List[Tuple[int, ImportRow]]) -> None:
+        if self.cluster_id is None:
+            ids = {row.cluster_id for _, row in chunk}
+            existing = set(self.db.execute(select(Cluster.id).where(Cluster.id.in_(ids))).scalars())
+        else:
+            existing = {self.cluster_id}
+
+        # bitta bo‘lak ichida takrorlangan (cluster_id, year) – oxirgisi yoziladi
+        params: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        for row_no, row in chunk:
+            if row.cluster_id not in existing:
+                self._error(row_no, f"Klaster topilmadi: {row.cluster_id}.")
+                continue
+            params[(row.cluster_id, row.year)] = row.model_dump()
+            self.years.add(row.year)
+            self.imported += 1
+
+        if params:
+            if self.change_seq is None:
+                self.change_seq = next_change_seq(self.db)
+            for values in params.values():
+                values["change_seq"] = self.change_seq
+            self.db.execute(self.statement, list(params.values()))
+        if self.on_progress is not None:
+            self.on_progress(self.total_rows)
@@ -0,0 +1,65 @@
+# responses.py
+"""
+Tez JSON javoblar (orjson).
+
+Standart JSONResponse ma'lumotni jsonable_encoder va stdlib json orqali
+o‘tkazadi – katta ro‘yxatlarda bu profildagi eng qimmat qism. Bu yerda:
+  - encode_json()      – dict/list/tuple -> bytes (orjson, bo‘lmasa json)
+  - FastJSONResponse   – loyiha bo‘yicha standart response class
+  - rows_response()    – SQL qatorlaridan to‘g‘ridan-to‘g‘ri baytlarga
+
+orjson ixtiyoriy: o‘rnatilmagan bo‘lsa stdlib json ishlatiladi (natija
+bir xil ko‘rinishda: ensure_ascii=False, ixcham ajratgichlar).
+"""
+import datetime
+import json
+from typing import Any, Iterable, List, Optional, Sequence
+
+from fastapi.responses import JSONResponse, Response
+
+try:  # orjson ixtiyoriy – o‘rnatilmagan bo‘lsa stdlib json
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"JSON ga o‘girib bo‘lmaydi: {type(value).__name__}")
+
+
+def encode_json(data: Any) -> bytes:
+    """Python obyekt -> UTF-8 JSON baytlari (datetime – ISO 8601)."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse, lekin orjson bilan (FastAPI(default_response_class=...))."""
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+def rows_to_dicts(keys: Sequence[str], rows: Iterable[Sequence[Any]]) -> List[dict]:
+    """SELECT natijasi (ustun nomlari + qator tuple lari) -> dict lar ro‘yxati."""
+    keys = tuple(keys)
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def rows_response(
+    keys: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    extra: Optional[dict] = None,
+    items_key: str = "items",
+) -> Response:
+    """
+    Katta ro‘yxatlar uchun: qatorlar pydantic/jsonable_encoder ga
+    tushmasdan to‘g‘ridan-to‘g‘ri JSON baytlariga aylanadi.
+    extra berilsa – {"items": [...], **extra}, aks holda faqat ro‘yxat.
+    """
+    items = rows_to_dicts(keys, rows)
+    payload: Any = items if extra is None else {items_key: items, **extra}
+    return Response(content=encode_json(payload), media_type="application/json")
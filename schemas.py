@@ -1,5 +1,6 @@
 # schemas.py
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 from pydantic import BaseModel, ConfigDict
 
 
@@ -76,6 +77,70 @@ class AdminClusterItem(BaseModel):
     is_active: bool
     total_reports: int
     model_config = ConfigDict(from_attributes=False)
+
+
+# ---------- ADMIN: SAHIFALANGAN KLASTER RO'YXATI ----------
+# /api/admin/pending-clusters va /api/admin/active-clusters javobi
+# (AdminClusterItem o‘zgarmaydi – bu alohida, yangi ko‘rinish).
+class AdminClusterListItem(BaseModel):
+    id: int
+    cluster_name: str
+    district_code: str
+    district_name: Optional[str] = None
+    cluster_type: Optional[str] = None
+    leader_name: Optional[str] = None
+    leader_phone: Optional[str] = None
+    status: str
+    # migratsiya 2 gacha ro‘yxatdan o‘tgan klasterlarda – null
+    created_at: Optional[datetime] = None
+    username: str
+    # faqat active-clusters ro‘yxatida
+    is_active: Optional[bool] = None
+
+
+class AdminClusterPage(BaseModel):
+    items: List[AdminClusterListItem]
+    next_cursor: Optional[str] = None
+    total: int
+
+
+# ---------- ADMIN: KLASTER TARIXI ----------
+class HistoryCluster(BaseModel):
+    id: int
+    name: str
+    district_code: str
+    cluster_type: Optional[str] = None
+    leader_name: Optional[str] = None
+    leader_phone: Optional[str] = None
+    status: Optional[str] = None
+    admin_comment: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class HistoryUser(BaseModel):
+    username: Optional[str] = None
+
+
+class HistoryReport(BaseModel):
+    year: int
+    production: Optional[float] = None
+    export: Optional[float] = None
+    employment: Optional[int] = None
+    profitability: Optional[float] = None
+
+
+class ClusterHistory(BaseModel):
+    cluster: HistoryCluster
+    user: HistoryUser
+    reports: List[HistoryReport]
+    next_before_year: Optional[int] = None
+
+
+class ClusterHistoryBatch(BaseModel):
+    items: List[ClusterHistory]
+    not_found: List[int]
+
+
 class ClusterAdminView(BaseModel):
     id: int
     name: str
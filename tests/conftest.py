@@ -0,0 +1,85 @@
+# tests/conftest.py
+"""
+Umumiy test sozlamalari.
+
+database.py engine larni import paytida muhit o‘zgaruvchilaridan quradi –
+shuning uchun ilova modullari import qilinishidan oldin vaqtinchalik baza
+va test rejimi sozlamalari o‘rnatiladi. agro.db ga tegilmaydi.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+_TMP = tempfile.mkdtemp(prefix="agro-tests-")
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TMP, 'app.db')}")
+os.environ.setdefault("JOB_POLL_SECONDS", "0.05")
+os.environ.setdefault("JOB_SHUTDOWN_TIMEOUT", "5")
+# parol xeshlash shu processda (process pool testlarni sekinlashtiradi)
+os.environ.setdefault("HASH_POOL_SIZE", "0")
+# bitta process – umumiy versiyalarni davriy tekshirish shart emas
+os.environ.setdefault("DATA_VERSION_CHECK_MS", "0")
+
+import pytest  # noqa: E402
+
+from database import make_engine  # noqa: E402
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    """Bo‘sh vaqtinchalik SQLite baza (ilova bilan bir xil PRAGMA lar)."""
+    engine = make_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    yield engine
+    engine.dispose()
+
+
+# ============================================================
+#  Ilova (lifespan bilan) va yordamchilar
+# ============================================================
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def login(client, username: str, password: str) -> dict:
+    response = client.post("/auth/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client) -> dict:
+    return login(client, "admin", "admin")
+
+
+def register_cluster(client, username: str, password: str = "secret", district_code: str = "qarshi") -> int:
+    response = client.post("/auth/register-cluster", json={
+        "username": username,
+        "password": password,
+        "district_code": district_code,
+        "cluster_name": f"{username} klasteri",
+        "leader_name": "Rahbar",
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["cluster_id"]
+
+
+def wait_for_job(client, headers: dict, job_id: int, timeout: float = 10.0) -> dict:
+    import time
+
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/admin/jobs/{job_id}", headers=headers).json()
+        if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
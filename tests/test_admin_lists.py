@@ -0,0 +1,31 @@
+# tests/test_admin_lists.py
+"""
+Admin klaster ro‘yxatlari: javob tayyor baytlar sifatida yuboriladi
+(response_model tekshiruvisiz), shuning uchun haqiqiy javob va OpenAPI
+dagi schemas.AdminClusterPage bir-biridan uzoqlashmasligi shu yerda
+tekshiriladi.
+"""
+import pytest
+
+from schemas import AdminClusterListItem, AdminClusterPage
+
+from conftest import register_cluster
+
+
+@pytest.mark.parametrize("path", ["/api/admin/pending-clusters", "/api/admin/active-clusters"])
+def test_list_body_matches_documented_schema(client, admin_headers, path):
+    cluster_id = register_cluster(client, f"list-{path.rsplit('/', 1)[-1]}")
+    if path.endswith("active-clusters"):
+        response = client.post("/api/admin/cluster-approve", json={"cluster_id": cluster_id}, headers=admin_headers)
+        assert response.status_code == 200, response.text
+
+    body = client.get(path, params={"limit": 500}, headers=admin_headers).json()
+    page = AdminClusterPage.model_validate(body)
+    assert cluster_id in [item.id for item in page.items]
+    fields = set(AdminClusterListItem.model_fields)
+    for item in body["items"]:
+        # hujjatda yo‘q kalit ham bo‘lmasin
+        assert set(item) <= fields, set(item) - fields
+
+    schema = client.get("/openapi.json").json()["paths"][path]["get"]["responses"]["200"]
+    assert schema["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/AdminClusterPage"}
@@ -0,0 +1,45 @@
+# tests/test_agrodata.py
+"""
+/api/agrodata: yillik trend (LAG) va ?fields= filtri.
+"""
+from main import _trend
+
+from conftest import login, register_cluster
+
+
+def test_trend_percent_is_null_when_previous_is_zero():
+    assert _trend(5, None) == (0, 0)
+    assert _trend(5, 0) == (5, None)
+    assert _trend(0, 0) == (0, None)
+    assert _trend(15, 10) == (5, 50.0)
+
+
+def test_agrodata_trend_from_zero(client, admin_headers):
+    cluster_id = register_cluster(client, "trend-zero", district_code="kasbi")
+    client.post("/api/admin/cluster-approve", json={"cluster_id": cluster_id}, headers=admin_headers)
+    headers = login(client, "trend-zero", "secret")
+    for year, production in ((2040, 0), (2041, 8)):
+        response = client.post("/api/cluster-report", headers=headers, json={
+            "year": year, "production": production, "export": 1, "employment": 1, "profitability": 1,
+        })
+        assert response.status_code == 200, response.text
+
+    data = client.get("/api/agrodata/2041/kasbi").json()
+    (item,) = [c for c in data["2041"]["kasbi"] if c["id"] == cluster_id]
+    assert item["trend_delta"]["production"] == 8
+    assert item["trend"]["production"] is None
+    assert item["trend"]["export"] == 0
+
+
+def test_trend_only_fields_imply_all_metrics(client):
+    from main import AGRO_FIELDS, _parse_agro_fields
+
+    assert _parse_agro_fields("trend") == (AGRO_FIELDS, True)
+    assert _parse_agro_fields("export") == (("export",), False)
+
+    data = client.get("/api/agrodata", params={"fields": "trend"}).json()
+    items = [item for districts in data.values() for rows in districts.values() for item in rows]
+    assert items
+    for item in items:
+        assert set(item["trend"]) == set(item["trend_delta"]) == set(AGRO_FIELDS)
+        assert all(field in item for field in AGRO_FIELDS)
@@ -0,0 +1,46 @@
+# tests/test_auth_connections.py
+"""
+Login va ro‘yxatdan o‘tish parol xeshini (process pool) kutayotganda
+bazaga ulanish band qilinmasligi kerak: aks holda sekin xeshlar pool va
+SQLite o‘qish tranzaksiyalarini ushlab turadi.
+"""
+import pytest
+
+import auth
+import jobs
+from database import engine
+
+from conftest import register_cluster
+
+
+@pytest.fixture
+def checked_out_during_hash(client, monkeypatch):
+    """Xesh funksiyalari chaqirilgan paytdagi band ulanishlar soni."""
+    observed = []
+
+    def spy(original):
+        async def wrapper(*args):
+            observed.append(engine.pool.checkedout())
+            return await original(*args)
+        return wrapper
+
+    monkeypatch.setattr(auth, "verify_password_async", spy(auth.verify_password_async))
+    monkeypatch.setattr(auth, "hash_password_async", spy(auth.hash_password_async))
+    # fon workerlari ham shu pooldan oladi – o‘lchov paytida to‘xtatiladi
+    jobs.runner.stop()
+    try:
+        yield observed
+    finally:
+        jobs.runner.start()
+
+
+def test_login_releases_connection_before_password_check(client, checked_out_during_hash):
+    response = client.post("/auth/login", data={"username": "admin", "password": "admin"})
+    assert response.status_code == 200
+    assert checked_out_during_hash == [0]
+
+
+def test_register_releases_connection_before_hashing(client, checked_out_during_hash):
+    register_cluster(client, "pool-free")
+    assert checked_out_during_hash == [0]
+    assert engine.pool.checkedout() == 0
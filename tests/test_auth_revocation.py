@@ -0,0 +1,53 @@
+# tests/test_auth_revocation.py
+"""
+O‘chirilgan klaster tokeni qayta tiklanmasligi: id lar qayta ishlatilmaydi
+(AUTOINCREMENT), bekor qilish to‘plami ham startupdagi kabi qayta
+qurilganda o‘chirilgan id larni o‘z ichiga oladi.
+"""
+from auth import rebuild_revocations
+from database import SessionLocal
+
+from conftest import login, register_cluster
+
+
+def _approve(client, admin_headers, cluster_id: int) -> None:
+    response = client.post("/api/admin/cluster-approve", json={"cluster_id": cluster_id}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+
+def _delete(client, admin_headers, cluster_id: int) -> None:
+    response = client.delete(f"/api/admin/cluster/{cluster_id}", headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+
+def test_deleted_cluster_token_stays_revoked_after_id_could_be_reused(client, admin_headers):
+    old_id = register_cluster(client, "revoke-old")
+    _approve(client, admin_headers, old_id)
+    old_headers = login(client, "revoke-old", "secret")
+    assert client.get("/api/cluster-report?year=2025", headers=old_headers).status_code == 200
+
+    _delete(client, admin_headers, old_id)
+    assert client.get("/api/cluster-report?year=2025", headers=old_headers).status_code == 401
+
+    # eng katta id o‘chirildi – yangi klaster uni qayta olmasligi kerak
+    new_id = register_cluster(client, "revoke-new")
+    assert new_id > old_id
+    _approve(client, admin_headers, new_id)
+    assert client.get("/api/cluster-report?year=2025", headers=old_headers).status_code == 401
+    assert client.get("/api/cluster-report?year=2025", headers=login(client, "revoke-new", "secret")).status_code == 200
+
+    # qayta ishga tushirishdagi kabi – to‘plam bazadan qayta quriladi
+    with SessionLocal() as db:
+        rebuild_revocations(db)
+    assert client.get("/api/cluster-report?year=2025", headers=old_headers).status_code == 401
+
+
+def test_rebuild_revokes_deleted_highest_id(client, admin_headers):
+    cluster_id = register_cluster(client, "revoke-last")
+    _approve(client, admin_headers, cluster_id)
+    headers = login(client, "revoke-last", "secret")
+    _delete(client, admin_headers, cluster_id)
+
+    with SessionLocal() as db:
+        rebuild_revocations(db)
+    assert client.get("/api/cluster-report?year=2025", headers=headers).status_code == 401
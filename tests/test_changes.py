@@ -0,0 +1,73 @@
+# tests/test_changes.py
+"""
+Hisobot upserti va /api/agrodata/changes delta sinxronizatsiyasi –
+ilova orqali (DATABASE_URL PostgreSQL bo‘lsa, o‘sha serverda).
+"""
+from conftest import login, register_cluster
+
+
+def _cursor(client) -> int:
+    page = client.get("/api/agrodata/changes", params={"since": 0, "limit": 10000}).json()
+    assert not page["has_more"]
+    return page["cursor"]
+
+
+def _report(year: int, production: float) -> dict:
+    return {"year": year, "production": production, "export": 1.5, "employment": 10, "profitability": 12.5}
+
+
+def test_upsert_and_changes_since_cursor(client, admin_headers):
+    cluster_id = register_cluster(client, "changes-alpha")
+    client.post("/api/admin/cluster-approve", json={"cluster_id": cluster_id}, headers=admin_headers)
+    headers = login(client, "changes-alpha", "secret")
+    since = _cursor(client)
+
+    created = client.post("/api/cluster-report", json=_report(2025, 100), headers=headers)
+    assert created.status_code == 200, created.text
+    updated = client.post("/api/cluster-report", json=_report(2025, 250), headers=headers)
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["production"] == 250
+    assert client.get("/api/cluster-report?year=2025", headers=headers).json()["production"] == 250
+
+    page = client.get("/api/agrodata/changes", params={"since": since}).json()
+    assert page["cursor"] > since and not page["has_more"]
+    assert [(r["cluster_id"], r["year"], r["production"]) for r in page["reports"]] == [(cluster_id, 2025, 250)]
+
+    # ikkinchi sahifa bo‘sh – kursor joyida qoladi
+    empty = client.get("/api/agrodata/changes", params={"since": page["cursor"]}).json()
+    assert empty["cursor"] == page["cursor"]
+    assert empty["reports"] == empty["clusters"] == empty["removed"] == []
+
+
+def test_changes_report_block_and_removal(client, admin_headers):
+    cluster_id = register_cluster(client, "changes-beta")
+    client.post("/api/admin/cluster-approve", json={"cluster_id": cluster_id}, headers=admin_headers)
+    headers = login(client, "changes-beta", "secret")
+    client.post("/api/cluster-report", json=_report(2024, 5), headers=headers)
+    since = _cursor(client)
+
+    client.post("/api/admin/cluster-block", json={"cluster_id": cluster_id, "blocked": True}, headers=admin_headers)
+    page = client.get("/api/agrodata/changes", params={"since": since}).json()
+    assert {"id": cluster_id, "visible": False} in page["clusters"]
+
+    response = client.delete(f"/api/admin/cluster/{cluster_id}", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    page = client.get("/api/agrodata/changes", params={"since": page["cursor"]}).json()
+    assert page["removed"] == [cluster_id]
+
+
+def test_changes_paging_keeps_one_change_seq_together(client, admin_headers):
+    since = _cursor(client)
+    ids = [register_cluster(client, f"changes-page-{n}") for n in range(3)]
+    batch = {"items": [{"cluster_id": cluster_id, "action": "approve"} for cluster_id in ids]}
+    assert client.post("/api/admin/clusters/batch", json=batch, headers=admin_headers).json()["applied"] == 3
+    client.post("/api/admin/cluster-approve", json={"cluster_id": ids[0]}, headers=admin_headers)
+
+    # batch – bitta change_seq (ids[0] keyingisiga o‘tdi): limit=1 bo‘lsa
+    # ham qolgan ikkitasi bo‘linmaydi
+    first = client.get("/api/agrodata/changes", params={"since": since, "limit": 1}).json()
+    assert first["has_more"]
+    assert sorted(c["id"] for c in first["clusters"]) == ids[1:]
+    second = client.get("/api/agrodata/changes", params={"since": first["cursor"], "limit": 1}).json()
+    assert [c["id"] for c in second["clusters"]] == [ids[0]]
+    assert not second["has_more"]
@@ -0,0 +1,44 @@
+# tests/test_data_versions.py
+"""
+committed() boshqa processning versiya oshirishini yutib yubormasligi:
+lokal yozuv qaytargan versiya ko‘rilganidan bittadan ko‘p oshgan bo‘lsa,
+check() o‘zgarishni topishi va qayta yuklovchilarni chaqirishi kerak.
+"""
+import data_versions
+from database import SessionLocal
+
+
+def _bump(domain: str):
+    with SessionLocal() as db:
+        versions = data_versions.mark_changed(db, domain)
+        db.commit()
+    return versions
+
+
+def _reloads(monkeypatch, domain: str) -> list:
+    calls = []
+    monkeypatch.setitem(data_versions._listeners, domain, [lambda: calls.append(domain)])
+    return calls
+
+
+def test_local_write_is_not_reloaded(client, monkeypatch):
+    client.portal.call(data_versions.check)
+    calls = _reloads(monkeypatch, data_versions.DISTRICTS)
+
+    data_versions.committed(_bump(data_versions.DISTRICTS))
+    assert client.portal.call(data_versions.check) == []
+    assert calls == []
+
+
+def test_other_process_bump_survives_local_commit(client, monkeypatch):
+    client.portal.call(data_versions.check)
+    calls = _reloads(monkeypatch, data_versions.DISTRICTS)
+
+    # boshqa process: bazada oshirdi, lekin bu process committed() ni ko‘rmaydi
+    _bump(data_versions.DISTRICTS)
+    # keyin shu process yozadi – qaytgan versiya ko‘rilganidan 2 ga katta
+    data_versions.committed(_bump(data_versions.DISTRICTS))
+
+    assert client.portal.call(data_versions.check) == [data_versions.DISTRICTS]
+    assert calls == [data_versions.DISTRICTS]
+    assert client.portal.call(data_versions.check) == []
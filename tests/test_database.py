@@ -0,0 +1,41 @@
+# tests/test_database.py
+"""
+O‘qish/yozish engine larining ajratilishi: GET endpointlar yozuvchi
+sessiyaga (get_db) bog‘lanmaydi, read-only engine yozuvni rad etadi.
+"""
+import pytest
+from sqlalchemy import exc as sa_exc
+from sqlalchemy import text
+
+import database
+import main
+from metrics import api_routes
+
+
+def _dependency_calls(dependant):
+    for dep in dependant.dependencies:
+        yield dep.call
+        yield from _dependency_calls(dep)
+
+
+def _get_routes():
+    by_endpoint = {route.endpoint: route for route in main.app.routes if hasattr(route, "dependant")}
+    for method, path, endpoint in api_routes(main.app.routes):
+        if method == "GET" and endpoint in by_endpoint:
+            yield path, by_endpoint[endpoint]
+
+
+def test_get_routes_do_not_use_the_write_session():
+    routes = dict(_get_routes())
+    assert "/api/agrodata" in routes
+    offenders = [path for path, route in routes.items() if database.get_db in _dependency_calls(route.dependant)]
+    assert not offenders, f"GET endpointlar yozuvchi sessiyada: {offenders}"
+
+
+def test_read_engine_rejects_writes(client):
+    if database.read_engine.dialect.name != "sqlite":
+        pytest.skip("query_only – SQLite PRAGMA")
+    with database.ReadSessionLocal() as db:
+        assert db.execute(text("SELECT COUNT(*) FROM districts")).scalar() >= 1
+        with pytest.raises(sa_exc.OperationalError):
+            db.execute(text("UPDATE districts SET name = name"))
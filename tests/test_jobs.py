@@ -0,0 +1,144 @@
+# tests/test_jobs.py
+"""
+Fon vazifalari (jobs.py): yuklangan fayl vazifa bilan birga bazaga
+yoziladi, shuning uchun vazifani istalgan process/konteyner workeri
+bajara oladi; to‘xtagan worker vazifasi ijara muddati o‘tgach qayta
+navbatga qo‘yiladi.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, delete, func, insert, inspect, select
+
+import jobs
+from database import SessionLocal
+from models import Job, JobPayload
+
+from conftest import register_cluster, wait_for_job
+
+CSV_HEADER = "cluster_id,year,production,export,employment,profitability\n"
+
+
+@pytest.fixture
+def stopped_runner(client):
+    """Vazifa navbatda qoladi (boshqa host olishini kutayotgandek)."""
+    jobs.runner.stop()
+    try:
+        yield jobs.runner
+    finally:
+        jobs.runner.start()
+
+
+def _payload_chunks(job_id: int) -> int:
+    with SessionLocal() as db:
+        return db.execute(select(func.count()).select_from(JobPayload).where(JobPayload.job_id == job_id)).scalar()
+
+
+def test_import_upload_is_stored_with_the_job(client, admin_headers, stopped_runner, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_PAYLOAD_CHUNK_BYTES", 16)
+    cluster_id = register_cluster(client, "jobs-payload")
+    body = CSV_HEADER + "".join(f"{cluster_id},{year},{year},1,1,1\n" for year in range(2000, 2010))
+
+    response = client.post("/api/admin/cluster-report/import", headers=admin_headers,
+                           files={"file": ("r.csv", body, "text/csv")})
+    assert response.status_code == 202, response.text
+    job_id = response.json()["job_id"]
+
+    with SessionLocal() as db:
+        job = db.get(Job, job_id)
+        assert job.status == "queued"
+        # lokal fayl yo‘li emas – worker faqat bazadan o‘qiydi
+        assert json.loads(job.params) == {"format": "csv"}
+    assert _payload_chunks(job_id) == -(-len(body) // 16)
+
+    stopped_runner.start()
+    job = wait_for_job(client, admin_headers, job_id)
+    assert job["status"] == "succeeded", job
+    assert job["result"]["imported"] == 10 and job["result"]["error_count"] == 0
+    assert _payload_chunks(job_id) == 0
+    stopped_runner.stop()
+
+
+# ============================================================
+#  Ijara (lease) va heartbeat
+# ============================================================
+
+def _running_job(owner: str, lease_seconds: float, attempts: int = 1) -> int:
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        job_id = db.execute(insert(Job).values(
+            kind="rebuild_caches", status="running", params="{}", progress_done=0, created_at=now,
+            started_at=now, owner=owner, lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=attempts,
+        ).returning(Job.id)).scalar_one()
+        db.commit()
+    return job_id
+
+
+def _job(job_id: int) -> Job:
+    with SessionLocal() as db:
+        return db.get(Job, job_id)
+
+
+def test_expired_lease_is_requeued_and_run_again(client, admin_headers, stopped_runner):
+    live = _running_job("other-host:1:alive", lease_seconds=60)
+    dead = _running_job("other-host:2:crashed", lease_seconds=-1)
+
+    assert stopped_runner._reclaim_expired() == (1, 0)
+    assert _job(live).status == "running"
+    requeued = _job(dead)
+    assert (requeued.status, requeued.owner, requeued.lease_expires_at) == ("queued", None, None)
+
+    stopped_runner.start()
+    job = wait_for_job(client, admin_headers, dead)
+    assert (job["status"], job["attempts"]) == ("succeeded", 2)
+    stopped_runner.stop()
+
+    with SessionLocal() as db:
+        db.execute(delete(Job).where(Job.id == live))
+        db.commit()
+
+
+def test_expired_lease_fails_after_max_attempts(stopped_runner):
+    job_id = _running_job("other-host:3:crashed", lease_seconds=-1, attempts=jobs.JOB_MAX_ATTEMPTS)
+    assert stopped_runner._reclaim_expired() == (0, 1)
+    job = _job(job_id)
+    assert job.status == "failed" and "urinish" in job.error and job.finished_at is not None
+
+
+def test_heartbeat_renews_only_own_leases(stopped_runner):
+    own = _running_job(stopped_runner.owner, lease_seconds=1)
+    foreign = _running_job("other-host:4:alive", lease_seconds=1)
+    stopped_runner._live.update({own: (0, None), foreign: (0, None)})
+    try:
+        assert stopped_runner._renew_leases() == 1
+    finally:
+        stopped_runner._live.clear()
+    assert _job(own).lease_expires_at > datetime.utcnow() + timedelta(seconds=jobs.JOB_LEASE_SECONDS / 2)
+    assert _job(foreign).lease_expires_at < datetime.utcnow() + timedelta(seconds=2)
+
+    # ijarasi boshqa workerga o‘tgan vazifa natijasi yozilmaydi
+    stopped_runner._run(foreign, "rebuild_caches", {})
+    job = _job(foreign)
+    assert (job.status, job.owner, job.result) == ("running", "other-host:4:alive", None)
+
+    with SessionLocal() as db:
+        db.execute(delete(Job).where(Job.id.in_([own, foreign])))
+        db.commit()
+
+
+def test_lease_columns_migration_is_idempotent(sqlite_engine):
+    from migrations import _add_job_lease_columns
+
+    Table(
+        "jobs", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("kind", String, nullable=False),
+        Column("status", String, nullable=False),
+    ).create(sqlite_engine)
+    for _ in range(2):
+        with sqlite_engine.begin() as conn:
+            _add_job_lease_columns(conn)
+    columns = {column["name"] for column in inspect(sqlite_engine).get_columns("jobs")}
+    assert {"owner", "lease_expires_at", "attempts"} <= columns
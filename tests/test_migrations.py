@@ -0,0 +1,149 @@
+# tests/test_migrations.py
+"""
+Sxema va hot so‘rovlar: ensure_schema() dan keyin HOT_QUERIES dagi har
+bir so‘rov EXPLAIN QUERY PLAN da indeks ishlatishi kerak (to‘liq skan emas).
+Ikki yo‘l tekshiriladi: bo‘sh baza (create_all) va eski agro.db sxemasi
+(migratsiyalar).
+"""
+import pytest
+from sqlalchemy import Boolean, Column, Float, ForeignKey, Integer, MetaData, String, Table, text
+
+from database import Base
+from migrations import HOT_QUERIES, LATEST_VERSION, check_query_plans, ensure_schema
+import models  # noqa: F401 – jadvallar Base.metadata ga yozilsin
+
+# Birinchi relizdagi agro.db sxemasi (indekslar, kaskad va yangi ustunlarsiz).
+# Table lar bilan – SQLite da ham, PostgreSQL da ham (SERIAL) bir xil quriladi.
+LEGACY_METADATA = MetaData()
+Table(
+    "districts", LEGACY_METADATA,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("code", String, unique=True, index=True),
+    Column("name", String, nullable=False),
+)
+Table(
+    "clusters", LEGACY_METADATA,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+    Column("district_code", String, ForeignKey("districts.code"), nullable=False),
+    Column("cluster_type", String),
+    Column("leader_name", String),
+    Column("leader_phone", String),
+    Column("status", String),
+    Column("admin_comment", String),
+    Column("is_active", Boolean),
+)
+Table(
+    "users", LEGACY_METADATA,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String, unique=True, index=True, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("role", String),
+    Column("cluster_id", Integer, ForeignKey("clusters.id")),
+)
+Table(
+    "cluster_reports", LEGACY_METADATA,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("cluster_id", Integer, ForeignKey("clusters.id"), nullable=False),
+    Column("year", Integer, nullable=False),
+    Column("production", Float),
+    Column("export", Float),
+    Column("employment", Integer),
+    Column("profitability", Float),
+)
+
+# id lar avtomatik (1, 2, ...) – PostgreSQL sekvensiyasi ham surilsin
+LEGACY_ROWS = (
+    "INSERT INTO districts (code, name) VALUES ('qarshi', 'Qarshi tumani'), ('kasbi', 'Kasbi tumani')",
+    "INSERT INTO clusters (name, district_code, status, is_active) VALUES"
+    " ('Alpha', 'qarshi', 'approved', TRUE), ('Beta', 'kasbi', 'pending', FALSE)",
+    "INSERT INTO users (username, hashed_password, role, cluster_id) VALUES"
+    " ('admin', 'x', 'admin', NULL), ('alpha', 'x', 'cluster', 1), ('beta', 'x', 'cluster', 2)",
+    # (1, 2025) takrori – migratsiya 1 eng oxirgisini qoldiradi
+    "INSERT INTO cluster_reports (cluster_id, year, production) VALUES"
+    " (1, 2025, 10), (1, 2025, 12), (2, 2024, 5)",
+)
+
+
+def build_legacy_database(engine) -> None:
+    LEGACY_METADATA.create_all(engine)
+    with engine.begin() as conn:
+        for sql in LEGACY_ROWS:
+            conn.execute(text(sql))
+
+
+def _assert_plans_use_indexes(engine):
+    plans = check_query_plans(engine)
+    assert set(plans) == set(HOT_QUERIES)
+    scans = {name: plan for name, (uses_index, plan) in plans.items() if not uses_index}
+    assert not scans, f"indeks ishlatmayotgan hot so‘rovlar: {scans}"
+
+
+def _schema_version(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar()
+
+
+def test_fresh_database_hot_queries_use_indexes(sqlite_engine):
+    assert ensure_schema(sqlite_engine, Base.metadata) == "created"
+    assert _schema_version(sqlite_engine) == LATEST_VERSION
+    _assert_plans_use_indexes(sqlite_engine)
+
+
+@pytest.fixture
+def legacy_engine(sqlite_engine):
+    build_legacy_database(sqlite_engine)
+    return sqlite_engine
+
+
+def test_legacy_database_migrates_and_hot_queries_use_indexes(legacy_engine):
+    assert ensure_schema(legacy_engine, Base.metadata) == "migrated"
+    assert _schema_version(legacy_engine) == LATEST_VERSION
+    _assert_plans_use_indexes(legacy_engine)
+
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM clusters")).scalar() == 2
+        assert conn.execute(text("SELECT COUNT(*) FROM users")).scalar() == 3
+        reports = conn.execute(text("SELECT id, cluster_id, year FROM cluster_reports ORDER BY id")).all()
+        assert [tuple(r) for r in reports] == [(2, 1, 2025), (3, 2, 2024)]
+        assert conn.execute(text("PRAGMA foreign_key_check")).all() == []
+
+
+def test_current_schema_is_not_touched_again(sqlite_engine):
+    ensure_schema(sqlite_engine, Base.metadata)
+    assert ensure_schema(sqlite_engine, Base.metadata) == "current"
+
+
+def test_legacy_ids_are_not_reused_after_migration(legacy_engine):
+    ensure_schema(legacy_engine, Base.metadata)
+    with legacy_engine.begin() as conn:
+        conn.execute(text("DELETE FROM clusters WHERE id = 2"))
+        # kaskad qayta qurilgan clusters jadvaliga ham ishlaydi
+        assert conn.execute(text("SELECT COUNT(*) FROM users WHERE cluster_id = 2")).scalar() == 0
+        conn.execute(text("INSERT INTO clusters (name, district_code) VALUES ('Gamma', 'kasbi')"))
+        assert conn.execute(text("SELECT MAX(id) FROM clusters")).scalar() == 3
+
+
+class _RecordingConnection:
+    """Bajariladigan SQL ni yig‘adi (berilgan dialekt uchun)."""
+
+    def __init__(self, dialect):
+        self.dialect = dialect
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+
+
+@pytest.mark.parametrize("dialect_name, expected", [("sqlite", "DATETIME"), ("postgresql", "TIMESTAMP")])
+def test_created_at_column_type_matches_dialect(dialect_name, expected):
+    from sqlalchemy.dialects import postgresql, sqlite
+
+    from migrations import MIGRATIONS
+
+    dialect = {"sqlite": sqlite.dialect(), "postgresql": postgresql.dialect()}[dialect_name]
+    conn = _RecordingConnection(dialect)
+    for step in MIGRATIONS[1].steps:
+        step(conn) if callable(step) else conn.execute(step)
+    alter = next(sql for sql in conn.statements if "created_at" in sql)
+    assert alter.startswith(f"ALTER TABLE clusters ADD COLUMN created_at {expected}")
@@ -0,0 +1,241 @@
+# tests/test_postgres.py
+"""
+PostgreSQL: migratsiyalar, upsertlar va o‘zgarishlar oynasi (_window)
+haqiqiy serverda.
+
+Server: TEST_POSTGRES_URL (mavjud server, masalan CI servisi) yoki
+pgserver paketi (vaqtinchalik lokal server, requirements-dev.txt). Ikkalasi
+ham bo‘lmasa server testlari skip bo‘ladi; dialekt kompilyatsiyasi
+testlari har doim ishlaydi.
+
+Ilova testlari (tests/ dagi qolganlari) ham alohida bazada PostgreSQL
+bilan qayta ishga tushiriladi. Qo‘lda:
+    DATABASE_URL=postgresql://... python -m pytest tests
+"""
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateTable
+
+import data_versions
+from auth import _last_issued_cluster_id
+from changes import changes_page, ensure_counter, next_change_seq, record_removals
+from database import Base, _async_url, _normalize_url, dialect_insert, make_engine
+from migrations import ensure_schema
+from models import Cluster, ClusterReport, District
+from report_import import ReportImporter, _upsert_statement
+
+from test_migrations import build_legacy_database
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTS_DIR)
+
+
+# ============================================================
+#  Dialekt kompilyatsiyasi (server shart emas)
+# ============================================================
+
+def test_models_compile_for_postgresql():
+    dialect = postgresql.dialect()
+    for table in Base.metadata.sorted_tables:
+        ddl = str(CreateTable(table).compile(dialect=dialect))
+        assert "DATETIME" not in ddl and "AUTOINCREMENT" not in ddl, ddl
+
+
+def test_report_upsert_compiles_for_postgresql():
+    sql = str(_upsert_statement("postgresql").compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (cluster_id, year) DO UPDATE" in sql
+    assert "change_seq = excluded.change_seq" in sql
+
+
+# ============================================================
+#  Server
+# ============================================================
+
+@pytest.fixture(scope="session")
+def pg_admin_url(tmp_path_factory):
+    url = os.getenv("TEST_POSTGRES_URL")
+    if url:
+        yield _normalize_url(url)
+        return
+    pgserver = pytest.importorskip("pgserver")
+    server = pgserver.get_server(str(tmp_path_factory.mktemp("pgdata")), cleanup_mode="stop")
+    yield _normalize_url(server.get_uri())
+
+
+@pytest.fixture
+def pg_url(pg_admin_url):
+    """Har bir test uchun alohida bo‘sh baza."""
+    name = f"agro_test_{uuid.uuid4().hex[:12]}"
+    # NullPool: uzoq kutishdan (ilova testlari) keyin ham yangi ulanish
+    admin = create_engine(pg_admin_url, isolation_level="AUTOCOMMIT", poolclass=NullPool)
+    with admin.connect() as conn:
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    try:
+        yield make_url(pg_admin_url).set(database=name).render_as_string(hide_password=False)
+    finally:
+        with admin.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+        admin.dispose()
+
+
+@pytest.fixture
+def pg_engine(pg_url):
+    engine = make_engine(pg_url)
+    yield engine
+    engine.dispose()
+
+
+def _seed(db: Session) -> None:
+    # main._prepare_database dagi kabi – qayta chaqirilganda ham xatosiz
+    insert = dialect_insert(db.get_bind().dialect.name)
+    db.execute(
+        insert(District.__table__)
+        .values([{"code": "qarshi", "name": "Qarshi tumani"}, {"code": "kasbi", "name": "Kasbi tumani"}])
+        .on_conflict_do_nothing(index_elements=["code"])
+    )
+    data_versions.ensure_rows(db)
+    ensure_counter(db)
+    db.commit()
+
+
+# ============================================================
+#  Migratsiyalar
+# ============================================================
+
+def test_fresh_schema_and_seed_upserts(pg_engine):
+    assert ensure_schema(pg_engine, Base.metadata) == "created"
+    with Session(pg_engine) as db:
+        _seed(db)
+        _seed(db)
+        assert db.execute(select(District.code).order_by(District.code)).scalars().all() == ["kasbi", "qarshi"]
+        assert next_change_seq(db) == 1
+        assert data_versions.mark_changed(db, data_versions.REPORTS) == {data_versions.REPORTS: 1}
+        db.commit()
+    assert ensure_schema(pg_engine, Base.metadata) == "current"
+
+
+def test_legacy_schema_migrates(pg_engine):
+    build_legacy_database(pg_engine)
+    assert ensure_schema(pg_engine, Base.metadata) == "migrated"
+
+    inspector = inspect(pg_engine)
+    created_at = next(c for c in inspector.get_columns("clusters") if c["name"] == "created_at")
+    assert isinstance(created_at["type"], postgresql.TIMESTAMP)
+    for table in ("users", "cluster_reports"):
+        (fk,) = inspector.get_foreign_keys(table)
+        assert fk["options"].get("ondelete") == "CASCADE"
+
+    with pg_engine.begin() as conn:
+        reports = conn.execute(text("SELECT cluster_id, year, production FROM cluster_reports ORDER BY id")).all()
+        assert [tuple(r) for r in reports] == [(1, 2025, 12), (2, 2024, 5)]
+        conn.execute(text("DELETE FROM clusters WHERE id = 2"))
+        assert conn.execute(text("SELECT COUNT(*) FROM users WHERE cluster_id = 2")).scalar() == 0
+        new_id = conn.execute(
+            text("INSERT INTO clusters (name, district_code) VALUES ('Gamma', 'kasbi') RETURNING id")
+        ).scalar()
+        assert new_id == 3
+
+    with Session(pg_engine) as db:
+        # o‘chirilgan 2 ham, oxirgi berilgan 3 ham sekvensiyadan ko‘rinadi
+        assert max(value or 0 for value in _last_issued_cluster_id(db)) == 3
+
+
+# ============================================================
+#  Upsert va o‘zgarishlar oynasi
+# ============================================================
+
+def _approved_cluster(db: Session, name: str) -> int:
+    cluster = Cluster(name=name, district_code="qarshi", status="approved", is_active=True,
+                      change_seq=next_change_seq(db))
+    db.add(cluster)
+    db.flush()
+    return cluster.id
+
+
+def test_report_import_upserts(pg_engine):
+    ensure_schema(pg_engine, Base.metadata)
+    with Session(pg_engine) as db:
+        _seed(db)
+        cluster_id = _approved_cluster(db, "Alpha")
+        db.commit()
+
+        for production in (10, 20):
+            importer = ReportImporter(db, cluster_id=cluster_id)
+            csv_bytes = (
+                "year,production,export,employment,profitability\n"
+                f"2024,{production},1,2,3\n2025,{production + 1},1,2,3\n"
+            ).encode()
+            result = importer.run(io.BytesIO(csv_bytes), "csv")
+            db.commit()
+            assert result["imported"] == 2 and result["error_count"] == 0
+
+        rows = db.execute(
+            select(ClusterReport.year, ClusterReport.production, ClusterReport.change_seq)
+            .order_by(ClusterReport.year)
+        ).all()
+        assert [(year, production) for year, production, _ in rows] == [(2024, 20), (2025, 21)]
+        # ikkinchi import yangi change_seq yozdi (DO UPDATE SET change_seq)
+        assert rows[0].change_seq == rows[1].change_seq == importer.change_seq
+
+
+def test_changes_window_on_asyncpg(pg_engine, pg_url):
+    ensure_schema(pg_engine, Base.metadata)
+    with Session(pg_engine) as db:
+        _seed(db)
+        alpha = _approved_cluster(db, "Alpha")
+        beta = _approved_cluster(db, "Beta")
+        seq = next_change_seq(db)
+        db.add_all([
+            ClusterReport(cluster_id=alpha, year=2024, production=1, change_seq=seq),
+            ClusterReport(cluster_id=beta, year=2024, production=2, change_seq=seq),
+        ])
+        record_removals(db, [99], next_change_seq(db))
+        db.commit()
+
+    async def pages():
+        engine = make_engine(_async_url(pg_url), is_async=True)
+        try:
+            async with AsyncSession(engine) as db:
+                return [await changes_page(db, 0, limit=2), await changes_page(db, 0, limit=100)]
+        finally:
+            await engine.dispose()
+
+    first, full = asyncio.run(pages())
+    # 2 ta klaster (seq 1, 2) limitni to‘ldiradi; 3-seq keyingi sahifada
+    assert first["has_more"] and first["cursor"] == 2
+    assert [c["id"] for c in first["clusters"]] == [alpha, beta]
+    assert not full["has_more"] and full["cursor"] == 4
+    assert full["removed"] == [99]
+    assert sorted((r["cluster_id"], r["production"]) for r in full["reports"]) == [(alpha, 1), (beta, 2)]
+
+
+# ============================================================
+#  Ilova testlari PostgreSQL bilan
+# ============================================================
+
+def test_app_suite_on_postgresql(pg_url, tmp_path):
+    if make_url(_normalize_url(os.getenv("DATABASE_URL", "sqlite://"))).get_backend_name() == "postgresql":
+        pytest.skip("ilova testlari allaqachon PostgreSQL bilan ishlayapti")
+    env = dict(os.environ, DATABASE_URL=pg_url)
+    for name in ("DATABASE_READ_URL", "DATABASE_ASYNC_READ_URL"):
+        env.pop(name, None)
+    result = subprocess.run(
+        # alohida basetemp: ichki pytest eski vaqtinchalik kataloglarni
+        # (shu jumladan pgserver ma'lumotlar katalogini) tozalab yubormasin
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", "--basetemp", str(tmp_path / "inner"),
+         "--ignore", os.path.join(TESTS_DIR, "test_postgres.py"), TESTS_DIR],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=600,
+    )
+    assert result.returncode == 0, result.stdout[-6000:] + result.stderr[-2000:]
@@ -0,0 +1,179 @@
+# tests/test_query_budgets.py
+"""
+@db_budget: QUERY_BUDGET_MODE=raise da har bir API endpoint eng og‘ir
+(worst-case) kirish bilan chaqiriladi – byudjetdan oshgan so‘rov
+QueryBudgetExceeded bilan testni yiqitadi. Barcha route lar qamrab
+olinganligi metrikalardan (http_requests_total) tekshiriladi.
+
+raise rejimi javob yuborilgandan keyin ishlaydi: commit va commitdan
+keyingi yon ta'sirlar bekor qilinmaydi.
+"""
+from collections import Counter
+
+import pytest
+
+import events
+import main
+import metrics
+from metrics import QueryBudgetExceeded, api_routes, query_budget
+from database import SessionLocal
+from models import District
+
+from conftest import login, register_cluster, wait_for_job
+
+CSV_HEADER = "year,production,export,employment,profitability\n"
+
+
+@pytest.fixture
+def raise_mode(monkeypatch):
+    monkeypatch.setattr(metrics, "QUERY_BUDGET_MODE", "raise")
+
+
+def _requested_routes() -> Counter:
+    """{"METHOD /route": so‘rovlar soni} – barcha status kodlari yig‘indisi."""
+    counts: Counter = Counter()
+    for labels, value in list(metrics.HTTP_REQUESTS._values.items()):
+        labels = dict(labels)
+        counts[f"{labels['method']} {labels['route']}"] += value
+    return counts
+
+
+def _ok(response, expected=200):
+    assert response.status_code == expected, response.text
+    return response
+
+
+def _report(year: int, production: float) -> dict:
+    return {"year": year, "production": production, "export": 2, "employment": 3, "profitability": 4}
+
+
+def test_every_route_stays_within_budget(client, admin_headers, raise_mode, monkeypatch):
+    before = _requested_routes()
+    admin = admin_headers
+
+    # ---- auth ----
+    _ok(client.post("/auth/register-cluster", json={
+        "username": "budget-a", "password": "secret", "district_code": "qarshi",
+        "cluster_name": "Budget A", "leader_name": "Rahbar",
+    }))
+    _ok(client.post("/auth/register-cluster", json={
+        "username": "budget-a", "password": "secret", "district_code": "qarshi",
+        "cluster_name": "Budget A", "leader_name": "Rahbar",
+    }), 400)
+    cluster_id = client.get("/api/admin/pending-clusters", headers=admin).json()["items"][-1]["id"]
+    _ok(client.post("/auth/login", data={"username": "budget-a", "password": "secret"}), 403)
+    _ok(client.post("/auth/login", data={"username": "budget-a", "password": "wrong"}), 401)
+
+    # ---- admin qarorlari ----
+    _ok(client.get("/api/admin/pending-clusters", params={"district_code": "qarshi", "sort": "-name"}, headers=admin))
+    _ok(client.post("/api/admin/cluster-approve", json={"cluster_id": cluster_id, "comment": "ok"}, headers=admin))
+    headers = login(client, "budget-a", "secret")
+
+    # ---- klaster hisobotlari (yaratish, yangilash, import) ----
+    _ok(client.post("/api/cluster-report", json=_report(2024, 1), headers=headers))
+    _ok(client.post("/api/cluster-report", json=_report(2024, 2), headers=headers))
+    _ok(client.get("/api/cluster-report", params={"year": 2024}, headers=headers))
+    csv_body = CSV_HEADER + "2023,1,1,1,1\n2025,2,2,2,2\nxx,1,1,1,1\n"
+    _ok(client.post("/api/cluster-report/import", files={"file": ("r.csv", csv_body, "text/csv")}, headers=headers))
+
+    # ---- viloyat paneli (yozuvlardan keyin – kesh bo‘sh, eng og‘ir holat) ----
+    _ok(client.get("/api/agrodata"))
+    _ok(client.get("/api/agrodata", params={"year": 2024, "district": "qarshi", "fields": "production"}))
+    _ok(client.get("/api/agrodata/summary", params={"year": 2024}))
+    _ok(client.get("/api/agrodata/2024"))
+    _ok(client.get("/api/agrodata/2024/qarshi"))
+    _ok(client.get("/api/agrodata/changes", params={"since": 0}))
+
+    # SSE: hub yopiq bo‘lsa oqim birinchi kadrdan keyin tugaydi
+    with monkeypatch.context() as patch:
+        patch.setattr(events.hub, "_closed", True)
+        assert _ok(client.get("/api/events")).text.startswith("retry:")
+        assert _ok(client.get("/api/admin/events", headers=admin)).text.startswith("retry:")
+
+    # ---- admin ro‘yxatlari, tarix, eksport ----
+    _ok(client.get("/api/admin/active-clusters", params={"status": "approved", "sort": "name"}, headers=admin))
+    _ok(client.get(f"/api/admin/cluster-history/{cluster_id}", params={"year_from": 2020}, headers=admin))
+    _ok(client.get("/api/admin/cluster-history", params={"ids": f"{cluster_id},99999"}, headers=admin))
+    for fmt in ("csv", "jsonl", "parquet", "arrow"):
+        _ok(client.get("/api/admin/export/reports", params={"format": fmt, "year": 2024}, headers=admin))
+
+    # ---- bitta klaster qarorlari ----
+    others = [register_cluster(client, f"budget-{n}") for n in range(8)]
+    _ok(client.post("/api/admin/cluster-reject", json={"cluster_id": others[0], "comment": "yo‘q"}, headers=admin))
+    _ok(client.post("/api/admin/cluster-block", json={"cluster_id": cluster_id, "blocked": True}, headers=admin))
+    _ok(client.post("/api/admin/cluster-block", json={"cluster_id": cluster_id, "blocked": False}, headers=admin))
+
+    # ---- paket: oltala amal bitta so‘rovda (eng og‘ir holat) ----
+    for target in others[3:5]:
+        _ok(client.post("/api/admin/cluster-approve", json={"cluster_id": target}, headers=admin))
+    _ok(client.post("/api/admin/cluster-block", json={"cluster_id": others[4], "blocked": True}, headers=admin))
+    batch = _ok(client.post("/api/admin/clusters/batch", json={"items": [
+        {"cluster_id": others[1], "action": "approve", "comment": "a"},
+        {"cluster_id": others[2], "action": "reject", "comment": "b"},
+        {"cluster_id": others[3], "action": "block", "comment": "c"},
+        {"cluster_id": others[4], "action": "unblock", "comment": "d"},
+        {"cluster_id": others[5], "action": "delete"},
+        {"cluster_id": others[6], "action": "archive"},
+        {"cluster_id": 99999, "action": "approve"},
+    ]}, headers=admin)).json()
+    assert batch["applied"] == 6
+
+    # ---- fon vazifalari ----
+    _ok(client.delete(f"/api/admin/cluster/{others[7]}", params={"archive": True}, headers=admin))
+    accepted = [
+        _ok(client.post("/api/admin/cluster-report/import", headers=admin, files={
+            "file": ("r.csv", "cluster_id," + CSV_HEADER + f"{cluster_id},2022,1,1,1,1\n", "text/csv"),
+        }), 202),
+        _ok(client.post("/api/admin/cache/rebuild", headers=admin), 202),
+    ]
+    _ok(client.delete("/api/admin/cluster/99999", headers=admin), 404)
+    for response in accepted:
+        assert wait_for_job(client, admin, response.json()["job_id"])["status"] == "succeeded"
+    _ok(client.get("/api/admin/jobs", params={"status": "succeeded"}, headers=admin))
+    _ok(client.get(f"/api/admin/jobs/{accepted[0].json()['job_id']}", headers=admin))
+
+    # ---- xizmat endpointlari ----
+    _ok(client.get("/api/admin/db-pool", headers=admin))
+    _ok(client.get("/metrics"))
+    _ok(client.get("/"))
+    client.get("/ready")
+
+    requested = {key for key, value in _requested_routes().items() if value > before[key]}
+    missing = {f"{method} {path}" for method, path, _ in api_routes(main.app.routes)} - requested
+    assert not missing, f"testda chaqirilmagan endpointlar: {sorted(missing)}"
+
+
+def test_raise_mode_reports_after_the_write_is_committed(client, admin_headers, raise_mode, monkeypatch):
+    cluster_id = register_cluster(client, "budget-commit")
+    _ok(client.post("/api/admin/cluster-approve", json={"cluster_id": cluster_id}, headers=admin_headers))
+    headers = login(client, "budget-commit", "secret")
+    since = client.get("/api/agrodata/changes", params={"since": 0, "limit": 10000}).json()["cursor"]
+
+    monkeypatch.setattr(main.upsert_my_cluster_report, "query_budget", 1)
+    with pytest.raises(QueryBudgetExceeded):
+        client.post("/api/cluster-report", json=_report(2030, 42), headers=headers)
+    monkeypatch.undo()
+
+    # yozuv commit qilingan, data version / o‘zgarishlar jurnali ham yangilangan
+    assert client.get("/api/cluster-report", params={"year": 2030}, headers=headers).json()["production"] == 42
+    page = client.get("/api/agrodata/changes", params={"since": since}).json()
+    assert [(r["cluster_id"], r["year"]) for r in page["reports"]] == [(cluster_id, 2030)]
+
+
+def test_query_budget_block_runs_fully_then_raises(client):
+    with SessionLocal() as db:
+        with pytest.raises(QueryBudgetExceeded):
+            with query_budget(1) as stats:
+                db.query(District).count()
+                db.query(District).first()
+        assert stats.queries == 2
+
+        with query_budget(1) as stats:
+            db.query(District).first()
+        assert stats.queries == 1
+
+
+def test_routes_without_budget_sees_included_routers():
+    routes = {f"{method} {path}" for method, path, _ in api_routes(main.app.routes)}
+    assert {"POST /auth/login", "POST /auth/register-cluster"} <= routes
+    assert metrics.routes_without_budget(main.app.routes) == []